@@ -128,6 +128,46 @@ module.exports = {
       restart_delay: 5000,
       max_memory_restart: '512M',
       kill_timeout: 5000
+    },
+    {
+      // Probes and restarts the services above; replaces the monitor-services.sh cron
+      name: 'currentmesh-monitor',
+      script: '/var/www/currentmesh/scripts/monitor-daemon.py',
+      interpreter: 'python3',
+      cwd: '/var/www/currentmesh/scripts',
+      instances: 1,
+      exec_mode: 'fork',
+      watch: false,
+      error_file: '/var/www/currentmesh/logs/monitor-err.log', // skipped by the daemon's own *-err.log tailer
+      out_file: '/dev/null', // events are already appended to logs/service-monitor.log
+      time: true,
+      autorestart: true,
+      min_uptime: '10s',
+      max_restarts: 10,
+      restart_delay: 5000,
+      max_memory_restart: '256M',
+      kill_timeout: 5000
+    },
+    {
+      // Coalescing relay behind /sentry-relay/webhook (the Sentry hook's default target).
+      // Reads SENTRY_WEBHOOK_SECRET like the API (environment, then server/.env.local)
+      // and refuses to start without it
+      name: 'currentmesh-sentry-relay',
+      script: '/var/www/currentmesh/scripts/sentry-webhook-relay.py',
+      interpreter: 'python3',
+      cwd: '/var/www/currentmesh/scripts',
+      instances: 1,
+      exec_mode: 'fork',
+      watch: false,
+      error_file: '/var/www/currentmesh/logs/sentry-relay-err.log',
+      out_file: '/dev/null', // events are already appended to logs/sentry-relay.log
+      time: true,
+      autorestart: true,
+      min_uptime: '10s',
+      max_restarts: 10,
+      restart_delay: 5000,
+      max_memory_restart: '256M',
+      kill_timeout: 20000 // relay drains queued deliveries for up to 15s on SIGTERM
     }
   ]
 };
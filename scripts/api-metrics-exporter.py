@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+API Metrics Exporter
+Aggregates the API call trace (logs/api-calls.log, written by api_trace.py)
+into Prometheus latency histograms, request and retry counters, and writes
+them atomically to node_exporter's textfile collector directory. Counters
+restart when log-compact.py rotates the trace, which Prometheus treats as a
+normal counter reset.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+from api_trace import TRACE_PATH
+from term_colors import Colors
+
+TEXTFILE_DIR = '/var/lib/node_exporter/textfile_collector'
+METRICS_NAME = 'currentmesh_api.prom'
+
+# Histogram upper bounds, seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class Series:
+    """Aggregates for one (service, method, endpoint)"""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.statuses = defaultdict(int)
+        self.retries = 0
+        self.last = 0.0
+
+    def add(self, entry):
+        seconds = entry['duration_ms'] / 1000
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        status = entry.get('status')
+        self.statuses['error' if status is None else str(status)] += 1
+        self.retries += entry.get('retries', 0)
+        self.last = max(self.last, entry.get('ts', 0))
+
+    def failed(self):
+        return sum(n for status, n in self.statuses.items() if status == 'error' or int(status) >= 400)
+
+def aggregate(path):
+    """Series keyed by (service, method, endpoint); skips malformed lines"""
+    series = defaultdict(Series)
+    skipped = 0
+    with open(path, 'r', errors='replace') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                key = (entry['service'], entry['method'], entry['endpoint'])
+                series[key].add(entry)
+            except (ValueError, KeyError, TypeError):
+                skipped += 1
+    return series, skipped
+
+def label_str(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+def render(series):
+    """Prometheus text exposition format"""
+    lines = [
+        '# HELP currentmesh_api_request_duration_seconds Outbound API call latency, retries included',
+        '# TYPE currentmesh_api_request_duration_seconds histogram',
+    ]
+    for (service, method, endpoint), s in sorted(series.items()):
+        labels = label_str(service=service, method=method, endpoint=endpoint)
+        cumulative = 0
+        for bound, n in zip(BUCKETS, s.buckets):
+            cumulative += n
+            lines.append(f'currentmesh_api_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'currentmesh_api_request_duration_seconds_bucket{{{labels},le="+Inf"}} {s.count}')
+        lines.append(f'currentmesh_api_request_duration_seconds_sum{{{labels}}} {s.sum:.6f}')
+        lines.append(f'currentmesh_api_request_duration_seconds_count{{{labels}}} {s.count}')
+
+    lines += [
+        '# HELP currentmesh_api_requests_total Outbound API calls by response status ("error" = no response)',
+        '# TYPE currentmesh_api_requests_total counter',
+    ]
+    for (service, method, endpoint), s in sorted(series.items()):
+        for status, n in sorted(s.statuses.items()):
+            labels = label_str(service=service, method=method, endpoint=endpoint, status=status)
+            lines.append(f'currentmesh_api_requests_total{{{labels}}} {n}')
+
+    lines += [
+        '# HELP currentmesh_api_retries_total Retries made by outbound API calls',
+        '# TYPE currentmesh_api_retries_total counter',
+    ]
+    for (service, method, endpoint), s in sorted(series.items()):
+        labels = label_str(service=service, method=method, endpoint=endpoint)
+        lines.append(f'currentmesh_api_retries_total{{{labels}}} {s.retries}')
+
+    lines += [
+        '# HELP currentmesh_api_last_call_timestamp_seconds Time of the most recent call per service',
+        '# TYPE currentmesh_api_last_call_timestamp_seconds gauge',
+    ]
+    last = defaultdict(float)
+    for (service, _, _), s in series.items():
+        last[service] = max(last[service], s.last)
+    for service, ts in sorted(last.items()):
+        lines.append(f'currentmesh_api_last_call_timestamp_seconds{{{label_str(service=service)}}} {ts:.3f}')
+    return '\n'.join(lines) + '\n'
+
+def write_textfile(text, directory):
+    """Atomic rename so node_exporter never reads a partial file"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.currentmesh_api.', suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, directory / METRICS_NAME)
+    return directory / METRICS_NAME
+
+def print_summary(series, skipped):
+    print(f"{Colors.BLUE}{'Service':<11} {'Method':<7} {'Endpoint':<44} {'Calls':>6} {'Mean':>8} {'Max':>8} "
+          f"{'Failed':>7} {'Retries':>8}{Colors.NC}")
+    for (service, method, endpoint), s in sorted(series.items(), key=lambda item: -item[1].sum):
+        failed = s.failed()
+        color = Colors.RED if failed else Colors.NC
+        print(f"{service:<11} {method:<7} {endpoint[:44]:<44} {s.count:>6} {s.sum / s.count * 1000:>6.0f}ms "
+              f"{s.max * 1000:>6.0f}ms {color}{failed / s.count:>6.1%}{Colors.NC} {s.retries:>8}")
+    if skipped:
+        print(f"{Colors.YELLOW}⚠️  {skipped} malformed trace line(s) skipped{Colors.NC}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Export API call latency histograms for node_exporter')
+    parser.add_argument('--trace', default=str(TRACE_PATH), help='Trace log to aggregate')
+    parser.add_argument('--textfile-dir', default=TEXTFILE_DIR, help='node_exporter textfile collector directory')
+    parser.add_argument('--print', action='store_true', help='Print the metrics instead of writing them')
+    parser.add_argument('--summary', action='store_true', help='Print a per-endpoint summary table')
+    args = parser.parse_args()
+
+    try:
+        series, skipped = aggregate(args.trace)
+    except FileNotFoundError:
+        series, skipped = {}, 0  # nothing traced since the last rotation
+
+    if args.summary:
+        print_summary(series, skipped)
+        return
+
+    text = render(series)
+    if args.print:
+        sys.stdout.write(text)
+        return
+    try:
+        path = write_textfile(text, args.textfile_dir)
+    except OSError as e:
+        print(f"{Colors.RED}❌ Could not write metrics to {args.textfile_dir}: {e}{Colors.NC}")
+        sys.exit(1)
+    print(f"{Colors.GREEN}✅ {len(series)} endpoint series written to {path}{Colors.NC}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Outbound API call tracing
+Appends one JSON line per API call (service, method, endpoint, status,
+duration, retries) to logs/api-calls.log. api-metrics-exporter.py aggregates
+the log into Prometheus histograms for node_exporter's textfile collector.
+Set OPS_TRACE=0 to turn tracing off.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlsplit
+
+TRACE_PATH = Path(os.getenv('OPS_TRACE_FILE') or Path(__file__).parent.parent / 'logs' / 'api-calls.log')
+ENABLED = os.getenv('OPS_TRACE', '1') != '0'
+
+# Zone, record and numeric ids collapse so calls aggregate per endpoint
+ID_SEGMENT_RE = re.compile(r'^(?:[0-9a-f]{32}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\d+)$', re.I)
+
+_lock = threading.Lock()
+
+def endpoint_template(path):
+    """'zones/<zone id>/dns_records/<id>?page=2' -> 'zones/:id/dns_records/:id'"""
+    path = urlsplit(path).path.strip('/')
+    return '/'.join(':id' if ID_SEGMENT_RE.match(segment) else segment for segment in path.split('/'))
+
+def record(service, method, endpoint, status, duration, retries=0, error=None):
+    """Append one call to the trace log; never raises"""
+    if not ENABLED:
+        return
+    entry = {
+        'ts': round(time.time(), 3),
+        'service': service,
+        'method': method,
+        'endpoint': endpoint_template(endpoint),
+        'status': status,
+        'duration_ms': round(duration * 1000, 1),
+        'retries': retries,
+    }
+    if error:
+        entry['error'] = error
+    line = json.dumps(entry, separators=(',', ':')) + '\n'
+    try:
+        with _lock, open(TRACE_PATH, 'a') as f:
+            f.write(line)
+    except OSError:
+        pass  # tracing must never break the script it observes
+
+def urlopen(request, service='sentry', **kwargs):
+    """urllib.request.urlopen that traces the call; errors are re-raised after recording"""
+    method = request.get_method()
+    path = urlsplit(request.full_url).path
+    start = time.monotonic()
+    try:
+        response = urllib.request.urlopen(request, **kwargs)
+    except urllib.error.HTTPError as e:
+        record(service, method, path, e.code, time.monotonic() - start)
+        raise
+    except OSError as e:
+        record(service, method, path, None, time.monotonic() - start, error=type(e).__name__)
+        raise
+    record(service, method, path, response.status, time.monotonic() - start)
+    return response
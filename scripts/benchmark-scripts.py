@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Ops Script Benchmarks
+Runs the Cloudflare scripts against the local API stand-in (cloudflare_mock.py)
+and records wall time, API request count and bytes per scenario. Results are
+compared with benchmark-baseline.json; a scenario that makes more requests,
+moves noticeably more bytes or runs noticeably slower fails the run.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from cloudflare_client import Colors
+from cloudflare_mock import MOCK_DOMAIN, MOCK_ZONE_ID, MockCloudflare
+
+SCRIPTS_DIR = Path(__file__).parent
+BASELINE_PATH = SCRIPTS_DIR / 'benchmark-baseline.json'
+
+TIME_TOLERANCE = 0.5  # fraction slower than baseline before failing
+TIME_SLACK = 0.25  # seconds; absorbs interpreter start-up noise
+BYTES_TOLERANCE = 0.1
+SCRIPT_TIMEOUT = 300  # seconds
+
+# name, script and arguments, mock config, whether to run the script once
+# before measuring (to benchmark the converged, nothing-to-do path)
+SCENARIOS = [
+    ('configure-plan', ['cloudflare-configure-all-free-features.py', '--plan'], {}, False),
+    ('configure-plan-cached', ['cloudflare-configure-all-free-features.py', '--plan'], {}, True),
+    ('configure-apply', ['cloudflare-configure-all-free-features.py'], {}, False),
+    ('configure-converged', ['cloudflare-configure-all-free-features.py'], {}, True),
+    ('configure-latency', ['cloudflare-configure-all-free-features.py'], {'latency': 0.05}, False),
+    ('configure-throttled', ['cloudflare-configure-all-free-features.py'],
+     {'rate_limit_rate': 0.5, 'retry_after': 0}, False),
+    ('configure-flaky', ['cloudflare-configure-all-free-features.py'], {'error_rate': 0.5}, False),
+    ('ssl-setup', ['cloudflare-ssl-setup.py'], {}, False),
+    ('dns-setup', ['cloudflare-setup.py'], {}, False),
+    ('dns-converged', ['cloudflare-setup.py'], {}, True),
+    ('dns-plan-cached', ['cloudflare-setup.py', '--plan'], {}, True),
+    ('purge-plan', ['cloudflare-purge-cache.py', '--plan'], {}, False),
+    ('cache-rules', ['cloudflare-cache-rules.py'], {}, False),
+    ('fleet-20-zones', ['cloudflare-fleet.py', '--dns'], {'zones': 20, 'latency': 0.05}, False),
+    ('fix-521-probe', ['fix-cloudflare-521.py', '--probe-only', '--host', 'localhost'], {}, False),
+]
+
+def write_env(state_dir):
+    (Path(state_dir) / '.env').write_text(
+        'CLOUDFLARE_API_TOKEN=mock-token\n'
+        f'CLOUDFLARE_ZONE_ID={MOCK_ZONE_ID}\n'
+        f'CLOUDFLARE_DOMAIN={MOCK_DOMAIN}\n'
+        'SERVER_IP=127.0.0.1\n')
+
+def run_script(argv, env):
+    started = time.monotonic()
+    proc = subprocess.run([sys.executable, *argv], cwd=SCRIPTS_DIR, env=env, stdin=subprocess.DEVNULL,
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=SCRIPT_TIMEOUT)
+    return time.monotonic() - started, proc.returncode, proc.stdout.decode(errors='replace')
+
+def run_scenario(mock, argv, config, warm, repeat):
+    """Median wall time over the repeats; request and byte counts of the last run"""
+    times = []
+    for _ in range(repeat):
+        mock.reset(**config)
+        with tempfile.TemporaryDirectory() as state_dir:
+            write_env(state_dir)
+            env = dict(os.environ, CLOUDFLARE_API_BASE=mock.base_url, CLOUDFLARE_STATE_DIR=state_dir,
+                       OPS_TRACE_FILE=str(Path(state_dir) / 'api-calls.log'))
+            if warm:
+                run_script(argv, env)
+                mock.clear_stats()
+            elapsed, code, output = run_script(argv, env)
+        times.append(elapsed)
+    stats = mock.stats()
+    return {
+        'seconds': round(statistics.median(times), 3),
+        'requests': stats['requests'],
+        'bytes_in': stats['bytes_in'],
+        'bytes_out': stats['bytes_out'],
+        'rate_limited': stats['rate_limited'],
+        'errors': stats['errors'],
+        'exit_code': code,
+    }, output
+
+def regressions(result, baseline):
+    """Reasons a result is worse than its baseline"""
+    problems = []
+    if result['exit_code'] != baseline['exit_code']:
+        problems.append(f"exit code {result['exit_code']} (baseline {baseline['exit_code']})")
+    if result['requests'] > baseline['requests']:
+        problems.append(f"{result['requests']} requests (baseline {baseline['requests']})")
+    for key in ('bytes_in', 'bytes_out'):
+        if result[key] > baseline[key] * (1 + BYTES_TOLERANCE):
+            problems.append(f"{key} {result[key]} (baseline {baseline[key]})")
+    if result['seconds'] > baseline['seconds'] * (1 + TIME_TOLERANCE) + TIME_SLACK:
+        problems.append(f"{result['seconds']:.2f}s (baseline {baseline['seconds']:.2f}s)")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Cloudflare scripts against a local API mock')
+    parser.add_argument('--scenario', action='append', default=[], help='Only this scenario (repeatable)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per scenario (median time is kept)')
+    parser.add_argument('--update-baseline', action='store_true', help='Record these results as the new baseline')
+    parser.add_argument('--verbose', action='store_true', help='Print each script\'s output')
+    args = parser.parse_args()
+
+    try:
+        with open(BASELINE_PATH, 'r') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    scenarios = [s for s in SCENARIOS if not args.scenario or s[0] in args.scenario]
+    mock = MockCloudflare()
+    mock.start()
+
+    print(f"{Colors.BLUE}{'Scenario':<22} {'Time':>8} {'Reqs':>6} {'Bytes in':>9} {'Bytes out':>10} "
+          f"{'429':>4} {'5xx':>4}  Result{Colors.NC}")
+    results = {}
+    failed = []
+    try:
+        for name, argv, config, warm in scenarios:
+            result, output = run_scenario(mock, argv, config, warm, args.repeat)
+            results[name] = result
+            if args.verbose:
+                print(output)
+
+            problems = [] if args.update_baseline or name not in baseline else regressions(result, baseline[name])
+            if problems:
+                failed.append(name)
+                status = f"{Colors.RED}❌ {'; '.join(problems)}{Colors.NC}"
+            elif name not in baseline and not args.update_baseline:
+                status = f"{Colors.YELLOW}new (no baseline){Colors.NC}"
+            else:
+                status = f"{Colors.GREEN}✅{Colors.NC}"
+            print(f"{name:<22} {result['seconds']:>7.2f}s {result['requests']:>6} {result['bytes_in']:>9} "
+                  f"{result['bytes_out']:>10} {result['rate_limited']:>4} {result['errors']:>4}  {status}")
+    finally:
+        mock.stop()
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\n{Colors.GREEN}✅ Baseline written to {BASELINE_PATH.name}{Colors.NC}")
+    elif failed:
+        print(f"\n{Colors.RED}❌ Performance regression in: {', '.join(failed)}{Colors.NC}")
+        sys.exit(1)
+    else:
+        print(f"\n{Colors.GREEN}✅ No regressions{Colors.NC}")
+
+if __name__ == '__main__':
+    main()
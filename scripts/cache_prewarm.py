@@ -0,0 +1,138 @@
+"""
+Edge cache pre-warmer
+Collects the hot URL set (sitemap, nginx access log, purge manifest) and
+fetches it with bounded async concurrency so the first real visitor after a
+purge or deploy gets an edge hit instead of a cold miss against origin
+"""
+
+import asyncio
+import re
+import xml.etree.ElementTree as ET
+from collections import Counter
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache_purge import load_manifest
+from cloudflare_client import Colors
+from site_builds import SITES
+
+CONCURRENCY = 8
+REQUEST_TIMEOUT = 15  # seconds
+USER_AGENT = 'currentmesh-prewarm/1.0'
+
+# Default nginx "combined" log format
+ACCESS_LOG_RE = re.compile(r'^\S+ \S+ \S+ \[[^\]]+\] "GET (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3}) ')
+
+# Never warm dynamic endpoints
+SKIP_PREFIXES = ('/api/',)
+
+def urls_from_sitemap(session, sitemap_url, depth=0):
+    """Read <loc> URLs from a sitemap, following one level of sitemap index"""
+    try:
+        response = session.get(sitemap_url, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            return []
+        root = ET.fromstring(response.content)
+    except (requests.RequestException, ET.ParseError) as e:
+        print(f"{Colors.RED}Error: sitemap {sitemap_url} skipped: {e}{Colors.NC}")
+        return []
+    locs = [el.text.strip() for el in root.iter() if el.tag.endswith('loc') and el.text]
+    if root.tag.endswith('sitemapindex') and depth == 0:
+        urls = []
+        for loc in locs:
+            urls.extend(urls_from_sitemap(session, loc, depth + 1))
+        return urls
+    return locs
+
+def urls_from_access_log(log_path, host, limit=200):
+    """Most requested successful GET paths from an nginx access log"""
+    counts = Counter()
+    with open(log_path, 'r', errors='replace') as f:
+        for line in f:
+            match = ACCESS_LOG_RE.match(line)
+            if match and match.group('status') == '200':
+                counts[match.group('path')] += 1
+    return [f'https://{host}{path}' for path, _ in counts.most_common(limit)]
+
+def urls_from_manifest(manifest=None):
+    """
+    URLs invalidated by the last purge
+    Hosts purged wholesale contribute their root page
+    """
+    manifest = manifest if manifest is not None else load_manifest()
+    last = (manifest or {}).get('last_purged') or {}
+    urls = list(last.get('files', []))
+    urls += [f'https://{host}/' for host in last.get('hosts', [])]
+    return urls
+
+def warmable(url):
+    """True unless the URL points at a dynamic route"""
+    path = urlsplit(url).path or '/'
+    return not path.startswith(SKIP_PREFIXES)
+
+class Prewarmer:
+    """
+    Fetches URLs with bounded concurrency over a keep-alive session
+    With a target (e.g. http://127.0.0.1) requests go there with the original
+    Host header, so a local nginx can stand in for the edge
+    """
+
+    def __init__(self, target=None, concurrency=CONCURRENCY):
+        self.target = target.rstrip('/') if target else None
+        self.concurrency = concurrency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(SITES), pool_maxsize=concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+
+    def fetch(self, url):
+        """GET one URL and return (url, HTTP status, CF-Cache-Status)"""
+        parts = urlsplit(url)
+        request_url = url
+        headers = {}
+        if self.target:
+            headers['Host'] = parts.netloc
+            request_url = self.target + (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        try:
+            response = self.session.get(request_url, headers=headers, timeout=REQUEST_TIMEOUT)
+            # Drain the body so the edge caches the full object
+            response.content
+            return url, response.status_code, response.headers.get('CF-Cache-Status', 'NONE')
+        except requests.RequestException:
+            return url, 0, 'ERROR'
+
+    async def sweep(self, urls):
+        """Fetch every URL, at most `concurrency` in flight"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(url):
+            async with semaphore:
+                return await asyncio.to_thread(self.fetch, url)
+
+        return await asyncio.gather(*(bounded(url) for url in urls))
+
+    def run(self, urls):
+        """Warm the URLs; returns (before, after) sweep results"""
+        before = asyncio.run(self.sweep(urls))
+        after = asyncio.run(self.sweep(urls))
+        return before, after
+
+def hit_ratio(results):
+    """Share of responses served from the edge cache"""
+    statuses = [status for _, _, status in results]
+    if not statuses:
+        return 0.0
+    return sum(1 for s in statuses if s in ('HIT', 'STALE', 'REVALIDATED', 'UPDATING')) / len(statuses)
+
+def print_report(before, after):
+    """Print the cache status breakdown and hit ratio for both sweeps"""
+    for label, results in (('Before', before), ('After', after)):
+        counts = Counter(status for _, _, status in results)
+        breakdown = ', '.join(f'{k}={v}' for k, v in counts.most_common())
+        print(f"{Colors.BLUE}{label}:{Colors.NC} hit ratio {hit_ratio(results):.0%} ({breakdown})")
+    failed = [(url, code) for url, code, _ in after if code == 0 or code >= 400]
+    for url, code in failed:
+        print(f"  {Colors.RED}❌ {url}: HTTP {code}{Colors.NC}")
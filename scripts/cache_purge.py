@@ -0,0 +1,135 @@
+"""
+Manifest-driven Cloudflare cache purge
+Hashes the build outputs into a persisted manifest and purges only the URLs
+whose content changed or disappeared since the previous deploy
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+from cloudflare_client import STATE_DIR, Colors, api_result
+from site_builds import SITES, iter_site_files, site_url
+
+MANIFEST_PATH = STATE_DIR / 'purge-manifest.json'
+
+# Max URLs per purge_cache call (Free plan limit)
+PURGE_BATCH_SIZE = 30
+# Above this many changed URLs on one host, purge the host instead
+HOST_PURGE_THRESHOLD = 300
+
+def file_digest(path):
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(path=MANIFEST_PATH):
+    """Load the previous deploy's manifest, or None on first run"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Atomically write the manifest"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    tmp.replace(path)
+
+def build_manifest(previous=None, sites=SITES):
+    """
+    Hash every served file into {site: {url path: [size, mtime_ns, digest]}}
+    Files whose size and mtime match the previous manifest reuse its digest
+    """
+    previous_files = (previous or {}).get('files', {})
+    files = {}
+    for name in sites:
+        old = previous_files.get(name, {})
+        entries = files[name] = {}
+        for path, url_path in iter_site_files(name):
+            stat = path.stat()
+            cached = old.get(url_path)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                entries[url_path] = cached
+            else:
+                entries[url_path] = [stat.st_size, stat.st_mtime_ns, file_digest(path)]
+    return {'files': files}
+
+def plan_purge(previous, current):
+    """
+    Diff two manifests into {'files': [urls], 'hosts': [hosts]}
+    New URLs are never cached yet, so only changed and removed ones are purged.
+    Sites with no previous manifest, or too many changes, purge their host.
+    """
+    plan = {'files': [], 'hosts': []}
+    previous_files = (previous or {}).get('files', {})
+
+    for name, entries in current['files'].items():
+        if name not in previous_files:
+            if entries:
+                plan['hosts'].append(SITES[name]['host'])
+            continue
+
+        old = previous_files[name]
+        changed = [u for u, entry in entries.items() if u in old and old[u][2] != entry[2]]
+        changed += [u for u in old if u not in entries]
+        # index.html is also served as its directory URL
+        changed += [u[:-len('index.html')] for u in changed if u.endswith('/index.html')]
+
+        if len(changed) > HOST_PURGE_THRESHOLD:
+            plan['hosts'].append(SITES[name]['host'])
+        else:
+            plan['files'].extend(site_url(name, u) for u in sorted(changed))
+
+    return plan
+
+def apply_purge(client, plan, zone_id=None):
+    """Send the purge plan in batches; returns True if every call succeeded"""
+    ok = True
+    bodies = [{'hosts': plan['hosts'][i:i + PURGE_BATCH_SIZE]}
+              for i in range(0, len(plan['hosts']), PURGE_BATCH_SIZE)]
+    bodies += [{'files': plan['files'][i:i + PURGE_BATCH_SIZE]}
+               for i in range(0, len(plan['files']), PURGE_BATCH_SIZE)]
+
+    for body in bodies:
+        response = client.zone_request('POST', 'purge_cache', zone_id=zone_id, data=body)
+        result = api_result(response)
+        if not result.get('success'):
+            print(f"{Colors.YELLOW}⚠️  Cache purge: {result.get('errors', [])}{Colors.NC}")
+            ok = False
+    return ok
+
+def purge_changed(client, zone_id=None, dry_run=False, manifest_path=MANIFEST_PATH):
+    """
+    Plan and apply a targeted purge, then persist the new manifest
+    The manifest is only saved after a successful purge so failed URLs are
+    retried on the next run. Returns (plan, ok).
+    """
+    previous = load_manifest(manifest_path)
+    current = build_manifest(previous)
+    plan = plan_purge(previous, current)
+
+    if dry_run:
+        return plan, True
+
+    ok = apply_purge(client, plan, zone_id)
+    if ok:
+        current['last_purged'] = plan
+        save_manifest(current, manifest_path)
+    return plan, ok
+
+def print_purge_plan(plan):
+    """Print the purge plan"""
+    for host in plan['hosts']:
+        print(f"  {Colors.YELLOW}*{Colors.NC} {host} (whole host)")
+    for url in plan['files']:
+        print(f"  {Colors.YELLOW}-{Colors.NC} {url}")
+    if not plan['hosts'] and not plan['files']:
+        print(f"  {Colors.GREEN}✓{Colors.NC} No changed assets, nothing to purge")
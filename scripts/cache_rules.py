@@ -0,0 +1,183 @@
+"""
+Cloudflare cache rules generated from the build output
+Walks each site's build directories, splits content-hashed assets from
+mutable files, and reconciles the zone's cache rules ruleset: long edge and
+browser TTLs for hashed assets, a shorter edge TTL for other static files,
+and no caching for the API
+"""
+
+from pathlib import PurePosixPath
+
+from cloudflare_client import Colors, api_result
+from site_builds import SITES, iter_site_files
+
+CACHE_PHASE = 'http_request_cache_settings'
+RULESET_PATH = f'rulesets/phases/{CACHE_PHASE}/entrypoint'
+
+# Rules this tool owns carry one of these refs; any other rule is left alone
+RULE_REFS = ('currentmesh_mutable_static', 'currentmesh_immutable_assets', 'currentmesh_bypass_api')
+
+IMMUTABLE_TTL = 31536000  # 1 year
+MUTABLE_EDGE_TTL = 14400  # 4 hours, same as the zone's browser_cache_ttl
+
+BYPASS_HOSTS = ['api.currentmesh.com']
+BYPASS_PREFIXES = ['/api/']
+
+# Pages and data files stay with the origin's headers (Cloudflare does not
+# cache them by default)
+PAGE_EXTENSIONS = {'', 'html', 'htm', 'json', 'txt', 'xml', 'webmanifest', 'map'}
+
+def classify_site(name):
+    """
+    Split one site's files into immutable URL prefixes and mutable extensions
+    Only the declared bundler output prefixes are immutable; everything else
+    (e.g. public/) may change in place under the same name.
+    Returns ({prefix: file count}, {extension: file count})
+    """
+    declared = SITES[name].get('immutable', {})
+    immutable = {prefix: 0 for prefix in declared}
+    mutable = {}
+
+    for _, url_path in iter_site_files(name):
+        prefix = next((p for p in declared if url_path.startswith(p)), None)
+        if prefix:
+            immutable[prefix] += 1
+            continue
+        extension = PurePosixPath(url_path).suffix.lstrip('.').lower()
+        if extension not in PAGE_EXTENSIONS:
+            mutable[extension] = mutable.get(extension, 0) + 1
+    return immutable, mutable
+
+def classify_sites(sites=SITES):
+    """classify_site() for every site, keyed by host"""
+    return {SITES[name]['host']: classify_site(name) for name in sites}
+
+def _hosts(hosts):
+    hosts = sorted(hosts)
+    if len(hosts) == 1:
+        return f'http.host eq "{hosts[0]}"'
+    return 'http.host in {' + ' '.join(f'"{host}"' for host in hosts) + '}'
+
+def _starts_with(prefix):
+    return f'starts_with(http.request.uri.path, "{prefix}")'
+
+def build_rules(classification):
+    """
+    Desired cache rules from classify_sites() output
+    Later rules override earlier ones in the cache phase, so the order is
+    mutable static files, then immutable assets, then the API bypass
+    """
+    rules = []
+
+    hosts_by_ext = {}
+    for host, (_, mutable) in classification.items():
+        for extension in mutable:
+            hosts_by_ext.setdefault(extension, set()).add(host)
+    if hosts_by_ext:
+        hosts = set().union(*hosts_by_ext.values())
+        extensions = ' '.join(f'"{ext}"' for ext in sorted(hosts_by_ext))
+        rules.append({
+            'ref': 'currentmesh_mutable_static',
+            'description': 'Static files without a content hash: cache at the edge, purged on deploy',
+            'expression': f'({_hosts(hosts)} and http.request.uri.path.extension in {{{extensions}}})',
+            'action': 'set_cache_settings',
+            'action_parameters': {
+                'cache': True,
+                'edge_ttl': {'mode': 'override_origin', 'default': MUTABLE_EDGE_TTL},
+                'browser_ttl': {'mode': 'respect_origin'},
+            },
+            'enabled': True,
+        })
+
+    hosts_by_prefix = {}
+    for host, (immutable, _) in classification.items():
+        for prefix in immutable:
+            hosts_by_prefix.setdefault(prefix, set()).add(host)
+    if hosts_by_prefix:
+        clauses = [f'({_hosts(hosts)} and {_starts_with(prefix)})'
+                   for prefix, hosts in sorted(hosts_by_prefix.items())]
+        rules.append({
+            'ref': 'currentmesh_immutable_assets',
+            'description': 'Content-hashed build assets: cache for a year at the edge and in browsers',
+            'expression': ' or '.join(clauses),
+            'action': 'set_cache_settings',
+            'action_parameters': {
+                'cache': True,
+                'edge_ttl': {'mode': 'override_origin', 'default': IMMUTABLE_TTL},
+                'browser_ttl': {'mode': 'override_origin', 'default': IMMUTABLE_TTL},
+            },
+            'enabled': True,
+        })
+
+    clauses = [f'({_hosts(BYPASS_HOSTS)})'] + [f'{_starts_with(prefix)}' for prefix in BYPASS_PREFIXES]
+    rules.append({
+        'ref': 'currentmesh_bypass_api',
+        'description': 'API responses are per-user: never cache',
+        'expression': ' or '.join(clauses),
+        'action': 'set_cache_settings',
+        'action_parameters': {'cache': False},
+        'enabled': True,
+    })
+    return rules
+
+def get_cache_ruleset(client, zone_id=None):
+    """
+    Current rules in the zone's cache rules entrypoint
+    Returns (rules, errors); a zone without the entrypoint yet has no rules
+    """
+    response = client.zone_request('GET', RULESET_PATH, zone_id=zone_id)
+    if response.status_code == 404:
+        return [], []
+    result = api_result(response)
+    if not result.get('success'):
+        return None, result.get('errors', [])
+    return result.get('result', {}).get('rules', []), []
+
+def _comparable(rule):
+    return {key: rule.get(key) for key in ('expression', 'action', 'action_parameters', 'description', 'enabled')}
+
+def plan_rules(current, desired):
+    """
+    Diff the owned rules; returns a list of (ref, 'add' | 'update' | 'remove')
+    Rules without one of our refs are never touched
+    """
+    ours = {rule.get('ref'): rule for rule in current if rule.get('ref') in RULE_REFS}
+    wanted = {rule['ref']: rule for rule in desired}
+    changes = []
+    for ref, rule in wanted.items():
+        if ref not in ours:
+            changes.append((ref, 'add'))
+        elif _comparable(ours[ref]) != _comparable(rule):
+            changes.append((ref, 'update'))
+    changes += [(ref, 'remove') for ref in ours if ref not in wanted]
+    return changes
+
+def apply_rules(client, current, desired, zone_id=None):
+    """
+    Replace the owned rules in one PUT of the entrypoint, keeping every other
+    rule (and its position ahead of ours). Returns (ok, errors).
+    """
+    keep = ('id', 'ref', 'expression', 'action', 'action_parameters', 'description', 'enabled')
+    foreign = [{key: rule[key] for key in keep if key in rule}
+               for rule in current if rule.get('ref') not in RULE_REFS]
+    response = client.zone_request('PUT', RULESET_PATH, zone_id=zone_id, data={'rules': foreign + desired})
+    result = api_result(response)
+    return bool(result.get('success')), result.get('errors', [])
+
+def print_classification(classification):
+    """Summarize what the build walk found per host"""
+    for host, (immutable, mutable) in classification.items():
+        hashed = ', '.join(f'{prefix} ({count})' for prefix, count in sorted(immutable.items())) or 'none'
+        other = ', '.join(f'.{ext} ({count})' for ext, count in sorted(mutable.items())) or 'none'
+        print(f"  {host}: immutable {hashed}; mutable static {other}")
+
+def print_rules_plan(changes, desired):
+    """Print the rule diff"""
+    by_ref = {rule['ref']: rule for rule in desired}
+    symbols = {'add': f'{Colors.GREEN}+', 'update': f'{Colors.YELLOW}~', 'remove': f'{Colors.RED}-'}
+    for ref, change in changes:
+        print(f"  {symbols[change]}{Colors.NC} {ref}")
+        if ref in by_ref:
+            print(f"      {by_ref[ref]['expression']}")
+    if not changes:
+        print(f"  {Colors.GREEN}✓{Colors.NC} Cache rules match the build output")
@@ -1,12 +1,13 @@
 #!/bin/bash
 # Automated Log Cleanup Script
-# Prevents disk space issues by cleaning old logs
+# Prevents disk space issues by compacting old logs into the budgeted,
+# searchable archive (see log-compact.py) instead of deleting them
 
 set -e
 
 PROJECT_ROOT="/var/www/currentmesh"
 LOG_DIR="$PROJECT_ROOT/logs"
-DAYS_TO_KEEP=7
+LOG_BUDGET="${LOG_BUDGET:-2G}"
 
 log() {
     echo "[$(date '+%Y-%m-%d %H:%M:%S')] $1"
@@ -14,12 +15,8 @@ log() {
 
 log "🧹 Starting log cleanup..."
 
-# Clean old log files
-find "$LOG_DIR" -name "*.log" -type f -mtime +$DAYS_TO_KEEP -delete
-find "$LOG_DIR" -name "*.log.*" -type f -mtime +$DAYS_TO_KEEP -delete
-
-# Clean PM2 old logs (keep last 1000 lines per service)
-pm2 flush 2>/dev/null || true
+# Rotate, compress and thin logs down to the budget
+python3 "$PROJECT_ROOT/scripts/log-compact.py" --log-dir "$LOG_DIR" --budget "$LOG_BUDGET"
 
 # Clean tmp directory
 find "$PROJECT_ROOT/tmp" -name "*.json" -type f -mtime +7 -delete 2>/dev/null || true
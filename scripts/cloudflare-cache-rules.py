@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Cloudflare Cache Rules from Build Output
+Classifies every site's build files into content-hashed and mutable assets
+and reconciles the zone's cache rules to match
+"""
+
+import argparse
+import sys
+
+from cache_rules import (apply_rules, build_rules, classify_sites, get_cache_ruleset, plan_rules,
+                         print_classification, print_rules_plan)
+from cloudflare_client import Colors, get_client
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate and apply Cloudflare cache rules from the build output')
+    parser.add_argument('--plan', action='store_true', help='Print the rule diff without applying it')
+    args = parser.parse_args()
+
+    print(f"{Colors.BLUE}=== Cloudflare Cache Rules ==={Colors.NC}\n")
+
+    print(f"{Colors.BLUE}Build output:{Colors.NC}")
+    classification = classify_sites()
+    print_classification(classification)
+    desired = build_rules(classification)
+
+    client = get_client()
+    current, errors = get_cache_ruleset(client)
+    if current is None:
+        print(f"{Colors.RED}❌ Could not read cache rules: {errors}{Colors.NC}")
+        print(f"{Colors.YELLOW}The API token needs Zone > Cache Rules > Edit.{Colors.NC}")
+        sys.exit(1)
+
+    changes = plan_rules(current, desired)
+    print(f"\n{Colors.BLUE}📋 Cache rules plan ({len(changes)} to change):{Colors.NC}")
+    print_rules_plan(changes, desired)
+
+    if args.plan:
+        print(f"\n{Colors.YELLOW}Plan mode: nothing applied.{Colors.NC}")
+        return
+    if not changes:
+        return
+
+    ok, errors = apply_rules(client, current, desired)
+    if not ok:
+        print(f"\n{Colors.RED}❌ Cache rules update failed: {errors}{Colors.NC}")
+        sys.exit(1)
+    print(f"\n{Colors.GREEN}✅ Cache rules updated{Colors.NC}")
+
+if __name__ == '__main__':
+    main()
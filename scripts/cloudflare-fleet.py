@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Cloudflare Fleet Configuration
+Applies the settings profile to every zone on the account (or the ones named
+with --zone) concurrently, then prints a per-zone table. --dns also points
+the currentmesh subdomains at SERVER_IP in each zone, without deleting any
+records
+"""
+
+import argparse
+import sys
+import time
+
+import requests
+
+from cloudflare_client import Colors, load_env
+from cloudflare_dns import DEFAULT_SUBDOMAINS
+from cloudflare_fleet import FLEET_WORKERS, fleet_client, list_zones, print_fleet_table, run_fleet, zone_ok
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconcile settings and DNS across all Cloudflare zones')
+    parser.add_argument('--plan', action='store_true', help='Report what would change without applying it')
+    parser.add_argument('--zone', action='append', default=[], help='Only this zone name (repeatable)')
+    parser.add_argument('--workers', type=int, default=FLEET_WORKERS, help='Zones processed at once')
+    parser.add_argument('--server-ip', help='Origin IP for the DNS records (default: SERVER_IP)')
+    parser.add_argument('--subdomain', action='append', default=[],
+                        help='Extra subdomain to manage in every zone; may be repeated')
+    parser.add_argument('--no-settings', action='store_true', help='Skip the settings profile')
+    parser.add_argument('--dns', action='store_true',
+                        help='Also create/update the currentmesh DNS records in every selected zone')
+    args = parser.parse_args()
+
+    print(f"{Colors.BLUE}=== Cloudflare Fleet Configuration ==={Colors.NC}\n")
+
+    env = load_env()
+    server_ip = args.server_ip or env.get('SERVER_IP')
+    if args.dns and not server_ip:
+        print(f"{Colors.RED}Error: SERVER_IP not found (needed for --dns){Colors.NC}")
+        sys.exit(1)
+
+    client = fleet_client(args.workers, use_global_key=bool(env.get('CLOUDFLARE_GLOBAL_API_KEY')))
+    started = time.monotonic()
+    try:
+        zones = list_zones(client, env.get('CLOUDFLARE_ACCOUNT_ID'), set(args.zone) or None)
+    except (RuntimeError, requests.RequestException) as e:
+        print(f"{Colors.RED}{e}{Colors.NC}")
+        sys.exit(1)
+    if not zones:
+        print(f"{Colors.YELLOW}No matching active zones found{Colors.NC}")
+        sys.exit(1)
+
+    print(f"{Colors.BLUE}Reconciling {len(zones)} zone(s) with up to {args.workers} worker(s)...{Colors.NC}")
+    if args.dns:
+        print(f"{Colors.YELLOW}DNS: {', '.join(DEFAULT_SUBDOMAINS + args.subdomain)} -> {server_ip} in "
+              f"{', '.join(zone['name'] for zone in zones)}{Colors.NC}")
+    print()
+    results = run_fleet(client, zones, args.workers, server_ip=server_ip,
+                        subdomains=DEFAULT_SUBDOMAINS + args.subdomain,
+                        settings=not args.no_settings, dns=args.dns, dry_run=args.plan)
+
+    print_fleet_table(results, args.plan)
+    failed = [r for r in results if not zone_ok(r)]
+    print(f"\n{Colors.BLUE}{len(results) - len(failed)}/{len(results)} zone(s) ok in "
+          f"{time.monotonic() - started:.1f}s{Colors.NC}")
+    if args.plan:
+        print(f"{Colors.YELLOW}Plan mode: no changes applied.{Colors.NC}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Cloudflare Edge Cache Pre-warm
+Fetches the hot URL set through the proxied hostnames after a purge or deploy
+"""
+
+import argparse
+import sys
+
+from cache_prewarm import (CONCURRENCY, Prewarmer, print_report, urls_from_access_log,
+                           urls_from_manifest, urls_from_sitemap, warmable)
+from cloudflare_client import Colors
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-warm the Cloudflare edge cache')
+    parser.add_argument('--sitemap', action='append', default=[], help='Sitemap URL to read (may be repeated)')
+    parser.add_argument('--access-log', help='nginx access log to take the most requested paths from')
+    parser.add_argument('--log-host', default='currentmesh.com', help='Hostname the access log paths belong to')
+    parser.add_argument('--no-manifest', action='store_true', help='Skip URLs from the last purge manifest')
+    parser.add_argument('--target', help='Send requests here with the original Host header (e.g. http://127.0.0.1)')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    args = parser.parse_args()
+
+    print(f"{Colors.BLUE}=== Cloudflare Cache Pre-warm ==={Colors.NC}\n")
+
+    prewarmer = Prewarmer(target=args.target, concurrency=args.concurrency)
+
+    urls = []
+    if not args.no_manifest:
+        urls += urls_from_manifest()
+    for sitemap in args.sitemap:
+        urls += urls_from_sitemap(prewarmer.session, sitemap)
+    if args.access_log:
+        urls += urls_from_access_log(args.access_log, args.log_host)
+
+    # Keep first-seen order, drop duplicates and dynamic routes
+    urls = [url for url in dict.fromkeys(urls) if warmable(url)]
+    if not urls:
+        print(f"{Colors.YELLOW}No URLs to warm.{Colors.NC}")
+        return
+
+    print(f"{Colors.BLUE}Warming {len(urls)} URL(s) with concurrency {args.concurrency}...{Colors.NC}\n")
+    before, after = prewarmer.run(urls)
+    print_report(before, after)
+
+    if any(code == 0 or code >= 500 for _, code, _ in after):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Cloudflare Targeted Cache Purge
+Purges only the build assets that changed since the previous deploy
+"""
+
+import argparse
+import sys
+
+from cache_purge import build_manifest, load_manifest, print_purge_plan, purge_changed, save_manifest
+from cache_prewarm import Prewarmer, print_report, urls_from_manifest, warmable
+from cloudflare_client import Colors, api_result, get_client
+
+def main():
+    parser = argparse.ArgumentParser(description='Purge changed build assets from the Cloudflare cache')
+    parser.add_argument('--plan', action='store_true', help='Print the URLs that would be purged without purging')
+    parser.add_argument('--everything', action='store_true', help='Purge the whole zone (last resort)')
+    parser.add_argument('--prewarm', action='store_true', help='Re-fetch the purged URLs through the edge afterwards')
+    args = parser.parse_args()
+    
+    print(f"{Colors.BLUE}=== Cloudflare Cache Purge ==={Colors.NC}\n")
+    
+    client = get_client()
+    
+    if args.everything:
+        print(f"{Colors.YELLOW}Purging everything, all hostnames will start cold...{Colors.NC}")
+        result = api_result(client.zone_request('POST', 'purge_cache', data={'purge_everything': True}))
+        if not result.get('success'):
+            print(f"{Colors.RED}❌ Cache purge: {result.get('errors', [])}{Colors.NC}")
+            sys.exit(1)
+        # Everything is cold now, so the current build becomes the baseline
+        save_manifest(build_manifest(load_manifest()))
+        print(f"{Colors.GREEN}✅ Cache purged successfully{Colors.NC}")
+        return
+    
+    plan, ok = purge_changed(client, dry_run=args.plan)
+    print(f"{Colors.BLUE}Purge plan ({len(plan['files'])} URL(s), {len(plan['hosts'])} host(s)):{Colors.NC}")
+    print_purge_plan(plan)
+    
+    if args.plan:
+        print(f"\n{Colors.YELLOW}Plan mode: nothing purged.{Colors.NC}")
+    elif ok:
+        print(f"\n{Colors.GREEN}✅ Cache purged successfully{Colors.NC}")
+        if args.prewarm:
+            urls = [url for url in urls_from_manifest() if warmable(url)]
+            if urls:
+                print(f"\n{Colors.BLUE}Pre-warming {len(urls)} URL(s)...{Colors.NC}")
+                print_report(*Prewarmer().run(urls))
+    else:
+        print(f"\n{Colors.RED}❌ Some purge requests failed; they will be retried on the next run{Colors.NC}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
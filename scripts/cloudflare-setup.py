@@ -2,95 +2,24 @@
 """
 Cloudflare DNS Configuration Script for CurrentMesh
 Sets up DNS records for all CurrentMesh subdomains
+The zone is listed once and only drifted records are written (see cloudflare_dns.py)
 """
 
-import os
+import argparse
 import sys
-import json
-import requests
-from pathlib import Path
 
-# Colors for terminal output
-class Colors:
-    GREEN = '\033[0;32m'
-    BLUE = '\033[0;34m'
-    RED = '\033[0;31m'
-    YELLOW = '\033[1;33m'
-    NC = '\033[0m'  # No Color
-
-def load_env():
-    """Load environment variables from .cloudflare/.env file"""
-    env_path = Path(__file__).parent.parent / '.cloudflare' / '.env'
-    
-    if not env_path.exists():
-        print(f"{Colors.RED}Error: .cloudflare/.env file not found!{Colors.NC}")
-        print("Please create .cloudflare/.env with your Cloudflare credentials")
-        print("See .cloudflare/README.md for instructions")
-        sys.exit(1)
-    
-    env_vars = {}
-    with open(env_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#') and '=' in line:
-                key, value = line.split('=', 1)
-                env_vars[key.strip()] = value.strip()
-    
-    return env_vars
-
-def create_dns_record(api_token, zone_id, name, record_type, content, proxied=True):
-    """Create or update a DNS record"""
-    headers = {
-        'Authorization': f'Bearer {api_token}',
-        'Content-Type': 'application/json'
-    }
-    
-    # Check if record exists
-    url = f'https://api.cloudflare.com/client/v4/zones/{zone_id}/dns_records'
-    params = {'name': name}
-    response = requests.get(url, headers=headers, params=params)
-    
-    if response.status_code != 200:
-        print(f"{Colors.RED}Error checking existing records: {response.text}{Colors.NC}")
-        return False
-    
-    data = response.json()
-    existing_records = data.get('result', [])
-    
-    record_data = {
-        'type': record_type,
-        'name': name,
-        'content': content,
-        'ttl': 1,  # Auto TTL
-        'proxied': proxied
-    }
-    
-    if existing_records:
-        # Update existing record
-        record_id = existing_records[0]['id']
-        print(f"{Colors.YELLOW}Record exists, updating: {name}{Colors.NC}")
-        url = f'https://api.cloudflare.com/client/v4/zones/{zone_id}/dns_records/{record_id}'
-        response = requests.patch(url, headers=headers, json=record_data)
-    else:
-        # Create new record
-        print(f"{Colors.GREEN}Creating new record: {name}{Colors.NC}")
-        url = f'https://api.cloudflare.com/client/v4/zones/{zone_id}/dns_records'
-        response = requests.post(url, headers=headers, json=record_data)
-    
-    if response.status_code in [200, 201]:
-        result = response.json()
-        if result.get('success'):
-            print(f"{Colors.GREEN}  ✅ Success!{Colors.NC}\n")
-            return True
-        else:
-            errors = result.get('errors', [])
-            print(f"{Colors.RED}  ❌ Error: {errors}{Colors.NC}\n")
-            return False
-    else:
-        print(f"{Colors.RED}  ❌ Error: {response.status_code} - {response.text}{Colors.NC}\n")
-        return False
+from cloudflare_client import Colors, get_client, load_env
+from cloudflare_dns import (DEFAULT_SUBDOMAINS, apply_dns_changes, desired_records,
+                            list_dns_records, plan_dns_changes, print_dns_plan)
 
 def main():
+    parser = argparse.ArgumentParser(description='Reconcile CurrentMesh DNS records in Cloudflare')
+    parser.add_argument('--plan', action='store_true', help='Print the DNS diff without applying it')
+    parser.add_argument('--refresh', action='store_true', help='Ignore the local zone snapshot in plan mode')
+    parser.add_argument('--subdomain', action='append', default=[],
+                        help='Extra subdomain to manage (e.g. a tenant); may be repeated')
+    args = parser.parse_args()
+    
     print(f"{Colors.BLUE}=== CurrentMesh Cloudflare DNS Setup ==={Colors.NC}\n")
     
     # Load environment variables
@@ -99,6 +28,7 @@ def main():
     api_token = env.get('CLOUDFLARE_API_TOKEN')
     zone_id = env.get('CLOUDFLARE_ZONE_ID')
     server_ip = env.get('SERVER_IP')
+    domain = env.get('CLOUDFLARE_DOMAIN', 'currentmesh.com')
     
     # Validate required variables
     if not api_token or not zone_id or not server_ip:
@@ -106,35 +36,50 @@ def main():
         print("Required: CLOUDFLARE_API_TOKEN, CLOUDFLARE_ZONE_ID, SERVER_IP")
         sys.exit(1)
     
-    print(f"{Colors.BLUE}Creating DNS records...{Colors.NC}\n")
+    client = get_client()
+    
+    # API proxied for Cloudflare SSL, same as the web hostnames
+    records = desired_records(domain, server_ip, DEFAULT_SUBDOMAINS + args.subdomain)
     
-    # Create DNS records
-    records = [
-        ('currentmesh.com', 'A', server_ip, True),
-        ('www.currentmesh.com', 'A', server_ip, True),
-        ('app.currentmesh.com', 'A', server_ip, True),
-        ('client.currentmesh.com', 'A', server_ip, True),
-        ('admin.currentmesh.com', 'A', server_ip, True),
-        ('api.currentmesh.com', 'A', server_ip, True),  # API proxied for Cloudflare SSL
-    ]
+    # One paged listing of the zone instead of a lookup per hostname
+    print(f"{Colors.BLUE}Reading existing DNS records...{Colors.NC}")
+    try:
+        existing = list_dns_records(client, cached=args.plan and not args.refresh)
+    except RuntimeError as e:
+        print(f"{Colors.RED}{e}{Colors.NC}")
+        sys.exit(1)
+    
+    plan = plan_dns_changes(existing, records)
+    changes = len(plan['posts']) + len(plan['patches']) + len(plan['deletes'])
+    print(f"{Colors.BLUE}DNS plan ({changes} change(s), {len(existing)} existing record(s)):{Colors.NC}")
+    print_dns_plan(plan)
+    print()
     
-    success_count = 0
-    for name, record_type, content, proxied in records:
-        if create_dns_record(api_token, zone_id, name, record_type, content, proxied):
-            success_count += 1
+    if args.plan:
+        print(f"{Colors.YELLOW}Plan mode: no changes applied.{Colors.NC}")
+        return
     
+    failed = []
+    if changes:
+        print(f"{Colors.BLUE}Applying DNS changes...{Colors.NC}\n")
+        failed = apply_dns_changes(client, plan)
+    
+    # A failed write (including removing a duplicate) leaves that name unconfigured
+    failed_keys = {(record['name'], record['type']) for _, record in failed}
+    ok = [record for record in records if (record['name'], record['type']) not in failed_keys]
     print(f"{Colors.GREEN}=== DNS Setup Complete! ==={Colors.NC}\n")
-    print(f"Successfully configured {success_count}/{len(records)} DNS records:")
-    print(f"  {Colors.GREEN}✓{Colors.NC} currentmesh.com → {server_ip}")
-    print(f"  {Colors.GREEN}✓{Colors.NC} www.currentmesh.com → {server_ip}")
-    print(f"  {Colors.GREEN}✓{Colors.NC} app.currentmesh.com → {server_ip}")
-    print(f"  {Colors.GREEN}✓{Colors.NC} client.currentmesh.com → {server_ip}")
-    print(f"  {Colors.GREEN}✓{Colors.NC} admin.currentmesh.com → {server_ip}")
-    print(f"  {Colors.GREEN}✓{Colors.NC} api.currentmesh.com → {server_ip}")
+    print(f"Successfully configured {len(ok)}/{len(records)} DNS records:")
+    for record in records:
+        if (record['name'], record['type']) in failed_keys:
+            print(f"  {Colors.RED}✗{Colors.NC} {record['name']} → {record['content']}")
+        else:
+            print(f"  {Colors.GREEN}✓{Colors.NC} {record['name']} → {record['content']}")
     print()
     print(f"{Colors.YELLOW}Note:{Colors.NC} DNS propagation may take a few minutes.")
     print(f"{Colors.YELLOW}Note:{Colors.NC} SSL/TLS certificates will be automatically provisioned by Cloudflare.")
+    
+    if failed:
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
-
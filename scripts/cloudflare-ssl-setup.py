@@ -4,57 +4,25 @@ Cloudflare SSL Configuration
 Sets SSL mode to "Full" for all CurrentMesh domains
 """
 
-import os
+import argparse
 import sys
-import json
-import requests
-from pathlib import Path
 
-# Colors
-class Colors:
-    GREEN = '\033[0;32m'
-    BLUE = '\033[0;34m'
-    RED = '\033[0;31m'
-    YELLOW = '\033[1;33m'
-    NC = '\033[0m'
+import zone_cache
+from cloudflare_client import Colors, api_result, get_client, load_env
 
-def load_env():
-    """Load environment variables"""
-    env_path = Path(__file__).parent.parent / '.cloudflare' / '.env'
-    
-    if not env_path.exists():
-        print(f"{Colors.RED}Error: .cloudflare/.env file not found!{Colors.NC}")
-        sys.exit(1)
-    
-    env_vars = {}
-    with open(env_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#') and '=' in line:
-                key, value = line.split('=', 1)
-                env_vars[key.strip()] = value.strip()
-    
-    return env_vars
-
-def set_ssl_mode(api_token, zone_id, ssl_mode='full'):
+def set_ssl_mode(client, ssl_mode='full'):
     """
     Set SSL mode for the zone
     ssl_mode options: 'off', 'flexible', 'full', 'strict'
     """
-    headers = {
-        'Authorization': f'Bearer {api_token}',
-        'Content-Type': 'application/json'
-    }
-    
-    url = f'https://api.cloudflare.com/client/v4/zones/{zone_id}/settings/ssl'
-    
     data = {'value': ssl_mode}
     
-    response = requests.patch(url, headers=headers, json=data)
+    response = client.zone_request('PATCH', 'settings/ssl', data=data)
     
     if response.status_code == 200:
-        result = response.json()
+        result = api_result(response)
         if result.get('success'):
+            zone_cache.update(client.zone_id, 'settings', [{'id': 'ssl', 'value': ssl_mode}])
             print(f"{Colors.GREEN}✅ SSL mode set to '{ssl_mode}'{Colors.NC}")
             return True
         else:
@@ -65,23 +33,28 @@ def set_ssl_mode(api_token, zone_id, ssl_mode='full'):
         print(f"{Colors.RED}❌ Error: {response.status_code} - {response.text}{Colors.NC}")
         return False
 
-def get_ssl_mode(api_token, zone_id):
-    """Get current SSL mode"""
-    headers = {
-        'Authorization': f'Bearer {api_token}',
-        'Content-Type': 'application/json'
-    }
-    
-    url = f'https://api.cloudflare.com/client/v4/zones/{zone_id}/settings/ssl'
-    response = requests.get(url, headers=headers)
+def get_ssl_mode(client, cached=False):
+    """Get current SSL mode, from a fresh zone snapshot if cached=True"""
+    if cached:
+        for item in zone_cache.get(client.zone_id, 'settings') or []:
+            if item['id'] == 'ssl':
+                return item['value']
+
+    response = client.zone_request('GET', 'settings/ssl')
     
     if response.status_code == 200:
-        result = response.json()
+        result = api_result(response)
         if result.get('success'):
+            zone_cache.update(client.zone_id, 'settings', [result['result']])
             return result['result']['value']
     return None
 
 def main():
+    parser = argparse.ArgumentParser(description='Set the Cloudflare SSL mode to Full')
+    parser.add_argument('--status', action='store_true', help='Only print the current SSL mode')
+    parser.add_argument('--refresh', action='store_true', help='Ignore the local zone snapshot for --status')
+    args = parser.parse_args()
+    
     print(f"{Colors.BLUE}=== Cloudflare SSL Configuration ==={Colors.NC}\n")
     
     # Load environment
@@ -93,10 +66,14 @@ def main():
         print(f"{Colors.RED}Error: Missing API token or Zone ID{Colors.NC}")
         sys.exit(1)
     
+    client = get_client()
+    
     # Get current SSL mode
-    current_mode = get_ssl_mode(api_token, zone_id)
+    current_mode = get_ssl_mode(client, cached=args.status and not args.refresh)
     if current_mode:
         print(f"{Colors.YELLOW}Current SSL mode: {current_mode}{Colors.NC}\n")
+    if args.status:
+        sys.exit(0 if current_mode else 1)
     
     # Set SSL mode to "full"
     # Options: 'off', 'flexible', 'full', 'strict'
@@ -105,7 +82,7 @@ def main():
     print(f"{Colors.BLUE}Setting SSL mode to 'full'...{Colors.NC}")
     print(f"{Colors.YELLOW}Note: 'full' mode allows HTTP on origin (Cloudflare handles SSL){Colors.NC}\n")
     
-    if set_ssl_mode(api_token, zone_id, 'full'):
+    if set_ssl_mode(client, 'full'):
         print(f"\n{Colors.GREEN}=== SSL Configuration Complete! ==={Colors.NC}\n")
         print(f"{Colors.BLUE}SSL Mode: Full{Colors.NC}")
         print(f"{Colors.GREEN}✅ Cloudflare terminates SSL (visitor → Cloudflare is HTTPS){Colors.NC}")
@@ -0,0 +1,273 @@
+"""
+Shared Cloudflare API client
+Loads .cloudflare/.env once and reuses a single keep-alive session for every call
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import api_trace
+from term_colors import Colors
+
+# Both can be pointed elsewhere, e.g. at cloudflare_mock.py for benchmarks
+API_BASE = os.getenv('CLOUDFLARE_API_BASE', 'https://api.cloudflare.com/client/v4')
+STATE_DIR = Path(os.getenv('CLOUDFLARE_STATE_DIR') or Path(__file__).parent.parent / '.cloudflare')
+ENV_PATH = STATE_DIR / '.env'
+
+# Enough pooled connections for the concurrent callers (DNS batches, fleet mode)
+POOL_SIZE = 16
+REQUEST_TIMEOUT = 30  # seconds
+
+# Cloudflare's global API budget: 1200 requests per 5 minutes per user
+RATE_LIMIT_REQUESTS = 1200
+RATE_LIMIT_WINDOW = 300  # seconds
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_CAP = 30  # seconds
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Every PATCH these scripts send sets absolute values, so replaying one is safe
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'PATCH', 'DELETE'}
+
+_env_cache = None
+_clients = {}
+_clients_lock = threading.Lock()
+
+def load_env():
+    """Load environment variables from .cloudflare/.env file (parsed once per process)"""
+    global _env_cache
+    if _env_cache is not None:
+        return _env_cache
+
+    if not ENV_PATH.exists():
+        print(f"{Colors.RED}Error: .cloudflare/.env file not found!{Colors.NC}")
+        print("Please create .cloudflare/.env with your Cloudflare credentials")
+        print("See .cloudflare/README.md for instructions")
+        sys.exit(1)
+
+    env_vars = {}
+    with open(ENV_PATH, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and '=' in line:
+                key, value = line.split('=', 1)
+                env_vars[key.strip()] = value.strip()
+
+    _env_cache = env_vars
+    return _env_cache
+
+def get_cloudflare_email():
+    """Get Cloudflare account email from the environment, .cloudflare/.env or a prompt"""
+    env = load_env()
+    email = os.getenv('CLOUDFLARE_EMAIL') or env.get('CLOUDFLARE_EMAIL')
+    if not email:
+        print(f"{Colors.YELLOW}Cloudflare email not found in environment.{Colors.NC}")
+        print(f"{Colors.BLUE}Please provide your Cloudflare account email:{Colors.NC}")
+        email = input("Email: ").strip()
+        if email:
+            with open(ENV_PATH, 'a') as f:
+                f.write(f"\nCLOUDFLARE_EMAIL={email}\n")
+            env['CLOUDFLARE_EMAIL'] = email
+            print(f"{Colors.GREEN}✅ Email saved to .cloudflare/.env{Colors.NC}")
+    return email
+
+def auth_headers(use_global_key=False):
+    """Build Cloudflare auth headers from the API token or the Global API Key + email"""
+    env = load_env()
+
+    if use_global_key:
+        email = get_cloudflare_email()
+        global_key = env.get('CLOUDFLARE_GLOBAL_API_KEY')
+        if not global_key:
+            print(f"{Colors.RED}Error: CLOUDFLARE_GLOBAL_API_KEY not found{Colors.NC}")
+            sys.exit(1)
+        return {
+            'X-Auth-Email': email,
+            'X-Auth-Key': global_key,
+            'Content-Type': 'application/json'
+        }
+
+    api_token = env.get('CLOUDFLARE_API_TOKEN')
+    if not api_token:
+        print(f"{Colors.RED}Error: CLOUDFLARE_API_TOKEN not found{Colors.NC}")
+        sys.exit(1)
+    return {
+        'Authorization': f'Bearer {api_token}',
+        'Content-Type': 'application/json'
+    }
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by every client in the process
+    Refills at the API's sustained rate and is clamped to the remaining budget
+    the API reports, so bulk jobs run at the highest allowed throughput
+    """
+
+    def __init__(self, capacity=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def observe(self, remaining=None, reset=None):
+        """Sync the bucket with the budget reported by the API"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+            if reset is not None and remaining == 0:
+                self.paused_until = max(self.paused_until, now + reset)
+
+    def pause(self, seconds):
+        """Stop every caller from sending for the given number of seconds"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+def parse_rate_limit(headers):
+    """
+    Read (remaining, reset seconds) from Cloudflare rate limit headers
+    Handles the structured `Ratelimit: "default";r=50;t=30` form and the
+    older X-RateLimit-* pair; returns (None, None) when neither is present
+    """
+    value = headers.get('Ratelimit')
+    if value:
+        fields = dict(part.split('=', 1) for part in value.split(';') if '=' in part)
+        try:
+            return int(fields['r']), int(fields.get('t', 0))
+        except (KeyError, ValueError):
+            return None, None
+
+    remaining = headers.get('X-RateLimit-Remaining')
+    if remaining is not None and remaining.isdigit():
+        reset = headers.get('X-RateLimit-Reset')
+        return int(remaining), int(reset) if reset and reset.isdigit() else None
+    return None, None
+
+def retry_after(headers):
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds"""
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given retry attempt"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def api_result(response):
+    """Decode an API response, turning non-JSON bodies into a failed result"""
+    try:
+        return response.json()
+    except ValueError:
+        return {
+            'success': False,
+            'errors': [{'code': response.status_code, 'message': response.text[:200]}]
+        }
+
+rate_limiter = RateLimiter()
+
+class CloudflareClient:
+    """Keep-alive Cloudflare v4 API client with auth headers and zone ID resolved once"""
+
+    def __init__(self, use_global_key=False, zone_id=None, pool_size=POOL_SIZE, limiter=None):
+        self.zone_id = zone_id or load_env().get('CLOUDFLARE_ZONE_ID')
+        self.limiter = limiter or rate_limiter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(auth_headers(use_global_key))
+
+    def zone_path(self, endpoint, zone_id=None):
+        """Return the API path for an endpoint under the given (or default) zone"""
+        zone_id = zone_id or self.zone_id
+        if not zone_id:
+            print(f"{Colors.RED}Error: CLOUDFLARE_ZONE_ID not found{Colors.NC}")
+            sys.exit(1)
+        return f'zones/{zone_id}/{endpoint}'
+
+    def request(self, method, path, params=None, data=None):
+        """
+        Send a request to the API and return the raw response
+        Every attempt waits for the shared rate budget. 429s are always retried
+        (the API did not act on them); 5xx, connection errors and timeouts are
+        retried only for idempotent methods. Retry-After wins over jittered backoff.
+        The call is traced once, with its total time and retry count.
+        """
+        url = f'{API_BASE}/{path.lstrip("/")}'
+        method = method.upper()
+        attempt = 0
+        started = time.monotonic()
+        while True:
+            self.limiter.acquire()
+            try:
+                response = self.session.request(method, url, params=params, json=data, timeout=REQUEST_TIMEOUT)
+            except requests.RequestException as e:
+                transient = isinstance(e, (requests.ConnectionError, requests.Timeout))
+                if not transient or method not in IDEMPOTENT_METHODS or attempt >= MAX_RETRIES:
+                    api_trace.record('cloudflare', method, path, None, time.monotonic() - started, attempt,
+                                     error=type(e).__name__)
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            self.limiter.observe(*parse_rate_limit(response.headers))
+
+            retryable = response.status_code == 429 or \
+                (response.status_code in RETRY_STATUS and method in IDEMPOTENT_METHODS)
+            if not retryable or attempt >= MAX_RETRIES:
+                api_trace.record('cloudflare', method, path, response.status_code, time.monotonic() - started, attempt)
+                return response
+
+            delay = retry_after(response.headers)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            if response.status_code == 429:
+                # Back off every worker, not just this one
+                self.limiter.pause(delay)
+            print(f"{Colors.YELLOW}⚠️  {method} {path}: HTTP {response.status_code}, retrying in {delay:.1f}s{Colors.NC}")
+            time.sleep(delay)
+            attempt += 1
+
+    def zone_request(self, method, endpoint, zone_id=None, params=None, data=None):
+        """Send a request to a zone-scoped endpoint and return the raw response"""
+        return self.request(method, self.zone_path(endpoint, zone_id), params=params, data=data)
+
+def get_client(use_global_key=False):
+    """Return the shared client for the given auth mode, creating it on first use"""
+    with _clients_lock:
+        if use_global_key not in _clients:
+            _clients[use_global_key] = CloudflareClient(use_global_key=use_global_key)
+        return _clients[use_global_key]
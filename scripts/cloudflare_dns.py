@@ -0,0 +1,156 @@
+"""
+Cloudflare DNS reconcile
+Lists a zone's DNS records once, indexes them by (name, type) and applies
+creates, updates and deletes in batches instead of one lookup per hostname
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import zone_cache
+from cloudflare_client import Colors, api_result
+
+PER_PAGE = 1000
+# Max changes per call to the batch DNS endpoint
+BATCH_SIZE = 200
+# Parallel single-record calls when the batch endpoint is unavailable
+MAX_WORKERS = 8
+
+DEFAULT_SUBDOMAINS = ['', 'www', 'app', 'client', 'admin', 'api']
+
+def desired_records(domain, server_ip, subdomains=DEFAULT_SUBDOMAINS, proxied=True):
+    """Build the desired A records for a domain and its subdomains"""
+    records = []
+    for sub in subdomains:
+        name = f'{sub}.{domain}' if sub else domain
+        records.append({
+            'type': 'A',
+            'name': name,
+            'content': server_ip,
+            'ttl': 1,  # Auto TTL
+            'proxied': proxied
+        })
+    return records
+
+def list_dns_records(client, zone_id=None, cached=False):
+    """
+    Page through every DNS record in the zone
+    With cached=True a snapshot younger than its TTL is used instead
+    """
+    zone_id = zone_id or client.zone_id
+    if cached:
+        records = zone_cache.get(zone_id, 'dns_records')
+        if records is not None:
+            return records
+
+    records = []
+    page = 1
+    while True:
+        response = client.zone_request('GET', 'dns_records', zone_id=zone_id,
+                                       params={'page': page, 'per_page': PER_PAGE})
+        result = api_result(response)
+        if not result.get('success'):
+            raise RuntimeError(f"Error listing DNS records: {result.get('errors', [])}")
+        records.extend(result.get('result', []))
+        info = result.get('result_info') or {}
+        if page >= info.get('total_pages', 1):
+            zone_cache.put(zone_id, 'dns_records', records)
+            return records
+        page += 1
+
+def index_records(records):
+    """Index records by (name, type); duplicates stay together in one list"""
+    index = {}
+    for record in records:
+        index.setdefault((record['name'], record['type']), []).append(record)
+    return index
+
+def plan_dns_changes(existing, desired, prune=True):
+    """
+    Diff existing records against the desired list
+    Only (name, type) keys present in the desired list are managed; extra
+    records for a managed key (duplicates) are deleted unless prune=False.
+    Returns dict with 'posts', 'patches', 'deletes' and 'unchanged'
+    """
+    index = index_records(existing)
+    plan = {'posts': [], 'patches': [], 'deletes': [], 'unchanged': []}
+
+    for record in desired:
+        matches = index.get((record['name'], record['type']), [])
+        if not matches:
+            plan['posts'].append(record)
+            continue
+
+        # Keep the record that already matches, if any, and drop the rest
+        keep = next((r for r in matches if _matches(r, record)), matches[0])
+        if _matches(keep, record):
+            plan['unchanged'].append(keep)
+        else:
+            plan['patches'].append(dict(record, id=keep['id']))
+        for extra in matches if prune else []:
+            if extra['id'] != keep['id']:
+                plan['deletes'].append({'id': extra['id'], 'name': extra['name'], 'type': extra['type']})
+
+    return plan
+
+def _matches(existing, desired):
+    if existing.get('content') != desired['content'] or existing.get('proxied') != desired['proxied']:
+        return False
+    # Proxied records always report Auto TTL
+    return desired['proxied'] or existing.get('ttl') == desired['ttl']
+
+def apply_dns_changes(client, plan, zone_id=None):
+    """
+    Apply a DNS plan through the batch endpoint, chunked to BATCH_SIZE
+    Falls back to a bounded pool of single-record calls if batching is rejected.
+    Returns the (kind, record) changes that failed.
+    """
+    ops = [('deletes', r) for r in plan['deletes']] + \
+          [('patches', r) for r in plan['patches']] + \
+          [('posts', r) for r in plan['posts']]
+    failed = []
+
+    for start in range(0, len(ops), BATCH_SIZE):
+        chunk = ops[start:start + BATCH_SIZE]
+        body = {'deletes': [], 'patches': [], 'posts': []}
+        for kind, record in chunk:
+            body[kind].append({'id': record['id']} if kind == 'deletes' else record)
+
+        response = client.zone_request('POST', 'dns_records/batch', zone_id=zone_id, data=body)
+        if response.status_code == 200 and api_result(response).get('success'):
+            continue
+
+        print(f"{Colors.YELLOW}⚠️  Batch DNS update rejected, applying {len(chunk)} change(s) individually...{Colors.NC}")
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            results = pool.map(lambda op: _apply_single(client, op, zone_id), chunk)
+            failed += [op for op, ok in zip(chunk, results) if not ok]
+
+    if ops:
+        # New records get their ids from the API; refetch on the next read
+        zone_cache.invalidate(zone_id or client.zone_id, 'dns_records')
+    return failed
+
+def _apply_single(client, op, zone_id):
+    kind, record = op
+    if kind == 'deletes':
+        response = client.zone_request('DELETE', f"dns_records/{record['id']}", zone_id=zone_id)
+    elif kind == 'patches':
+        data = {k: v for k, v in record.items() if k != 'id'}
+        response = client.zone_request('PATCH', f"dns_records/{record['id']}", zone_id=zone_id, data=data)
+    else:
+        response = client.zone_request('POST', 'dns_records', zone_id=zone_id, data=record)
+
+    if response.status_code in [200, 201] and api_result(response).get('success'):
+        return True
+    print(f"{Colors.RED}  ❌ {kind[:-1]} {record['name']}: {response.status_code} - {response.text}{Colors.NC}")
+    return False
+
+def print_dns_plan(plan):
+    """Print the DNS diff"""
+    for record in plan['posts']:
+        print(f"  {Colors.GREEN}+{Colors.NC} {record['name']} {record['type']} → {record['content']} (proxied={record['proxied']})")
+    for record in plan['patches']:
+        print(f"  {Colors.YELLOW}~{Colors.NC} {record['name']} {record['type']} → {record['content']} (proxied={record['proxied']})")
+    for record in plan['deletes']:
+        print(f"  {Colors.RED}-{Colors.NC} {record['name']} {record['type']} (duplicate {record['id']})")
+    for record in plan['unchanged']:
+        print(f"  {Colors.GREEN}✓{Colors.NC} {record['name']} {record['type']} → {record['content']}")
@@ -0,0 +1,109 @@
+"""
+Cloudflare fleet mode
+Lists every zone the credentials can see and runs the settings profile (and,
+when asked, the DNS reconcile) against each one through a bounded worker
+pool. Fleet DNS only creates and updates records, never deletes. All workers
+share one keep-alive client and the process-wide rate budget, so a fleet run
+takes about as long as its slowest zone.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from cloudflare_client import CloudflareClient, Colors, api_result
+from cloudflare_dns import DEFAULT_SUBDOMAINS, apply_dns_changes, desired_records, list_dns_records, plan_dns_changes
+from cloudflare_settings import apply_settings, diff_settings, get_zone_settings
+
+ZONES_PER_PAGE = 50  # API maximum for the zones list
+FLEET_WORKERS = 32
+
+def list_zones(client, account_id=None, names=None, status='active'):
+    """
+    Page through every zone visible to the credentials
+    Optionally restricted to one account, a status and a set of zone names
+    """
+    params = {'per_page': ZONES_PER_PAGE, 'status': status}
+    if account_id:
+        params['account.id'] = account_id
+    zones = []
+    page = 1
+    while True:
+        result = api_result(client.request('GET', 'zones', params=dict(params, page=page)))
+        if not result.get('success'):
+            raise RuntimeError(f"Error listing zones: {result.get('errors', [])}")
+        zones.extend(result.get('result', []))
+        info = result.get('result_info') or {}
+        if page >= info.get('total_pages', 1):
+            break
+        page += 1
+    if names:
+        zones = [zone for zone in zones if zone['name'] in names]
+    return zones
+
+def fleet_client(workers=FLEET_WORKERS, use_global_key=False):
+    """A client with a connection per worker, on the shared rate limiter"""
+    return CloudflareClient(use_global_key=use_global_key, pool_size=workers)
+
+def reconcile_zone(client, zone, server_ip=None, subdomains=DEFAULT_SUBDOMAINS, settings=True, dns=False,
+                   dry_run=False):
+    """
+    Settings profile and DNS reconcile for one zone
+    Dry runs read from fresh zone snapshots when available. Never raises;
+    returns a result dict for the fleet table
+    """
+    zone_id = zone['id']
+    result = {'zone': zone['name'], 'settings': None, 'settings_failed': 0, 'dns': None, 'dns_failed': 0,
+              'error': None, 'seconds': 0.0}
+    started = time.monotonic()
+    try:
+        if settings:
+            current, errors = get_zone_settings(client, zone_id, cached=dry_run)
+            if current is None:
+                raise RuntimeError(f"Error reading zone settings: {errors}")
+            changes, _ = diff_settings(current)
+            result['settings'] = len(changes)
+            if changes and not dry_run:
+                result['settings_failed'] = len(apply_settings(client, changes, zone_id))
+
+        if dns and server_ip:
+            existing = list_dns_records(client, zone_id, cached=dry_run)
+            # Other records on the same name (e.g. round-robin A records) are left alone
+            plan = plan_dns_changes(existing, desired_records(zone['name'], server_ip, subdomains), prune=False)
+            result['dns'] = len(plan['posts']) + len(plan['patches']) + len(plan['deletes'])
+            if result['dns'] and not dry_run:
+                result['dns_failed'] = len(apply_dns_changes(client, plan, zone_id))
+    except (RuntimeError, requests.RequestException) as e:
+        result['error'] = str(e)
+    result['seconds'] = time.monotonic() - started
+    return result
+
+def run_fleet(client, zones, workers=FLEET_WORKERS, **options):
+    """Reconcile every zone concurrently; results keep the zone order"""
+    if not zones:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers, len(zones))) as pool:
+        return list(pool.map(lambda zone: reconcile_zone(client, zone, **options), zones))
+
+def zone_ok(result):
+    return not result['error'] and not result['settings_failed'] and not result['dns_failed']
+
+def print_fleet_table(results, dry_run=False):
+    """One row per zone"""
+    verb = 'to change' if dry_run else 'changed'
+    print(f"{Colors.BLUE}{'Zone':<36} {'Settings ' + verb:>18} {'DNS ' + verb:>14} {'Time':>7}  Result{Colors.NC}")
+    for r in results:
+        settings = '-' if r['settings'] is None else str(r['settings'])
+        dns = '-' if r['dns'] is None else str(r['dns'])
+        if r['settings_failed']:
+            settings += f" ({r['settings_failed']} failed)"
+        if r['dns_failed']:
+            dns += f" ({r['dns_failed']} failed)"
+        if r['error']:
+            status = f"{Colors.RED}❌ {r['error'][:80]}{Colors.NC}"
+        elif not zone_ok(r):
+            status = f"{Colors.YELLOW}⚠️  partial{Colors.NC}"
+        else:
+            status = f"{Colors.GREEN}✅ ok{Colors.NC}"
+        print(f"{r['zone'][:36]:<36} {settings:>18} {dns:>14} {r['seconds']:>6.1f}s  {status}")
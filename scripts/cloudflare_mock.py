@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Local Cloudflare API stand-in
+In-memory implementation of the v4 endpoints the ops scripts use (zones,
+settings, dns_records, purge_cache, cache rulesets) with configurable
+latency, 429 injection and error rates, and counters for requests and bytes.
+Point a script at it with CLOUDFLARE_API_BASE=http://127.0.0.1:<port>/client/v4.
+"""
+
+import argparse
+import copy
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+API_PREFIX = '/client/v4'
+MOCK_ZONE_ID = '0123456789abcdef0123456789abcdef'
+MOCK_DOMAIN = 'currentmesh.com'
+PURGE_FILES_LIMIT = 30
+RATE_LIMIT_REQUESTS = 1200
+RATE_LIMIT_WINDOW = 300  # seconds
+
+# A fresh Free-plan zone: several values differ from SETTINGS_PROFILE
+DEFAULT_SETTINGS = {
+    'ssl': 'flexible',
+    'tls_1_3': 'on',
+    'min_tls_version': '1.0',
+    'always_use_https': 'off',
+    'automatic_https_rewrites': 'off',
+    'minify': {'html': 'off', 'css': 'off', 'js': 'off'},
+    'brotli': 'on',
+    'http2': 'on',
+    'http3': 'on',
+    '0rtt': 'off',
+    'opportunistic_encryption': 'on',
+    'security_level': 'medium',
+    'challenge_passage': 1800,
+    'browser_check': 'on',
+    'privacy_pass': 'on',
+    'early_hints': 'off',
+    'h2_prioritization': 'off',
+    'certificate_transparency_monitoring': 'off',
+    'cache_level': 'aggressive',
+    'browser_cache_ttl': 14400,
+    'development_mode': 'off',
+}
+# Not editable on the Free plan
+READ_ONLY_SETTINGS = {'h2_prioritization'}
+
+# (method, route name, path pattern under /client/v4)
+ROUTES = [
+    ('GET', 'zones', r'/zones'),
+    ('GET', 'settings', r'/zones/(?P<zone>[^/]+)/settings'),
+    ('PATCH', 'settings', r'/zones/(?P<zone>[^/]+)/settings'),
+    ('GET', 'setting', r'/zones/(?P<zone>[^/]+)/settings/(?P<setting>[^/]+)'),
+    ('PATCH', 'setting', r'/zones/(?P<zone>[^/]+)/settings/(?P<setting>[^/]+)'),
+    ('GET', 'dns_records', r'/zones/(?P<zone>[^/]+)/dns_records'),
+    ('POST', 'dns_records', r'/zones/(?P<zone>[^/]+)/dns_records'),
+    ('POST', 'dns_batch', r'/zones/(?P<zone>[^/]+)/dns_records/batch'),
+    ('GET', 'dns_record', r'/zones/(?P<zone>[^/]+)/dns_records/(?P<record>[^/]+)'),
+    ('PUT', 'dns_record', r'/zones/(?P<zone>[^/]+)/dns_records/(?P<record>[^/]+)'),
+    ('PATCH', 'dns_record', r'/zones/(?P<zone>[^/]+)/dns_records/(?P<record>[^/]+)'),
+    ('DELETE', 'dns_record', r'/zones/(?P<zone>[^/]+)/dns_records/(?P<record>[^/]+)'),
+    ('POST', 'purge_cache', r'/zones/(?P<zone>[^/]+)/purge_cache'),
+    ('GET', 'ruleset', r'/zones/(?P<zone>[^/]+)/rulesets/phases/(?P<phase>[^/]+)/entrypoint'),
+    ('PUT', 'ruleset', r'/zones/(?P<zone>[^/]+)/rulesets/phases/(?P<phase>[^/]+)/entrypoint'),
+]
+ROUTES = [(method, name, re.compile(pattern + '$')) for method, name, pattern in ROUTES]
+
+class MockError(Exception):
+    def __init__(self, status, message, code=1000):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+def envelope(result=None, success=True, errors=None, result_info=None):
+    body = {'success': success, 'errors': errors or [], 'messages': [], 'result': result}
+    if result_info is not None:
+        body['result_info'] = result_info
+    return body
+
+def new_zone(zone_id, name):
+    return {
+        'id': zone_id,
+        'name': name,
+        'status': 'active',
+        'settings': {key: {'id': key, 'value': copy.deepcopy(value), 'editable': key not in READ_ONLY_SETTINGS}
+                     for key, value in DEFAULT_SETTINGS.items()},
+        'dns': {},
+        'rulesets': {},
+        'purges': [],
+    }
+
+class MockCloudflare:
+    """
+    Threaded mock server; start() returns the API base URL
+    Faults are injected on a fixed stride (a 0.1 rate fails every 10th
+    request), so runs with the same config see the same number of faults
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, **config):
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+        self.reset(**config)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}{API_PREFIX}'
+
+    def reset(self, latency=0.0, jitter=0.0, rate_limit_rate=0.0, error_rate=0.0, retry_after=1,
+              zones=1, seed=0):
+        """Fresh zones, counters and fault settings"""
+        with self.lock:
+            self.latency = latency
+            self.jitter = jitter
+            self.rate_limit_every = round(1 / rate_limit_rate) if rate_limit_rate else 0
+            self.error_every = round(1 / error_rate) if error_rate else 0
+            self.retry_after = retry_after
+            self.random = random.Random(seed)
+            self.zones = {MOCK_ZONE_ID: new_zone(MOCK_ZONE_ID, MOCK_DOMAIN)}
+            for i in range(1, zones):
+                zone_id = f'{i:032x}'
+                self.zones[zone_id] = new_zone(zone_id, f'zone{i}.example.com')
+            self.clear_stats()
+
+    def clear_stats(self):
+        self.counts = {'requests': 0, 'bytes_in': 0, 'bytes_out': 0, 'rate_limited': 0, 'errors': 0,
+                       'routes': {}}
+
+    def stats(self):
+        with self.lock:
+            return copy.deepcopy(self.counts)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+                return len(data)
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                url = urlsplit(self.path)
+
+                if url.path == '/__stats':
+                    self._send(200, mock.stats())
+                    return
+                if url.path == '/__reset':
+                    mock.reset(**(json.loads(raw) if raw else {}))
+                    self._send(200, {'ok': True})
+                    return
+
+                status, body, headers = mock.dispatch(self.command, url.path, parse_qs(url.query), raw)
+                sent = self._send(status, body, headers)
+                with mock.lock:
+                    mock.counts['bytes_out'] += sent
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+        return Handler
+
+    def dispatch(self, method, path, query, raw):
+        """Route one API call; returns (status, body, headers)"""
+        with self.lock:
+            self.counts['requests'] += 1
+            self.counts['bytes_in'] += len(raw)
+            n = self.counts['requests']
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        remaining = max(0, RATE_LIMIT_REQUESTS - n % RATE_LIMIT_REQUESTS)
+        headers = {'Ratelimit': f'"default";r={remaining};t={RATE_LIMIT_WINDOW}'}
+        if self.rate_limit_every and n % self.rate_limit_every == 0:
+            with self.lock:
+                self.counts['rate_limited'] += 1
+            headers['Retry-After'] = str(self.retry_after)
+            return 429, envelope(None, False, [{'code': 10000, 'message': 'Rate limited'}]), headers
+        if self.error_every and n % self.error_every == 0:
+            with self.lock:
+                self.counts['errors'] += 1
+            return 503, envelope(None, False, [{'code': 10001, 'message': 'Service unavailable'}]), headers
+
+        path = path[len(API_PREFIX):] if path.startswith(API_PREFIX) else path
+        for route_method, name, pattern in ROUTES:
+            match = pattern.match(path)
+            if match and route_method == method:
+                break
+        else:
+            return 404, envelope(None, False, [{'code': 7003, 'message': f'No route for {method} {path}'}]), headers
+
+        with self.lock:
+            key = f'{method} {name}'
+            self.counts['routes'][key] = self.counts['routes'].get(key, 0) + 1
+            try:
+                data = json.loads(raw) if raw else {}
+                params = {k: v[0] for k, v in query.items()}
+                status, body = getattr(self, f'_{name}')(method, data, params, **match.groupdict())
+            except MockError as e:
+                status, body = e.status, envelope(None, False, [{'code': e.code, 'message': str(e)}])
+            except ValueError:
+                status, body = 400, envelope(None, False, [{'code': 6007, 'message': 'Malformed JSON'}])
+        return status, body, headers
+
+    def _zone(self, zone_id):
+        if zone_id not in self.zones:
+            raise MockError(404, 'Zone not found', 1001)
+        return self.zones[zone_id]
+
+    def _page(self, items, params, default_per_page=20):
+        page = int(params.get('page', 1))
+        per_page = int(params.get('per_page', default_per_page))
+        total_pages = max(1, -(-len(items) // per_page))
+        chunk = items[(page - 1) * per_page:page * per_page]
+        info = {'page': page, 'per_page': per_page, 'count': len(chunk), 'total_count': len(items),
+                'total_pages': total_pages}
+        return 200, envelope(chunk, result_info=info)
+
+    def _zones(self, method, data, params):
+        zones = [{'id': z['id'], 'name': z['name'], 'status': z['status']} for z in self.zones.values()]
+        if 'name' in params:
+            zones = [z for z in zones if z['name'] == params['name']]
+        if 'status' in params:
+            zones = [z for z in zones if z['status'] == params['status']]
+        return self._page(zones, params)
+
+    def _settings(self, method, data, params, zone):
+        settings = self._zone(zone)['settings']
+        if method == 'PATCH':
+            items = data.get('items', [])
+            for item in items:
+                if item['id'] not in settings or not settings[item['id']]['editable']:
+                    raise MockError(400, f"Setting {item['id']} is not editable", 1015)
+            for item in items:
+                settings[item['id']]['value'] = item['value']
+            return 200, envelope([settings[item['id']] for item in items])
+        return 200, envelope(list(settings.values()))
+
+    def _setting(self, method, data, params, zone, setting):
+        settings = self._zone(zone)['settings']
+        if setting not in settings:
+            raise MockError(404, f'Unknown setting {setting}', 1003)
+        if method == 'PATCH':
+            if not settings[setting]['editable']:
+                raise MockError(400, f'Setting {setting} is not editable', 1015)
+            settings[setting]['value'] = data['value']
+        return 200, envelope(settings[setting])
+
+    def _new_record(self, record):
+        return dict(record, id=uuid.UUID(int=self.random.getrandbits(128)).hex,
+                    ttl=1 if record.get('proxied') else record.get('ttl', 1))
+
+    def _dns_records(self, method, data, params, zone):
+        records = self._zone(zone)['dns']
+        if method == 'POST':
+            record = self._new_record(data)
+            records[record['id']] = record
+            return 200, envelope(record)
+        items = list(records.values())
+        for field in ('name', 'type', 'content'):
+            if field in params:
+                items = [r for r in items if r.get(field) == params[field]]
+        return self._page(items, params, default_per_page=100)
+
+    def _dns_batch(self, method, data, params, zone):
+        records = self._zone(zone)['dns']
+        for op in data.get('deletes', []) + data.get('patches', []):
+            if op['id'] not in records:
+                raise MockError(404, f"Record {op['id']} not found", 81044)
+        result = {'deletes': [records.pop(op['id']) for op in data.get('deletes', [])], 'patches': [], 'posts': []}
+        for op in data.get('patches', []):
+            records[op['id']].update(op)
+            result['patches'].append(records[op['id']])
+        for op in data.get('posts', []):
+            record = self._new_record(op)
+            records[record['id']] = record
+            result['posts'].append(record)
+        return 200, envelope(result)
+
+    def _dns_record(self, method, data, params, zone, record):
+        records = self._zone(zone)['dns']
+        if record not in records:
+            raise MockError(404, 'Record not found', 81044)
+        if method == 'DELETE':
+            return 200, envelope({'id': records.pop(record)['id']})
+        if method == 'PUT':
+            records[record] = dict(data, id=record)
+        elif method == 'PATCH':
+            records[record].update(data)
+        return 200, envelope(records[record])
+
+    def _purge_cache(self, method, data, params, zone):
+        purges = self._zone(zone)['purges']
+        if len(data.get('files', [])) > PURGE_FILES_LIMIT:
+            raise MockError(400, f'Only {PURGE_FILES_LIMIT} files can be purged per request', 1015)
+        purges.append(data)
+        return 200, envelope({'id': zone})
+
+    def _ruleset(self, method, data, params, zone, phase):
+        rulesets = self._zone(zone)['rulesets']
+        if method == 'PUT':
+            rules = [dict(rule, id=rule.get('id') or uuid.UUID(int=self.random.getrandbits(128)).hex)
+                     for rule in data.get('rules', [])]
+            rulesets[phase] = {'id': f'{phase}-{zone}', 'phase': phase, 'rules': rules}
+        if phase not in rulesets:
+            raise MockError(404, 'Could not find entrypoint ruleset', 10003)
+        return 200, envelope(rulesets[phase])
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local stand-in for the Cloudflare v4 API')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every API call')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random seconds, up to this much')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of calls answered with 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls answered with 503')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--zones', type=int, default=1, help='Zones on the mock account')
+    args = parser.parse_args()
+
+    mock = MockCloudflare(port=args.port, latency=args.latency, jitter=args.jitter,
+                          rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate,
+                          retry_after=args.retry_after, zones=args.zones)
+    print(f"Mock Cloudflare API on {mock.base_url}")
+    print(f"  export CLOUDFLARE_API_BASE={mock.base_url}")
+    print(f"  CLOUDFLARE_ZONE_ID={MOCK_ZONE_ID}")
+    print(f"  stats: GET http://127.0.0.1:{args.port}/__stats, reset: POST /__reset")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Cloudflare zone settings reconcile
+Declarative desired-state profile plus diff/apply helpers: one GET of all
+settings, then one bulk PATCH of only the settings that drifted
+"""
+
+import zone_cache
+from cloudflare_client import Colors, api_result
+
+# Desired state: (setting id, value, label)
+SETTINGS_PROFILE = [
+    ('ssl', 'full', 'SSL Mode'),
+    ('tls_1_3', 'on', 'TLS 1.3'),
+    ('min_tls_version', '1.2', 'Minimum TLS'),
+    ('always_use_https', 'on', 'Always Use HTTPS'),
+    ('automatic_https_rewrites', 'on', 'Automatic HTTPS Rewrites'),
+    ('minify', {'html': 'on', 'css': 'on', 'js': 'on'}, 'Auto Minify'),
+    ('brotli', 'on', 'Brotli Compression'),
+    ('http2', 'on', 'HTTP/2'),
+    ('http3', 'on', 'HTTP/3 (QUIC)'),
+    ('0rtt', 'on', '0-RTT'),
+    ('opportunistic_encryption', 'on', 'Opportunistic Encryption'),
+    ('security_level', 'medium', 'Security Level'),
+    ('challenge_passage', 1800, 'Challenge Passage'),  # 30 minutes
+    ('browser_check', 'on', 'Browser Integrity Check'),
+    ('privacy_pass', 'on', 'Privacy Pass'),
+    ('early_hints', 'on', 'Early Hints'),
+    ('h2_prioritization', 'on', 'Enhanced HTTP/2 Prioritization'),
+    ('certificate_transparency_monitoring', 'on', 'Certificate Transparency Monitoring'),
+    ('cache_level', 'aggressive', 'Cache Level'),
+    ('browser_cache_ttl', 14400, 'Browser Cache TTL'),  # 4 hours; hashed assets get 1 year from cache_rules.py
+    ('development_mode', 'off', 'Development Mode'),
+]
+
+def get_zone_settings(client, zone_id=None, cached=False):
+    """
+    Fetch every zone setting in a single list call, keyed by setting id
+    With cached=True a snapshot younger than its TTL is used instead
+    """
+    zone_id = zone_id or client.zone_id
+    if cached:
+        items = zone_cache.get(zone_id, 'settings')
+        if items is not None:
+            return {item['id']: item for item in items}, []
+
+    response = client.zone_request('GET', 'settings', zone_id=zone_id)
+    result = api_result(response)
+    if not result.get('success'):
+        return None, result.get('errors', [])
+    zone_cache.put(zone_id, 'settings', result.get('result', []))
+    return {item['id']: item for item in result.get('result', [])}, []
+
+def diff_settings(current, profile=SETTINGS_PROFILE):
+    """
+    Compare current settings against the desired profile
+    Returns (changes, skipped) where changes is a list of
+    (setting id, current value, desired value, label)
+    """
+    changes = []
+    skipped = []
+    for setting_id, desired, label in profile:
+        item = current.get(setting_id)
+        if item is None:
+            # Not reported by the list call; push it and let the API decide
+            changes.append((setting_id, None, desired, label))
+            continue
+        if item.get('value') == desired:
+            continue
+        if item.get('editable') is False:
+            skipped.append((setting_id, item.get('value'), desired, label))
+        else:
+            changes.append((setting_id, item.get('value'), desired, label))
+    return changes, skipped
+
+def apply_settings(client, changes, zone_id=None):
+    """
+    Apply drifted settings in one bulk edit
+    Falls back to per-setting PATCHes if the bulk edit is rejected so one bad
+    item does not block the rest. Returns the list of setting ids that failed.
+    """
+    if not changes:
+        return []
+
+    zone_id = zone_id or client.zone_id
+    items = [{'id': setting_id, 'value': desired} for setting_id, _, desired, _ in changes]
+    response = client.zone_request('PATCH', 'settings', zone_id=zone_id, data={'items': items})
+    result = api_result(response)
+    if result.get('success'):
+        zone_cache.update(zone_id, 'settings', items)
+        return []
+
+    print(f"{Colors.YELLOW}⚠️  Bulk settings edit rejected: {result.get('errors', [])}{Colors.NC}")
+    print(f"{Colors.YELLOW}Falling back to individual updates...{Colors.NC}")
+    failed = []
+    for setting_id, _, desired, label in changes:
+        response = client.zone_request('PATCH', f'settings/{setting_id}', zone_id=zone_id, data={'value': desired})
+        result = api_result(response)
+        if not result.get('success'):
+            print(f"{Colors.YELLOW}⚠️  {label}: {result.get('errors', [])}{Colors.NC}")
+            failed.append(setting_id)
+    zone_cache.update(zone_id, 'settings', [item for item in items if item['id'] not in failed])
+    return failed
+
+def print_plan(changes, skipped):
+    """Print the settings diff"""
+    for setting_id, current, desired, label in changes:
+        print(f"  {Colors.YELLOW}~{Colors.NC} {label} ({setting_id}): {current} → {desired}")
+    for setting_id, current, desired, label in skipped:
+        print(f"  {Colors.RED}!{Colors.NC} {label} ({setting_id}): not editable on this plan (is {current}, want {desired})")
+    if not changes and not skipped:
+        print(f"  {Colors.GREEN}✓{Colors.NC} All settings match the desired state")
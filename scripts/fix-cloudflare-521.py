@@ -1,184 +1,232 @@
 #!/usr/bin/env python3
 """
 Fix Cloudflare 521 Error
-Temporarily disable proxy to test direct connection, then re-enable
+Probes the origin directly (correct Host + SNI) for every subdomain while the
+proxy stays on, and only toggles the proxy for hosts the edge still reports
+521 for, polling DNS and health until the state converges
 """
 
-import os
+import argparse
+import http.client
+import socket
+import ssl
 import sys
-import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-from pathlib import Path
-
-class Colors:
-    GREEN = '\033[0;32m'
-    BLUE = '\033[0;34m'
-    RED = '\033[0;31m'
-    YELLOW = '\033[1;33m'
-    NC = '\033[0m'
-
-def load_env():
-    env_path = Path(__file__).parent.parent / '.cloudflare' / '.env'
-    if not env_path.exists():
-        print(f"{Colors.RED}Error: .cloudflare/.env not found{Colors.NC}")
-        sys.exit(1)
-    
-    env_vars = {}
-    with open(env_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#') and '=' in line:
-                key, value = line.split('=', 1)
-                env_vars[key.strip()] = value.strip()
-    return env_vars
-
-def get_cloudflare_email():
-    email = os.getenv('CLOUDFLARE_EMAIL')
-    if not email:
-        env = load_env()
-        email = env.get('CLOUDFLARE_EMAIL')
-    if not email:
-        print(f"{Colors.YELLOW}Cloudflare email not found. Please provide:{Colors.NC}")
-        email = input("Email: ").strip()
-        if email:
-            env_path = Path(__file__).parent.parent / '.cloudflare' / '.env'
-            with open(env_path, 'a') as f:
-                f.write(f"\nCLOUDFLARE_EMAIL={email}\n")
-    return email
+
+import zone_cache
+from cloudflare_client import Colors, api_result, get_client, load_env
+from cloudflare_dns import DEFAULT_SUBDOMAINS
+
+PROBE_TIMEOUT = 5  # seconds
+CONVERGE_TIMEOUT = 180  # seconds
+POLL_INITIAL = 0.5  # seconds
+POLL_MAX = 8  # seconds
+DOH_URL = 'https://cloudflare-dns.com/dns-query'
+
+HEALTH_PATHS = {'api': '/health'}
 
 def update_dns_record(zone_id, record_id, name, content, proxied, use_global_key=False):
-    env = load_env()
-    
-    if use_global_key:
-        email = get_cloudflare_email()
-        global_key = env.get('CLOUDFLARE_GLOBAL_API_KEY')
-        headers = {
-            'X-Auth-Email': email,
-            'X-Auth-Key': global_key,
-            'Content-Type': 'application/json'
-        }
-    else:
-        api_token = env.get('CLOUDFLARE_API_TOKEN')
-        headers = {
-            'Authorization': f'Bearer {api_token}',
-            'Content-Type': 'application/json'
-        }
-    
-    url = f'https://api.cloudflare.com/client/v4/zones/{zone_id}/dns_records/{record_id}'
+    client = get_client(use_global_key)
+
     data = {
         'type': 'A',
         'name': name,
         'content': content,
         'proxied': proxied
     }
-    
-    response = requests.put(url, headers=headers, json=data)
-    return response.json()
+
+    response = client.zone_request('PUT', f'dns_records/{record_id}', zone_id=zone_id, data=data)
+    result = api_result(response)
+    if result.get('success'):
+        zone_cache.update(zone_id, 'dns_records', [result['result']])
+    return result
 
 def get_dns_record(zone_id, name, use_global_key=False):
-    env = load_env()
-    
-    if use_global_key:
-        email = get_cloudflare_email()
-        global_key = env.get('CLOUDFLARE_GLOBAL_API_KEY')
-        headers = {
-            'X-Auth-Email': email,
-            'X-Auth-Key': global_key,
-            'Content-Type': 'application/json'
-        }
+    client = get_client(use_global_key)
+
+    response = client.zone_request('GET', 'dns_records', zone_id=zone_id, params={'name': name, 'type': 'A'})
+    return api_result(response)
+
+def probe_origin(server_ip, host, path, port, tls=None):
+    """
+    GET a path straight from the origin with the right Host header (and SNI
+    over TLS), bypassing DNS and the proxy. Returns (HTTP status or None, detail)
+    """
+    tls = port == 443 if tls is None else tls
+    conn = http.client.HTTPConnection(server_ip, port, timeout=PROBE_TIMEOUT)
+    try:
+        if tls:
+            # 'full' SSL mode accepts any origin certificate, so don't verify it
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            # Connect by IP but present the hostname for SNI
+            conn.sock = context.wrap_socket(
+                socket.create_connection((server_ip, port), PROBE_TIMEOUT), server_hostname=host)
+        conn.request('GET', path, headers={'Host': host, 'User-Agent': 'currentmesh-521-fix/1.0'})
+        response = conn.getresponse()
+        response.read()
+        return response.status, ''
+    except (OSError, http.client.HTTPException) as e:
+        return None, str(e)
+    finally:
+        conn.close()
+
+def probe_edge(host, path):
+    """GET a path through Cloudflare; returns the HTTP status or None"""
+    try:
+        return requests.get(f'https://{host}{path}', timeout=PROBE_TIMEOUT, allow_redirects=False).status_code
+    except requests.RequestException:
+        return None
+
+def resolve_a(host):
+    """Resolve A records over DNS-over-HTTPS, bypassing the local resolver cache"""
+    try:
+        response = requests.get(DOH_URL, params={'name': host, 'type': 'A'},
+                                headers={'Accept': 'application/dns-json'}, timeout=PROBE_TIMEOUT)
+        return {answer['data'] for answer in response.json().get('Answer', []) if answer.get('type') == 1}
+    except (requests.RequestException, ValueError):
+        return set()
+
+def wait_until(check, timeout=CONVERGE_TIMEOUT):
+    """Poll check() with adaptive backoff until it passes; returns seconds taken or None"""
+    start = time.monotonic()
+    delay = POLL_INITIAL
+    while True:
+        if check():
+            return time.monotonic() - start
+        if time.monotonic() - start >= timeout:
+            return None
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_MAX)
+
+def check_host(server_ip, host, path):
+    """Probe origin (HTTPS and HTTP) and edge for one host concurrently"""
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        over_tls = pool.submit(probe_origin, server_ip, host, path, 443)
+        plain = pool.submit(probe_origin, server_ip, host, path, 80)
+        edge = pool.submit(probe_edge, host, path)
+        return {'https': over_tls.result(), 'http': plain.result(), 'edge': edge.result()}
+
+def origin_ok(result):
+    """True if the origin answered on either port without a server error"""
+    return any(status is not None and status < 500 for status, _ in (result['https'], result['http']))
+
+def toggle_proxy(zone_id, record, server_ip, path, use_global_key):
+    """Drop a record to DNS-only and back, moving on as soon as each state converges"""
+    name = record['name']
+    record_id = record['id']
+
+    print(f"{Colors.BLUE}{name}: disabling proxy...{Colors.NC}")
+    result = update_dns_record(zone_id, record_id, name, server_ip, False, use_global_key)
+    if not result.get('success'):
+        print(f"{Colors.RED}❌ {name}: failed to update DNS: {result.get('errors', [])}{Colors.NC}")
+        return False
+
+    took = wait_until(lambda: resolve_a(name) == {server_ip})
+    if took is None:
+        print(f"{Colors.YELLOW}⚠️  {name}: DNS-only record not visible yet, re-enabling anyway{Colors.NC}")
     else:
-        api_token = env.get('CLOUDFLARE_API_TOKEN')
-        headers = {
-            'Authorization': f'Bearer {api_token}',
-            'Content-Type': 'application/json'
-        }
-    
-    url = f'https://api.cloudflare.com/client/v4/zones/{zone_id}/dns_records?name={name}'
-    response = requests.get(url, headers=headers)
-    return response.json()
+        print(f"{Colors.GREEN}✅ {name}: resolves to origin after {took:.1f}s{Colors.NC}")
+
+    result = update_dns_record(zone_id, record_id, name, server_ip, True, use_global_key)
+    if not result.get('success'):
+        print(f"{Colors.RED}❌ {name}: failed to re-enable proxy: {result.get('errors', [])}{Colors.NC}")
+        return False
+
+    def converged():
+        ips = resolve_a(name)
+        if not ips or server_ip in ips:
+            return False
+        status = probe_edge(name, path)
+        return status is not None and status != 521
+
+    took = wait_until(converged)
+    if took is None:
+        print(f"{Colors.YELLOW}⚠️  {name}: edge not healthy after {CONVERGE_TIMEOUT}s; if 521 persists, wait 5-10 minutes{Colors.NC}")
+        return False
+    print(f"{Colors.GREEN}✅ {name}: proxied and healthy after {took:.1f}s{Colors.NC}")
+    return True
 
 def main():
+    parser = argparse.ArgumentParser(description='Diagnose and fix Cloudflare 521 errors')
+    parser.add_argument('--host', action='append', default=[], help='Hostname to check (default: all subdomains)')
+    parser.add_argument('--probe-only', action='store_true', help='Report origin/edge status without changing DNS')
+    args = parser.parse_args()
+
     print(f"{Colors.BLUE}=== Fixing Cloudflare 521 Error ==={Colors.NC}\n")
-    
+
     env = load_env()
     zone_id = env.get('CLOUDFLARE_ZONE_ID')
     server_ip = env.get('SERVER_IP')
-    
+    domain = env.get('CLOUDFLARE_DOMAIN', 'currentmesh.com')
+    use_global_key = bool(env.get('CLOUDFLARE_GLOBAL_API_KEY'))
+
     if not zone_id or not server_ip:
         print(f"{Colors.RED}Error: Missing ZONE_ID or SERVER_IP{Colors.NC}")
         sys.exit(1)
-    
-    # Get current DNS record
-    print(f"{Colors.BLUE}Getting current DNS record...{Colors.NC}")
-    result = get_dns_record(zone_id, 'api.currentmesh.com', use_global_key=True)
-    
-    if not result.get('success') or not result.get('result'):
-        print(f"{Colors.RED}Error: Could not get DNS record{Colors.NC}")
-        print(result)
-        sys.exit(1)
-    
-    record = result['result'][0]
-    record_id = record['id']
-    current_proxied = record['proxied']
-    
-    print(f"{Colors.YELLOW}Current: proxied={current_proxied}{Colors.NC}\n")
-    
-    # Temporarily disable proxy to test direct connection
-    print(f"{Colors.BLUE}Step 1: Temporarily disabling Cloudflare proxy...{Colors.NC}")
-    result = update_dns_record(zone_id, record_id, 'api.currentmesh.com', server_ip, False, use_global_key=True)
-    
-    if result.get('success'):
-        print(f"{Colors.GREEN}✅ Proxy disabled (DNS-only mode){Colors.NC}")
-        print(f"{Colors.YELLOW}Waiting 30 seconds for DNS propagation...{Colors.NC}\n")
-        
-        import time
-        time.sleep(30)
-        
-        # Test direct connection
-        print(f"{Colors.BLUE}Step 2: Testing direct connection...{Colors.NC}")
-        import subprocess
-        test_result = subprocess.run(
-            ['curl', '-s', '-o', '/dev/null', '-w', '%{http_code}', f'http://{server_ip}/health', '-H', 'Host: api.currentmesh.com'],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        
-        if test_result.stdout == '200':
-            print(f"{Colors.GREEN}✅ Direct connection works!{Colors.NC}\n")
-            
-            # Re-enable proxy
-            print(f"{Colors.BLUE}Step 3: Re-enabling Cloudflare proxy...{Colors.NC}")
-            result = update_dns_record(zone_id, record_id, 'api.currentmesh.com', server_ip, True, use_global_key=True)
-            
-            if result.get('success'):
-                print(f"{Colors.GREEN}✅ Proxy re-enabled{Colors.NC}")
-                print(f"{Colors.YELLOW}Waiting 30 seconds for DNS propagation...{Colors.NC}\n")
-                time.sleep(30)
-                
-                print(f"{Colors.GREEN}=== Fix Complete ==={Colors.NC}")
-                print(f"{Colors.BLUE}Cloudflare should now be able to connect.{Colors.NC}")
-                print(f"{Colors.YELLOW}If 521 persists, wait 5-10 minutes for full propagation.{Colors.NC}\n")
-            else:
-                print(f"{Colors.RED}❌ Failed to re-enable proxy: {result.get('errors', [])}{Colors.NC}")
+
+    hosts = args.host or [f'{sub}.{domain}' if sub else domain for sub in DEFAULT_SUBDOMAINS]
+
+    # Step 1: probe every host's origin and edge at once, proxy untouched
+    print(f"{Colors.BLUE}Step 1: Probing origin {server_ip} and edge for {len(hosts)} host(s)...{Colors.NC}")
+    paths = {host: HEALTH_PATHS.get(host.split('.')[0], '/') for host in hosts}
+    with ThreadPoolExecutor(max_workers=len(hosts)) as pool:
+        results = dict(zip(hosts, pool.map(lambda h: check_host(server_ip, h, paths[h]), hosts)))
+
+    broken = []
+    for host, result in results.items():
+        over_tls, plain = result['https'], result['http']
+        origin = f"origin https={over_tls[0] or over_tls[1]} http={plain[0] or plain[1]}"
+        if not origin_ok(result):
+            print(f"  {Colors.RED}❌ {host}: {origin}, edge={result['edge']} (origin is down, fix the server first){Colors.NC}")
+        elif result['edge'] == 521:
+            print(f"  {Colors.YELLOW}⚠️  {host}: {origin}, edge=521 (origin healthy, edge stuck){Colors.NC}")
+            broken.append(host)
         else:
-            print(f"{Colors.RED}❌ Direct connection failed: HTTP {test_result.stdout}{Colors.NC}")
-            print(f"{Colors.YELLOW}Server may not be accessible from outside.{Colors.NC}")
+            print(f"  {Colors.GREEN}✅ {host}: {origin}, edge={result['edge']}{Colors.NC}")
+    print()
+
+    origin_down = [host for host, result in results.items() if not origin_ok(result)]
+    if not broken:
+        if origin_down:
+            print(f"{Colors.RED}Origin is not answering for: {', '.join(origin_down)}{Colors.NC}")
+            print(f"{Colors.YELLOW}Toggling the proxy will not help; check nginx and PM2 on the server.{Colors.NC}")
+            sys.exit(1)
+        print(f"{Colors.GREEN}=== No 521 detected, nothing to fix ==={Colors.NC}")
+        return
+
+    if args.probe_only:
+        print(f"{Colors.YELLOW}Probe only: not toggling proxy for {', '.join(broken)}{Colors.NC}")
+        sys.exit(1)
+
+    # Step 2: toggle only the stuck hosts, all at once
+    print(f"{Colors.BLUE}Step 2: Toggling Cloudflare proxy for {len(broken)} host(s)...{Colors.NC}")
+    records = {}
+    for host in broken:
+        result = get_dns_record(zone_id, host, use_global_key)
+        if not result.get('success') or not result.get('result'):
+            print(f"{Colors.RED}Error: Could not get DNS record for {host}: {result.get('errors', [])}{Colors.NC}")
+            if use_global_key:
+                continue
+            print(f"{Colors.YELLOW}Note: API token may not have DNS permissions.{Colors.NC}")
+            print(f"{Colors.YELLOW}Please toggle the proxy manually in the Cloudflare dashboard.{Colors.NC}")
+            continue
+        records[host] = result['result'][0]
+
+    with ThreadPoolExecutor(max_workers=max(1, len(records))) as pool:
+        fixed = list(pool.map(lambda h: toggle_proxy(zone_id, records[h], server_ip, paths[h], use_global_key), records))
+
+    print()
+    if records and all(fixed) and len(records) == len(broken):
+        print(f"{Colors.GREEN}=== Fix Complete ==={Colors.NC}")
+        print(f"{Colors.BLUE}Cloudflare can connect to the origin again.{Colors.NC}\n")
     else:
-        print(f"{Colors.RED}❌ Failed to update DNS: {result.get('errors', [])}{Colors.NC}")
-        print(f"{Colors.YELLOW}Trying with API token instead...{Colors.NC}")
-        
-        # Try with API token (may have different permissions)
-        result = get_dns_record(zone_id, 'api.currentmesh.com', use_global_key=False)
-        if result.get('success'):
-            print(f"{Colors.GREEN}✅ Can read DNS with API token{Colors.NC}")
-            print(f"{Colors.YELLOW}Note: API token may not have write permissions.{Colors.NC}")
-            print(f"{Colors.YELLOW}Please update DNS manually in Cloudflare dashboard:{Colors.NC}")
-            print(f"{Colors.BLUE}1. Go to DNS settings for api.currentmesh.com{Colors.NC}")
-            print(f"{Colors.BLUE}2. Click the orange cloud to disable proxy (gray cloud = DNS-only){Colors.NC}")
-            print(f"{Colors.BLUE}3. Wait 5 minutes, then re-enable proxy{Colors.NC}")
+        print(f"{Colors.RED}=== Fix incomplete, see messages above ==={Colors.NC}\n")
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
-
-
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Health Check Engine for All CurrentMesh Services
+Probes every service concurrently over keep-alive connections and keeps a
+rolling p50/p95/p99 latency per endpoint. A sweep takes about as long as the
+slowest single probe instead of the sum of all of them.
+"""
+
+import argparse
+import errno
+import json
+import math
+import subprocess
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import api_trace
+from term_colors import Colors
+
+# name, port, health path (same definitions as health-check.sh)
+SERVICES = [
+    ('currentmesh-server', 3000, '/health'),
+    ('currentmesh-marketing', 3001, '/'),
+    ('currentmesh-app', 5000, '/'),
+    ('currentmesh-client', 5001, '/'),
+    ('currentmesh-admin', 5002, '/'),
+]
+
+PROBE_TIMEOUT = 2  # seconds
+CONNECT_TIMEOUT = 1  # seconds
+LATENCY_WINDOW = 1000  # samples kept per endpoint
+
+# Probe outcomes
+OK = 'ok'
+NOT_RUNNING = 'not_running'
+NOT_LISTENING = 'not_listening'
+NOT_RESPONDING = 'not_responding'
+HTTP_ERROR = 'http_error'
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class LatencyWindow:
+    """Rolling window of probe latencies for one endpoint"""
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def summary(self):
+        """p50/p95/p99 in milliseconds over the window"""
+        values = sorted(self.samples)
+        return {
+            'count': len(values),
+            'p50_ms': _ms(percentile(values, 50)),
+            'p95_ms': _ms(percentile(values, 95)),
+            'p99_ms': _ms(percentile(values, 99)),
+        }
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+def pm2_statuses():
+    """
+    Status of every PM2 process from a single `pm2 jlist` call
+    Returns None when PM2 is not available
+    """
+    try:
+        output = subprocess.run(['pm2', 'jlist'], capture_output=True, text=True, timeout=10).stdout
+        return {proc['name']: proc.get('pm2_env', {}).get('status') for proc in json.loads(output)}
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+def connection_refused(error):
+    """
+    True if a requests.ConnectionError is ECONNREFUSED (nothing bound to the port)
+    requests wraps urllib3's MaxRetryError, whose reason was raised from the socket error
+    """
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    cause = getattr(reason, '__cause__', None)
+    return isinstance(cause, ConnectionRefusedError) or getattr(cause, 'errno', None) == errno.ECONNREFUSED
+
+class HealthChecker:
+    """
+    Concurrent prober with one keep-alive connection per service
+    Redirects are not followed (like the curl checks); ok_status is the range
+    of HTTP statuses counted as healthy
+    """
+
+    def __init__(self, services=SERVICES, host='127.0.0.1', timeout=PROBE_TIMEOUT, trace=False,
+                 ok_status=range(200, 400)):
+        self.services = list(services)
+        self.host = host
+        self.timeout = timeout
+        self.ok_status = ok_status
+        self.trace = trace
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.services), pool_maxsize=1, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.pool = ThreadPoolExecutor(max_workers=len(self.services))
+        self.latency = {name: LatencyWindow() for name, _, _ in self.services}
+
+    def probe(self, name, port, path):
+        """Probe one endpoint; returns (outcome, HTTP status, latency seconds)"""
+        outcome, status, elapsed = self._probe(name, port, path)
+        if self.trace:
+            api_trace.record('health', 'GET', f'{name}{path}', status, elapsed,
+                             error=None if outcome in (OK, HTTP_ERROR) else outcome)
+        return outcome, status, elapsed
+
+    def _probe(self, name, port, path):
+        start = time.monotonic()
+        try:
+            response = self.session.get(f'http://{self.host}:{port}{path}',
+                                        timeout=(CONNECT_TIMEOUT, self.timeout), allow_redirects=False)
+        except requests.ConnectionError as e:
+            return (NOT_LISTENING if connection_refused(e) else NOT_RESPONDING), None, time.monotonic() - start
+        except requests.RequestException:
+            return NOT_RESPONDING, None, time.monotonic() - start
+
+        elapsed = time.monotonic() - start
+        self.latency[name].add(elapsed)
+        return (OK if response.status_code in self.ok_status else HTTP_ERROR), response.status_code, elapsed
+
+    def sweep(self, pm2=None):
+        """
+        Probe every service at once
+        pm2 is an optional {name: status} map; services not online in PM2 are
+        reported as not running without being probed
+        """
+        futures = {}
+        for name, port, path in self.services:
+            if pm2 is not None and pm2.get(name) != 'online':
+                continue
+            futures[name] = self.pool.submit(self.probe, name, port, path)
+
+        results = []
+        for name, port, path in self.services:
+            if name in futures:
+                outcome, status, elapsed = futures[name].result()
+            else:
+                outcome, status, elapsed = NOT_RUNNING, None, None
+            results.append({
+                'name': name,
+                'port': port,
+                'path': path,
+                'status': outcome,
+                'http_status': status,
+                'latency_ms': _ms(elapsed),
+                **self.latency[name].summary(),
+            })
+        return results
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+        self.session.close()
+
+MESSAGES = {
+    OK: f'{Colors.GREEN}✅ OK{Colors.NC}',
+    NOT_RUNNING: f'{Colors.RED}❌ Not running in PM2{Colors.NC}',
+    NOT_LISTENING: f'{Colors.RED}❌ Port not listening{Colors.NC}',
+    NOT_RESPONDING: f'{Colors.YELLOW}⚠️  Port open but not responding{Colors.NC}',
+    HTTP_ERROR: f'{Colors.YELLOW}⚠️  Unhealthy response{Colors.NC}',
+}
+
+def print_results(results):
+    """Human-readable sweep report"""
+    for r in results:
+        line = f"Checking {r['name']} (port {r['port']})... {MESSAGES[r['status']]}"
+        if r['http_status'] is not None:
+            line += f" HTTP {r['http_status']} in {r['latency_ms']}ms"
+        if r['count'] > 1:
+            line += f" (p50 {r['p50_ms']}ms, p95 {r['p95_ms']}ms, p99 {r['p99_ms']}ms)"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description='Check health of all CurrentMesh services')
+    parser.add_argument('--json', action='store_true', help='Print one machine-readable JSON report per sweep')
+    parser.add_argument('--watch', type=float, metavar='SECONDS', help='Keep sweeping at this interval')
+    parser.add_argument('--no-pm2', action='store_true', help='Skip the PM2 process status check')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--timeout', type=float, default=PROBE_TIMEOUT)
+    args = parser.parse_args()
+
+    checker = HealthChecker(host=args.host, timeout=args.timeout, trace=True)
+    failed = 0
+    try:
+        while True:
+            started = time.monotonic()
+            pm2 = None if args.no_pm2 else pm2_statuses()
+            # Like the bash version, a missing pm2 is a failure unless --no-pm2 says to skip it
+            pm2_missing = pm2 is None and not args.no_pm2
+            results = checker.sweep(pm2)
+            passed = sum(1 for r in results if r['status'] == OK)
+            failed = len(results) - passed + pm2_missing
+            sweep_ms = _ms(time.monotonic() - started)
+
+            if args.json:
+                print(json.dumps({
+                    'timestamp': time.time(),
+                    'healthy': failed == 0,
+                    'passed': passed,
+                    'failed': failed,
+                    'sweep_ms': sweep_ms,
+                    'pm2_available': None if args.no_pm2 else not pm2_missing,
+                    'services': results,
+                }), flush=True)
+            else:
+                print("🏥 CurrentMesh Health Check")
+                print("==========================")
+                if pm2_missing:
+                    print(f"{Colors.RED}❌ PM2 not available; process status not checked (--no-pm2 to skip){Colors.NC}")
+                print_results(results)
+                print("==========================")
+                print(f"✅ Passed: {passed}")
+                print(f"❌ Failed: {failed}")
+                print(f"⏱️  Sweep: {sweep_ms}ms\n")
+
+            if args.watch is None:
+                break
+            time.sleep(max(0.0, args.watch - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        checker.close()
+
+    if failed and not args.json:
+        print("⚠️  Some services are not healthy")
+        print("Check logs with: pm2 logs")
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
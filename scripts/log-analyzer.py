@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+PM2 Log Analyzer
+Incrementally scans the service logs under logs/ and aggregates error
+signatures (OOM, EADDRINUSE, unhandled rejections, restarts) per service and
+minute into a small SQLite index. Each run memory-maps only the bytes added
+since the per-file checkpoint, so queries over weeks of logs stay fast.
+"""
+
+import argparse
+import calendar
+import mmap
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from log_signatures import LABELS, PREFILTER, STARTUP_PATTERN, classify, service_for_log
+from term_colors import Colors
+
+LOG_DIR = Path(__file__).parent.parent / 'logs'
+INDEX_NAME = 'log-index.db'
+
+CHUNK_SIZE = 8 * 1024 * 1024  # bytes mapped per scan step
+HEAD_SIZE = 64  # bytes fingerprinted to detect a replaced file
+
+# PM2 `time: true` prefix, e.g. "2026-01-01T23:32:16: "
+TIMESTAMP_RE = re.compile(rb'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}):\d{2}')
+
+# Restart storm: this many restarts of one service within the window
+STORM_RESTARTS = 3
+STORM_WINDOW = 10  # minutes
+
+# Log files to scan; combined logs duplicate err + out, compressed ones were
+# already indexed before logrotate compressed them. log-compact.py renames
+# logs to .log.<YYYYmmddTHHMMSS> and runs --scan-only before archiving them;
+# a rename keeps the inode, so the checkpoint carries over
+LOG_GLOBS = ('*-err*.log', '*-out*.log', '*-err*.log.1', '*-out*.log.1',
+             '*-err*.log.????????T??????', '*-out*.log.????????T??????')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS counts (
+    service TEXT NOT NULL,
+    minute INTEGER NOT NULL,
+    signature TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (service, minute, signature)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS counts_minute ON counts (minute);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    dev INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    head BLOB,
+    PRIMARY KEY (dev, inode)
+);
+'''
+
+def open_index(log_dir):
+    db = sqlite3.connect(Path(log_dir) / INDEX_NAME)
+    db.executescript(SCHEMA)
+    return db
+
+def minute_of(stamp):
+    """'2026-01-01T23:32' -> minutes since the epoch (UTC as logged)"""
+    return calendar.timegm(time.strptime(stamp.decode(), '%Y-%m-%dT%H:%M')) // 60
+
+def scan_file(db, path, service):
+    """
+    Index the bytes appended to one file since its checkpoint
+    Returns the number of new bytes read
+    """
+    stat = path.stat()
+    with open(path, 'rb') as f:
+        head = f.read(HEAD_SIZE)
+
+    row = db.execute('SELECT offset, head FROM checkpoints WHERE dev = ? AND inode = ?',
+                     (stat.st_dev, stat.st_ino)).fetchone()
+    offset = 0
+    if row:
+        offset, old_head = row
+        # Truncated or reused inode: start over
+        if stat.st_size < offset or not head.startswith(old_head[:len(head)]):
+            offset = 0
+    if stat.st_size == offset:
+        return 0
+
+    counts = Counter()
+    last_minute = None
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = mm.rfind(b'\n', offset, stat.st_size) + 1
+        if end <= offset:
+            return 0
+        pos = offset
+        while pos < end:
+            stop = min(end, pos + CHUNK_SIZE)
+            if stop < end:
+                stop = mm.rfind(b'\n', pos, stop) + 1 or end
+            chunk = mm[pos:stop]
+            line_end = -1
+            for match in PREFILTER.finditer(chunk):
+                if match.start() < line_end:
+                    continue  # already counted this line
+                line_start = chunk.rfind(b'\n', 0, match.start()) + 1
+                line_end = chunk.find(b'\n', match.start())
+                line = chunk[line_start:line_end].decode(errors='replace')
+                key = classify(line) or ('restart' if STARTUP_PATTERN.search(line) else None)
+                if not key:
+                    continue
+                stamp = TIMESTAMP_RE.match(chunk, line_start)
+                if stamp:
+                    last_minute = minute_of(stamp.group(1))
+                if last_minute is not None:
+                    counts[(last_minute, key)] += 1
+            pos = stop
+
+    with db:
+        db.executemany(
+            'INSERT INTO counts (service, minute, signature, count) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (service, minute, signature) DO UPDATE SET count = count + excluded.count',
+            [(service, minute, key, n) for (minute, key), n in counts.items()])
+        db.execute('INSERT OR REPLACE INTO checkpoints (dev, inode, path, offset, head) VALUES (?, ?, ?, ?, ?)',
+                   (stat.st_dev, stat.st_ino, str(path), end, head))
+    return end - offset
+
+def scan(db, log_dir):
+    """Bring the index up to date; returns (files with new data, bytes read)"""
+    files = 0
+    total = 0
+    seen = set()
+    for pattern in LOG_GLOBS:
+        for path in sorted(Path(log_dir).glob(pattern)):
+            service = service_for_log(path.name)
+            if not service or path in seen:
+                continue
+            seen.add(path)
+            read = scan_file(db, path, service)
+            if read:
+                files += 1
+                total += read
+    return files, total
+
+def parse_since(value):
+    """'7d', '12h', '30m' -> minutes"""
+    match = re.fullmatch(r'(\d+)([mhd])', value)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration '{value}' (use e.g. 30m, 12h, 7d)")
+    return int(match.group(1)) * {'m': 1, 'h': 60, 'd': 1440}[match.group(2)]
+
+def query(db, since_minutes=None, service=None):
+    """Signature totals per service, plus restart storm windows"""
+    where = []
+    params = []
+    if since_minutes is not None:
+        where.append('minute >= ?')
+        params.append(int(time.time() // 60) - since_minutes)
+    if service:
+        where.append('service = ?')
+        params.append(service if service.startswith('currentmesh-') else f'currentmesh-{service}')
+    clause = f"WHERE {' AND '.join(where)}" if where else ''
+
+    totals = db.execute(f'SELECT service, signature, SUM(count) FROM counts {clause} '
+                        'GROUP BY service, signature ORDER BY service, SUM(count) DESC', params).fetchall()
+    restarts = db.execute(f"SELECT service, minute, count FROM counts {clause} "
+                          f"{'AND' if clause else 'WHERE'} signature = 'restart' ORDER BY service, minute",
+                          params).fetchall()
+    return totals, restart_storms(restarts)
+
+def restart_storms(rows):
+    """Windows where a service restarted STORM_RESTARTS+ times within STORM_WINDOW minutes"""
+    storms = []
+    by_service = {}
+    for service, minute, count in rows:
+        by_service.setdefault(service, []).extend([minute] * count)
+    for service, minutes in by_service.items():
+        start = 0
+        current = None
+        for end, minute in enumerate(minutes):
+            while minute - minutes[start] >= STORM_WINDOW:
+                start += 1
+            if end - start + 1 >= STORM_RESTARTS:
+                if current and minutes[start] <= current[2]:
+                    current[2] = minute
+                    current[3] = max(current[3], end - start + 1)
+                else:
+                    current = [service, minutes[start], minute, end - start + 1]
+                    storms.append(current)
+    return storms
+
+def fmt_minute(minute):
+    return datetime.fromtimestamp(minute * 60, timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental PM2 log signature analyzer')
+    parser.add_argument('--log-dir', default=str(LOG_DIR))
+    parser.add_argument('--since', type=parse_since, help='Only report the last N minutes/hours/days (e.g. 7d)')
+    parser.add_argument('--service', help='Only report one service (e.g. marketing)')
+    parser.add_argument('--no-scan', action='store_true', help='Query the index without reading new log bytes')
+    parser.add_argument('--scan-only', action='store_true', help='Update the index without printing a report')
+    args = parser.parse_args()
+
+    if not Path(args.log_dir).is_dir():
+        print(f"{Colors.RED}Error: log directory {args.log_dir} not found{Colors.NC}")
+        sys.exit(1)
+
+    db = open_index(args.log_dir)
+    if not args.no_scan:
+        started = time.monotonic()
+        files, read = scan(db, args.log_dir)
+        print(f"{Colors.BLUE}Indexed {read / 1024:.0f} KiB of new log data from {files} file(s) "
+              f"in {(time.monotonic() - started) * 1000:.0f}ms{Colors.NC}\n")
+    if args.scan_only:
+        db.close()
+        return
+
+    started = time.monotonic()
+    totals, storms = query(db, args.since, args.service)
+    elapsed = (time.monotonic() - started) * 1000
+
+    print(f"{Colors.BLUE}{'Service':<24} {'Signature':<22} {'Count':>7}{Colors.NC}")
+    for service, signature, count in totals:
+        label = LABELS.get(signature, 'Restart')
+        color = Colors.RED if signature in ('oom', 'fatal') else Colors.YELLOW
+        print(f"{service:<24} {color}{label:<22}{Colors.NC} {count:>7}")
+    if not totals:
+        print(f"{Colors.GREEN}No signatures found{Colors.NC}")
+
+    if storms:
+        print(f"\n{Colors.RED}Restart storms ({STORM_RESTARTS}+ restarts within {STORM_WINDOW} min):{Colors.NC}")
+        for service, start, end, peak in storms:
+            print(f"  {service}: {fmt_minute(start)} → {fmt_minute(end)} (peak {peak} restarts)")
+
+    print(f"\n{Colors.BLUE}Query took {elapsed:.1f}ms{Colors.NC}")
+    db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Log Compaction and Rotation
+Replaces delete-after-7-days with a disk budget: live logs under logs/ are
+rotated (rename + `pm2 reloadLogs`, so no line is lost), finished logs are
+streamed into the compressed, indexed archive (log_archive.py) at a capped
+read rate, and once the archive passes its budget the oldest archives are
+thinned to warnings and errors before any are deleted.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import log_archive
+from log_archive import ARCHIVE_DIR, LOG_DIR, Throttle, archive_file, enforce_budget, zstandard
+from log_signatures import service_for_log
+from term_colors import Colors
+
+DEFAULT_BUDGET = '2G'  # total archive size
+READ_RATE = 16  # MB/s read from disk while compacting
+ROTATE_SIZE = 20 * 1024 * 1024  # rotate a live log at this size
+ROTATE_MIN_SIZE = 1024 * 1024  # daily rotation skips logs smaller than this
+ROTATE_AGE = 86400  # seconds between daily rotations of one log
+STALE_AFTER = 7 * 86400  # seconds without writes before any non-empty log is rotated
+KEEP_FULL_DAYS = 7  # archives younger than this are never thinned
+
+# The cron's own output (setup-log-rotation.sh); renaming it mid-run would lose
+# this run's output. The logrotate safety net caps it instead
+OWN_LOG = 'log-compact.log'
+
+# Logs renamed by us or by logrotate, waiting to be archived
+FINISHED_RE = re.compile(r'\.log\.(?:\d+|\d{8}T\d{6})(?:\.gz)?$')
+
+UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+def parse_size(value):
+    """'500M', '2G' -> bytes"""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([KMG]?)B?', value.upper())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size '{value}' (use e.g. 500M, 2G)")
+    return int(float(match.group(1)) * UNITS[match.group(2)])
+
+def fmt_size(n):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(n) < 1024:
+            return f"{n:.0f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+def load_state(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_state(path, state):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    tmp.replace(path)
+
+def rotation_due(path, state, now):
+    """Why a live log should be rotated now, or None"""
+    st = path.stat()
+    if not st.st_size:
+        return None
+    if st.st_size >= ROTATE_SIZE:
+        return 'size'
+    if now - st.st_mtime >= STALE_AFTER:
+        return 'stale'
+    if st.st_size >= ROTATE_MIN_SIZE and now - state.setdefault(path.name, now) >= ROTATE_AGE:
+        return 'daily'
+    return None
+
+def rotate_live(log_dir, state, plan=False):
+    """Rename live logs that are due; returns [(path, reason)]"""
+    now = time.time()
+    rotated = []
+    for path in sorted(Path(log_dir).glob('*.log')):
+        if path.name == OWN_LOG:
+            continue
+        reason = rotation_due(path, state, now)
+        if not reason:
+            continue
+        rotated.append((path, reason))
+        if plan:
+            continue
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))
+        path.rename(path.with_name(f'{path.name}.{stamp}'))
+        state[path.name] = now
+    if not plan and any(service_for_log(path.name) for path, _ in rotated):
+        # PM2 keeps writing to the renamed file until it reopens its logs
+        try:
+            subprocess.run(['pm2', 'reloadLogs'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60)
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"{Colors.YELLOW}⚠️  pm2 reloadLogs failed ({e}); PM2 logs reopen on the next restart{Colors.NC}")
+    return rotated
+
+def index_logs(log_dir):
+    """Let log-analyzer.py read the tail of rotated logs before they are archived"""
+    analyzer = Path(__file__).with_name('log-analyzer.py')
+    try:
+        result = subprocess.run([sys.executable, str(analyzer), '--log-dir', str(log_dir), '--scan-only'],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=600)
+        error = None if result.returncode == 0 else (result.stderr.strip().splitlines() or [f'exit {result.returncode}'])[-1]
+    except (OSError, subprocess.SubprocessError) as e:
+        error = str(e)
+    if error:
+        print(f"{Colors.YELLOW}⚠️  log-analyzer.py failed ({error}); unindexed lines stay searchable in the archive{Colors.NC}")
+
+def finished_logs(log_dir):
+    return sorted(path for path in Path(log_dir).iterdir() if path.is_file() and FINISHED_RE.search(path.name))
+
+def main():
+    parser = argparse.ArgumentParser(description='Rotate, compress and budget the CurrentMesh logs')
+    parser.add_argument('--budget', type=parse_size, default=parse_size(DEFAULT_BUDGET),
+                        help=f'Archive size limit (default {DEFAULT_BUDGET})')
+    parser.add_argument('--rate', type=float, default=READ_RATE, help='Read rate cap in MB/s (0 = unlimited)')
+    parser.add_argument('--keep-full', type=float, default=KEEP_FULL_DAYS,
+                        help='Days of archives never thinned to errors')
+    parser.add_argument('--log-dir', default=str(LOG_DIR), help='Directory with the logs')
+    parser.add_argument('--no-rotate', action='store_true', help='Only archive already rotated logs')
+    parser.add_argument('--plan', action='store_true', help='Show what would be done without changing anything')
+    args = parser.parse_args()
+
+    log_dir = Path(args.log_dir)
+    archive_dir = log_dir / ARCHIVE_DIR.name
+    state_path = archive_dir / 'rotation-state.json'
+    if not log_dir.is_dir():
+        print(f"{Colors.RED}Error: {log_dir} not found{Colors.NC}")
+        sys.exit(1)
+    try:
+        os.nice(10)
+    except OSError:
+        pass
+    if zstandard is None:
+        print(f"{Colors.YELLOW}⚠️  zstandard module not installed, archiving with gzip (pip install zstandard){Colors.NC}")
+
+    state = load_state(state_path)
+    if not args.no_rotate:
+        for path, reason in rotate_live(log_dir, state, args.plan):
+            print(f"{Colors.BLUE}🔄 {'Would rotate' if args.plan else 'Rotated'} {path.name} ({reason}){Colors.NC}")
+
+    if not args.plan and finished_logs(log_dir):
+        index_logs(log_dir)
+
+    throttle = Throttle(args.rate * 1024 * 1024 if args.rate else None)
+    raw_total = compressed_total = 0
+    failed = 0
+    for path in finished_logs(log_dir):
+        if args.plan:
+            print(f"📦 Would archive {path.name} ({fmt_size(path.stat().st_size)})")
+            continue
+        try:
+            archive, raw, compressed = archive_file(path, archive_dir, throttle)
+        except (OSError, EOFError) as e:
+            print(f"{Colors.RED}❌ Could not archive {path.name}: {e}{Colors.NC}")
+            failed += 1
+            continue
+        raw_total += raw
+        compressed_total += compressed
+        print(f"{Colors.GREEN}📦 {path.name} -> {archive.name} ({fmt_size(raw)} -> {fmt_size(compressed)}){Colors.NC}")
+
+    for action, path, size in enforce_budget(args.budget, archive_dir, args.keep_full * 86400, throttle, args.plan):
+        verb = {'thin': 'Thinned' if not args.plan else 'Would thin',
+                'delete': 'Deleted' if not args.plan else 'Would delete'}[action]
+        detail = f"saved {fmt_size(size)}" if action == 'thin' and not args.plan else fmt_size(size)
+        print(f"{Colors.YELLOW}🧹 {verb} {path.name} ({detail}){Colors.NC}")
+
+    if not args.plan:
+        save_state(state_path, state)
+    total = sum(log_archive.archive_size(path) for path, _ in log_archive.list_archives(archive_dir))
+    if raw_total:
+        print(f"\n{Colors.GREEN}✅ Archived {fmt_size(raw_total)} as {fmt_size(compressed_total)} "
+              f"({raw_total / max(compressed_total, 1):.1f}x){Colors.NC}")
+    print(f"{Colors.GREEN}✅ Archive: {fmt_size(total)} of {fmt_size(args.budget)} budget{Colors.NC}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Log Search
+Greps the compressed log archive (logs/archive/) and the live logs for a
+pattern within a time window. Archive frames outside the window are skipped
+using their index, so narrow searches over months of history stay fast.
+"""
+
+import argparse
+import calendar
+import fnmatch
+import re
+import sys
+import time
+from pathlib import Path
+
+from log_archive import ARCHIVE_DIR, LOG_DIR, TIMESTAMP_RE, list_archives, match_time, read_frames
+from term_colors import Colors
+
+def parse_time(value):
+    """'7d'/'12h'/'30m' ago, or 'YYYY-MM-DD[ HH:MM[:SS]]' as logged -> epoch seconds"""
+    match = re.fullmatch(r'(\d+)([mhd])', value)
+    if match:
+        return int(time.time()) - int(match.group(1)) * {'m': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d'):
+        try:
+            # Same convention as log_archive.parse_stamp
+            return calendar.timegm(time.strptime(value, fmt))
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"invalid time '{value}' (use e.g. 7d or '2026-01-06 03:00')")
+
+def line_timestamp(data, start, limit=100):
+    """Timestamp of the line at start, or of the nearest stamped line above it (continuations)"""
+    for _ in range(limit):
+        stamp = TIMESTAMP_RE.match(data, start)
+        if stamp:
+            return match_time(stamp)
+        if not start:
+            return None
+        start = data.rfind(b'\n', 0, start - 1) + 1
+    return None
+
+def matching_lines(frames, pattern, since, until):
+    """
+    Lines matching pattern whose timestamp (inherited by continuation lines)
+    is in the window. The pattern runs over whole frames, so only matching
+    lines are split out and have their timestamp parsed
+    """
+    for data in frames:
+        line_end = -1
+        for match in pattern.finditer(data):
+            if match.start() <= line_end:
+                continue  # another hit on a line already reported
+            line_start = data.rfind(b'\n', 0, match.start()) + 1
+            line_end = data.find(b'\n', match.end())
+            if line_end < 0:
+                line_end = len(data)
+            if since is not None or until is not None:
+                ts = line_timestamp(data, line_start)
+                if since is not None and (ts is None or ts < since):
+                    continue
+                if until is not None and ts is not None and ts > until:
+                    continue
+            yield data[line_start:line_end]
+
+def main():
+    parser = argparse.ArgumentParser(description='Search archived and live logs')
+    parser.add_argument('pattern', help='Regular expression')
+    parser.add_argument('--since', type=parse_time, help="Window start (7d, or '2026-01-06 03:00' as logged)")
+    parser.add_argument('--until', type=parse_time, help='Window end')
+    parser.add_argument('--stream', default='*', help="Log name glob, e.g. 'marketing-err*'")
+    parser.add_argument('-i', '--ignore-case', action='store_true')
+    parser.add_argument('--no-live', action='store_true', help='Only search the archive')
+    parser.add_argument('--log-dir', default=str(LOG_DIR), help='Directory with the logs')
+    parser.add_argument('--max', type=int, default=1000, help='Stop after this many matches')
+    args = parser.parse_args()
+
+    try:
+        pattern = re.compile(args.pattern.encode(), re.M | (re.I if args.ignore_case else 0))
+    except re.error as e:
+        print(f"{Colors.RED}Error: invalid pattern: {e}{Colors.NC}")
+        sys.exit(2)
+
+    sources = []
+    for path, fields in list_archives(f'{args.log_dir}/{ARCHIVE_DIR.name}'):
+        if fnmatch.fnmatch(fields['name'], args.stream):
+            sources.append((fields['name'], read_frames(path, fields['ext'], args.since, args.until)))
+    if not args.no_live:
+        for path in sorted(Path(args.log_dir).glob('*.log')):
+            if fnmatch.fnmatch(path.stem, args.stream):
+                sources.append((path.stem, iter([path.read_bytes()])))
+
+    found = 0
+    try:
+        for name, frames in sources:
+            for line in matching_lines(frames, pattern, args.since, args.until):
+                print(f"{Colors.BLUE}{name}:{Colors.NC} {line.decode(errors='replace')}")
+                found += 1
+                if found >= args.max:
+                    print(f"{Colors.YELLOW}⚠️  Stopped after {args.max} matches (--max){Colors.NC}")
+                    return
+    except RuntimeError as e:
+        print(f"{Colors.RED}Error: {e}{Colors.NC}")
+        sys.exit(2)
+    if not found:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+"""
+Compressed, searchable log archive
+Finished log files are streamed into logs/archive/ as a series of
+independently compressed frames (zstd when the zstandard module is
+installed, gzip otherwise) with a sidecar index of each frame's time range
+and offsets. Memory stays bounded by the frame size, and a search only
+decompresses the frames overlapping its window. Under a disk budget the
+oldest archives are first thinned to their warning and error lines, then
+dropped.
+"""
+
+import calendar
+import gzip
+import os
+import re
+import struct
+import time
+import zlib
+from pathlib import Path
+
+from log_signatures import PREFILTER
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LOG_DIR = Path(__file__).parent.parent / 'logs'
+ARCHIVE_DIR = LOG_DIR / 'archive'
+
+FRAME_SIZE = 1024 * 1024  # uncompressed bytes per independently decompressible frame
+READ_SIZE = 256 * 1024  # bytes read from a source per step
+ZSTD_LEVEL = 15
+GZIP_LEVEL = 9
+
+# first ts, last ts, uncompressed offset, compressed offset, compressed length
+INDEX = struct.Struct('<IIQQI')
+
+# "2026-01-01T23:32:16: " (PM2 time prefix), "[2026-01-02 03:20:01] " (ops scripts)
+# or '{"ts":1767670800.123,' (api_trace.py JSON lines, epoch seconds)
+TIMESTAMP_RE = re.compile(rb'^(?:\[?(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})|\{"ts":(\d+))', re.M)
+
+# Lines kept when an old archive is thinned: crash signatures plus anything
+# that reads as a warning or error
+THIN_KEEP = re.compile(PREFILTER.pattern + rb'|(?i:error|warn|fail|fatal|exception|refused|timeout)'
+                       + '|❌|⚠️|🚨'.encode())
+
+ARCHIVE_NAME_RE = re.compile(r'^(?P<name>.+)\.(?P<stamp>\d{8}T\d{6})(?P<thin>\.thin)?(?:-\d+)?\.log\.(?P<ext>zst|gz)$')
+
+def codec():
+    """(extension, compress, decompress) for new archives"""
+    if zstandard is not None:
+        return ('zst', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress,
+                zstandard.ZstdDecompressor().decompress)
+    return 'gz', lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0), gzip.decompress
+
+def decompressor(ext):
+    if ext == 'zst':
+        if zstandard is None:
+            raise RuntimeError('zstandard module is required to read .zst archives (pip install zstandard)')
+        return zstandard.ZstdDecompressor().decompress
+    return gzip.decompress
+
+def parse_stamp(date, clock):
+    """Log timestamps are compared as logged (no timezone conversion)"""
+    return calendar.timegm(time.strptime(f'{date.decode()} {clock.decode()}', '%Y-%m-%d %H:%M:%S'))
+
+def match_time(match):
+    """Seconds for a TIMESTAMP_RE match; trace epochs become local time as logged, like parse_stamp"""
+    date, clock, epoch = match.groups()
+    if epoch:
+        return calendar.timegm(time.localtime(int(epoch)))
+    return parse_stamp(date, clock)
+
+def frame_times(data, fallback):
+    """(first, last) timestamp in a frame; lines without one inherit the previous"""
+    first = TIMESTAMP_RE.search(data)
+    if not first:
+        return fallback, fallback
+    last = first
+    # Only the tail needs scanning for the last stamp
+    for match in TIMESTAMP_RE.finditer(data, max(first.end(), len(data) - 4096)):
+        last = match
+    return match_time(first), match_time(last)
+
+class Throttle:
+    """Caps sustained read throughput so compaction never saturates the disk"""
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self.started = time.monotonic()
+        self.bytes = 0
+
+    def consume(self, n):
+        if not self.rate:
+            return
+        self.bytes += n
+        ahead = self.bytes / self.rate - (time.monotonic() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+def _open_source(path):
+    return gzip.open(path, 'rb') if str(path).endswith('.gz') else open(path, 'rb')
+
+def _drop_cache(path):
+    """Don't let a one-off sequential read evict the page cache of live services"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    except (OSError, AttributeError):
+        pass
+
+def iter_lines_chunks(f, throttle):
+    """Yield whole-line byte chunks of about FRAME_SIZE from a stream"""
+    pending = b''
+    while True:
+        data = f.read(READ_SIZE)
+        throttle.consume(len(data))
+        if not data:
+            break
+        pending += data
+        if len(pending) >= FRAME_SIZE:
+            cut = pending.rfind(b'\n', 0, FRAME_SIZE * 2) + 1 or len(pending)
+            yield pending[:cut]
+            pending = pending[cut:]
+    if pending:
+        yield pending
+
+def write_archive(chunks, dest_dir, name, fallback_ts, thin=False):
+    """
+    Compress chunks into a new archive plus index; returns (path, raw bytes, compressed bytes)
+    The file is named after its first timestamp so archives sort by age
+    """
+    ext, compress, _ = codec()
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    tmp = dest_dir / f'.{name}.{os.getpid()}.tmp'
+    index = []
+    raw_offset = comp_offset = 0
+    last_ts = fallback_ts
+    with open(tmp, 'wb') as out:
+        for chunk in chunks:
+            if thin:
+                chunk = b''.join(line for line in chunk.splitlines(True) if THIN_KEEP.search(line))
+                if not chunk:
+                    continue
+            first, last_ts = frame_times(chunk, last_ts)
+            frame = compress(chunk)
+            out.write(frame)
+            index.append(INDEX.pack(first, last_ts, raw_offset, comp_offset, len(frame)))
+            raw_offset += len(chunk)
+            comp_offset += len(frame)
+        out.flush()
+        os.fsync(out.fileno())
+
+    start = INDEX.unpack(index[0])[0] if index else fallback_ts
+    stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(start))
+    path = dest_dir / f"{name}.{stamp}{'.thin' if thin else ''}.log.{ext}"
+    n = 0
+    while path.exists():
+        # Same stream rotated twice within a second
+        n += 1
+        path = dest_dir / f"{name}.{stamp}{'.thin' if thin else ''}-{n}.log.{ext}"
+    with open(index_path(path), 'wb') as f:
+        f.write(b''.join(index))
+    os.replace(tmp, path)
+    return path, raw_offset, comp_offset
+
+def index_path(archive):
+    return Path(f'{archive}.idx')
+
+def stream_name(filename):
+    """'marketing-err-4.log.20260103' / 'monitor.log.1.gz' -> 'marketing-err-4' / 'monitor'"""
+    return filename.split('.log', 1)[0]
+
+def archive_file(path, dest_dir=ARCHIVE_DIR, throttle=None, thin=False):
+    """Stream one finished log (plain or .gz) into the archive and remove it"""
+    path = Path(path)
+    throttle = throttle or Throttle()
+    with _open_source(path) as f:
+        archive, raw, compressed = write_archive(iter_lines_chunks(f, throttle), dest_dir,
+                                                 stream_name(path.name), int(path.stat().st_mtime), thin)
+    _drop_cache(path)
+    path.unlink()
+    return archive, raw, compressed
+
+def list_archives(dest_dir=ARCHIVE_DIR):
+    """Archives oldest first, as (path, parsed name fields)"""
+    archives = []
+    if not Path(dest_dir).is_dir():
+        return archives
+    for path in Path(dest_dir).iterdir():
+        match = ARCHIVE_NAME_RE.match(path.name)
+        if match:
+            archives.append((path, match.groupdict()))
+    archives.sort(key=lambda item: (item[1]['stamp'], item[0].name))
+    return archives
+
+def archive_size(path):
+    try:
+        return path.stat().st_size + index_path(path).stat().st_size
+    except FileNotFoundError:
+        return 0
+
+def read_index(path):
+    try:
+        data = index_path(path).read_bytes()
+    except FileNotFoundError:
+        return []
+    return list(INDEX.iter_unpack(data[:len(data) - len(data) % INDEX.size]))
+
+def read_frames(path, ext, since=None, until=None):
+    """Yield decompressed frames of one archive overlapping [since, until]"""
+    decompress = decompressor(ext)
+    with open(path, 'rb') as f:
+        for first, last, _, offset, length in read_index(path):
+            # Merged streams aren't strictly ordered; treat the stamps as a range
+            if (since is not None and max(first, last) < since) or (until is not None and min(first, last) > until):
+                continue
+            f.seek(offset)
+            yield decompress(f.read(length))
+
+def remove_archive(path):
+    for target in (path, index_path(path)):
+        try:
+            target.unlink()
+        except FileNotFoundError:
+            pass
+
+def thin_archive(path, fields, throttle=None):
+    """Rewrite an archive keeping only warning/error lines; returns bytes saved"""
+    before = archive_size(path)
+    frames = read_frames(path, fields['ext'])
+    try:
+        fallback = calendar.timegm(time.strptime(fields['stamp'], '%Y%m%dT%H%M%S'))
+        new, _, _ = write_archive(frames, path.parent, fields['name'], fallback, thin=True)
+    except (OSError, zlib.error, EOFError, RuntimeError):
+        return 0
+    remove_archive(path)
+    if throttle:
+        throttle.consume(before)
+    return before - archive_size(new)
+
+def enforce_budget(budget, dest_dir=ARCHIVE_DIR, keep_full=7 * 86400, throttle=None, plan=False):
+    """
+    Keep the archive under budget bytes: thin the oldest full archives older
+    than keep_full seconds, then delete the oldest archives outright.
+    Returns a list of (action, path, bytes) taken (or planned)
+    """
+    archives = list_archives(dest_dir)
+    total = sum(archive_size(path) for path, _ in archives)
+    actions = []
+    cutoff = time.strftime('%Y%m%dT%H%M%S', time.gmtime(time.time() - keep_full))
+    for path, fields in archives:
+        if total <= budget:
+            return actions
+        if fields['thin'] or fields['stamp'] >= cutoff:
+            continue
+        if plan:
+            actions.append(('thin', path, archive_size(path)))
+            continue
+        saved = thin_archive(path, fields, throttle)
+        total -= saved
+        actions.append(('thin', path, saved))
+
+    # A plan can't know what thinning frees, so it shows the worst case
+    for path, _ in list_archives(dest_dir):
+        if total <= budget:
+            break
+        size = archive_size(path)
+        if not plan:
+            remove_archive(path)
+        total -= size
+        actions.append(('delete', path, size))
+    return actions
@@ -0,0 +1,41 @@
+"""
+Crash and error signatures found in the PM2 service logs
+Shared by the monitor daemon (live tailing) and the log analyzer (history)
+"""
+
+import re
+
+# key, pattern, label
+SIGNATURES = [
+    ('oom', re.compile(r'heap out of memory|Reached heap limit|Allocation failed'), 'Out of memory'),
+    ('eaddrinuse', re.compile(r'EADDRINUSE'), 'Port already in use'),
+    ('unhandled_rejection', re.compile(r'(?i:Unhandled ?(?:Promise ?)?Rejection)'), 'Unhandled rejection'),
+    ('uncaught_exception', re.compile(r'uncaughtException|Uncaught (?:Error|TypeError|ReferenceError)'), 'Uncaught exception'),
+    ('fatal', re.compile(r'FATAL ERROR|Segmentation fault|SIGABRT'), 'Fatal error'),
+]
+
+# Lines a service prints when it (re)starts; many in a short window is a restart storm
+STARTUP_PATTERN = re.compile(r'Server running on|Ready in \d|VITE v[\d.]+ +ready')
+
+LABELS = {key: label for key, _, label in SIGNATURES}
+
+# One bytes pattern matching any signature or startup line, for scanning large
+# buffers without splitting them into lines first; confirm hits with classify()
+PREFILTER = re.compile('|'.join(
+    [pattern.pattern for _, pattern, _ in SIGNATURES] + [STARTUP_PATTERN.pattern]).encode())
+
+def classify(line):
+    """Return the key of the first signature the line matches, or None"""
+    for key, pattern, _ in SIGNATURES:
+        if pattern.search(line):
+            return key
+    return None
+
+def service_for_log(filename):
+    """
+    Map a PM2 log file name to its service
+    'marketing-err-4.log' -> 'currentmesh-marketing',
+    'sentry-relay-err.log' -> 'currentmesh-sentry-relay'; None for non-service logs
+    """
+    match = re.match(r'^([a-z]+(?:-[a-z]+)*?)-(?:err|out|combined)(?:-\d+)?\.log', filename)
+    return f'currentmesh-{match.group(1)}' if match else None
@@ -0,0 +1,291 @@
+"""
+Embedded time-series store for monitor metrics
+Each metric is kept as three append-only binary files of fixed-size records
+under logs/metrics/: raw samples (1s) and 1m/1h rollups holding min, max,
+average, p99 and sample count. Old records are trimmed per resolution, so
+months of hourly history stay within a few MB. Range queries binary-search
+the sorted files and read only the records they need.
+
+One process writes a given metric at a time, enforced with a flock on
+<metric>.lock: a second writer skips that metric's samples until the lock
+is free. Readers never lock.
+"""
+
+import fcntl
+import math
+import mmap
+import os
+import re
+import struct
+import time
+from array import array
+from pathlib import Path
+
+METRICS_DIR = Path(__file__).parent.parent / 'logs' / 'metrics'
+
+# name, bucket seconds, retention seconds
+RESOLUTIONS = (
+    ('1s', 1, 6 * 3600),
+    ('1m', 60, 14 * 86400),
+    ('1h', 3600, 2 * 365 * 86400),
+)
+
+RAW = struct.Struct('<If')  # timestamp, value
+ROLLUP = struct.Struct('<IffffH')  # bucket start, min, max, avg, p99, count
+
+FLUSH_INTERVAL = 10  # seconds raw samples may sit in the write buffer
+LOCK_RETRY = 60  # seconds between attempts to take over a metric another process writes
+TRIM_SLACK = 0.25  # fraction past retention before a file is rewritten
+
+METRIC_NAME_RE = re.compile(r'^[A-Za-z0-9_.:-]+$')
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def series_path(directory, metric, resolution):
+    return Path(directory) / f'{metric}.{resolution}'
+
+def _record_struct(resolution):
+    return RAW if resolution == '1s' else ROLLUP
+
+def _lower_bound(buf, record, ts):
+    """Index of the first record with timestamp >= ts"""
+    lo, hi = 0, len(buf) // record.size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if struct.unpack_from('<I', buf, mid * record.size)[0] < ts:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def trim(path, resolution, cutoff):
+    """Drop records older than cutoff by rewriting the file's tail"""
+    record = _record_struct(resolution)
+    with open(path, 'rb') as f:
+        data = f.read()
+    start = _lower_bound(data, record, cutoff) * record.size
+    if not start:
+        return
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data[start:])
+    os.replace(tmp, path)
+
+class Bucket:
+    """Raw values of one rollup bucket, kept until the bucket closes"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.start = None
+        self.values = array('f')
+
+    def add(self, ts, value):
+        """Add a sample; returns the closed bucket's rollup row when ts starts a new one"""
+        start = ts - ts % self.seconds
+        row = None
+        if self.start is not None and start != self.start:
+            row = self.row()
+        if start != self.start:
+            self.start = start
+            self.values = array('f')
+        self.values.append(value)
+        return row
+
+    def row(self):
+        if not self.values:
+            return None
+        values = sorted(self.values)
+        # Counts above the field's range are clamped; averages stay exact
+        return ROLLUP.pack(self.start, values[0], values[-1], sum(values) / len(values),
+                           percentile(values, 99), min(len(values), 0xFFFF))
+
+class SeriesWriter:
+    """Appends one metric's raw samples and rollups"""
+
+    def __init__(self, directory, metric):
+        if not METRIC_NAME_RE.match(metric):
+            raise ValueError(f"invalid metric name '{metric}'")
+        self.directory = Path(directory)
+        self.metric = metric
+        self.files = {}
+        self.buckets = {name: Bucket(seconds) for name, seconds, _ in RESOLUTIONS if name != '1s'}
+        self.lock = None
+        self.lock_tried = None
+
+    def acquire(self):
+        """
+        Take the metric's writer lock; False if another process holds it
+        Separate from the data files, which trim() replaces
+        """
+        if self.lock:
+            return True
+        now = time.monotonic()
+        if self.lock_tried is not None and now - self.lock_tried < LOCK_RETRY:
+            return False
+        self.lock_tried = now
+        lock = open(self.directory / f'{self.metric}.lock', 'w')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return False
+        self.lock = lock
+        return True
+
+    def _file(self, resolution):
+        f = self.files.get(resolution)
+        if f is None:
+            f = self.files[resolution] = open(series_path(self.directory, self.metric, resolution), 'ab')
+        return f
+
+    def add(self, ts, value):
+        self._file('1s').write(RAW.pack(ts, value))
+        for resolution, bucket in self.buckets.items():
+            row = bucket.add(ts, value)
+            if row:
+                self._file(resolution).write(row)
+                if resolution == '1m':
+                    self.flush()
+                    self.trim(ts)
+
+    def flush(self):
+        for f in self.files.values():
+            f.flush()
+
+    def trim(self, now):
+        """Rewrite files that have grown well past their retention"""
+        for resolution, seconds, retention in RESOLUTIONS:
+            path = series_path(self.directory, self.metric, resolution)
+            record = _record_struct(resolution)
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                continue
+            if size / record.size <= retention / seconds * (1 + TRIM_SLACK):
+                continue
+            f = self.files.pop(resolution, None)
+            if f:
+                f.close()
+            trim(path, resolution, now - retention)
+
+    def close(self):
+        """Write the open buckets' partial rollups and close the files"""
+        for resolution, bucket in self.buckets.items():
+            row = bucket.row()
+            if row:
+                self._file(resolution).write(row)
+            bucket.start, bucket.values = None, array('f')
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+        if self.lock:
+            self.lock.close()
+            self.lock = None
+
+class MetricStore:
+    """Writer side: record(metric, value) for any number of metrics"""
+
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.series = {}
+        self.flushed = time.monotonic()
+
+    def record(self, metric, value, ts=None):
+        """Append a sample; returns False (and drops it) while another process writes the metric"""
+        writer = self.series.get(metric)
+        if writer is None:
+            writer = self.series[metric] = SeriesWriter(self.directory, metric)
+        if not writer.acquire():
+            return False
+        writer.add(int(time.time() if ts is None else ts), value)
+        if time.monotonic() - self.flushed >= FLUSH_INTERVAL:
+            self.flush()
+        return True
+
+    def flush(self):
+        for writer in self.series.values():
+            writer.flush()
+        self.flushed = time.monotonic()
+
+    def close(self):
+        for writer in self.series.values():
+            writer.close()
+
+def list_metrics(directory=METRICS_DIR):
+    suffixes = tuple(f'.{name}' for name, _, _ in RESOLUTIONS)
+    return sorted({path.stem for path in Path(directory).iterdir() if path.name.endswith(suffixes)}) \
+        if Path(directory).is_dir() else []
+
+def first_timestamp(metric, resolution, directory=METRICS_DIR):
+    try:
+        with open(series_path(directory, metric, resolution), 'rb') as f:
+            head = f.read(4)
+    except FileNotFoundError:
+        return None
+    return struct.unpack('<I', head)[0] if len(head) == 4 else None
+
+def choose_resolution(metric, start, end, directory=METRICS_DIR, max_points=None):
+    """
+    Finest resolution that still holds data back to start, optionally
+    capped so the window spans at most max_points records
+    """
+    for name, seconds, _ in RESOLUTIONS:
+        first = first_timestamp(metric, name, directory)
+        if first is None or first > start:
+            continue
+        if max_points and (end - start) / seconds > max_points:
+            continue
+        return name
+    return RESOLUTIONS[-1][0]
+
+def read_range(metric, resolution, start, end, directory=METRICS_DIR):
+    """
+    Rows with start <= ts < end, as (ts, min, max, avg, p99, count)
+    Raw samples come back in the same shape with count 1
+    """
+    record = _record_struct(resolution)
+    path = series_path(directory, metric, resolution)
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return []
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        size -= size % record.size  # ignore a record still being written
+        if not size:
+            return []
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as buf:
+            lo = _lower_bound(buf, record, start)
+            hi = _lower_bound(buf, record, end)
+            chunk = buf[lo * record.size:hi * record.size]
+    if record is RAW:
+        return [(ts, v, v, v, v, 1) for ts, v in RAW.iter_unpack(chunk)]
+    return list(ROLLUP.iter_unpack(chunk))
+
+def summarize(rows):
+    """min/avg/max/p99 over rows; p99 is exact for raw rows, count-weighted over rollup p99s otherwise"""
+    if not rows:
+        return None
+    count = sum(row[5] for row in rows)
+    weighted = sorted((row[4], row[5]) for row in rows)
+    rank = max(1, math.ceil(0.99 * count))
+    seen = 0
+    for p99, n in weighted:
+        seen += n
+        if seen >= rank:
+            break
+    return {
+        'min': min(row[1] for row in rows),
+        'avg': sum(row[3] * row[5] for row in rows) / count,
+        'max': max(row[2] for row in rows),
+        'p99': p99,
+        'samples': count,
+        'from': rows[0][0],
+        'to': rows[-1][0],
+    }
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Monitor Metrics Query
+Answers range questions from the monitor time-series store (logs/metrics/):
+min/avg/max/p99 of a metric over any window, optionally broken into steps.
+Picks the finest resolution (1s, 1m, 1h) that still covers the window.
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import datetime
+
+from metric_store import METRICS_DIR, RESOLUTIONS, choose_resolution, list_metrics, read_range, summarize
+from term_colors import Colors
+
+MAX_POINTS = 100000  # records read per query before stepping up a resolution
+
+def parse_duration(value):
+    """'90s', '30m', '12h', '7d' -> seconds"""
+    match = re.fullmatch(r'(\d+)([smhd])', value)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration '{value}' (use e.g. 30m, 12h, 7d)")
+    return int(match.group(1)) * {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+
+def parse_time(value):
+    """'now', a duration ago ('7d'), local 'YYYY-MM-DD[ HH:MM[:SS]]' or epoch seconds -> epoch seconds"""
+    if value == 'now':
+        return int(time.time())
+    if re.fullmatch(r'\d+[smhd]', value):
+        return int(time.time()) - parse_duration(value)
+    if re.fullmatch(r'\d{9,}', value):
+        return int(value)
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d'):
+        try:
+            return int(datetime.strptime(value, fmt).timestamp())
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"invalid time '{value}' (use now, 7d, '2026-01-06 03:00' or epoch seconds)")
+
+def fmt_time(ts):
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+
+def fmt_value(value):
+    return f"{value:.3g}" if abs(value) < 1000 else f"{value:.0f}"
+
+def step_rows(rows, start, end, step):
+    """Group rows into [start + k*step, start + (k+1)*step) windows"""
+    groups = {}
+    for row in rows:
+        groups.setdefault((row[0] - start) // step, []).append(row)
+    return [(start + k * step, summarize(groups[k])) for k in range((end - start + step - 1) // step) if k in groups]
+
+def main():
+    parser = argparse.ArgumentParser(description='Query min/avg/max/p99 of monitor metrics over a time window')
+    parser.add_argument('metric', nargs='?', help='Metric name (see --list)')
+    parser.add_argument('--from', dest='start', type=parse_time, default=parse_time('1h'),
+                        help="Window start: now, a duration ago (7d) or '2026-01-06 03:00' (default: 1h)")
+    parser.add_argument('--to', dest='end', type=parse_time, default=parse_time('now'), help='Window end (default: now)')
+    parser.add_argument('--step', type=parse_duration, help='Report per step (e.g. 1h) instead of one summary')
+    parser.add_argument('--resolution', choices=[name for name, _, _ in RESOLUTIONS], help='Force a resolution')
+    parser.add_argument('--dir', default=str(METRICS_DIR), help='Metrics directory')
+    parser.add_argument('--list', action='store_true', help='List recorded metrics')
+    parser.add_argument('--json', action='store_true', help='Print JSON')
+    args = parser.parse_args()
+
+    if args.list or not args.metric:
+        for metric in list_metrics(args.dir):
+            print(metric)
+        return
+    if args.end <= args.start:
+        print(f"{Colors.RED}Error: --to must be after --from{Colors.NC}")
+        sys.exit(1)
+
+    resolution = args.resolution or choose_resolution(args.metric, args.start, args.end, args.dir, MAX_POINTS)
+    rows = read_range(args.metric, resolution, args.start, args.end, args.dir)
+    if not rows:
+        print(f"{Colors.YELLOW}⚠️  No {args.metric} data between {fmt_time(args.start)} and {fmt_time(args.end)}"
+              f"{Colors.NC}")
+        sys.exit(1)
+
+    if args.step:
+        results = step_rows(rows, args.start, args.end, args.step)
+    else:
+        results = [(args.start, summarize(rows))]
+
+    if args.json:
+        print(json.dumps({'metric': args.metric, 'resolution': resolution, 'from': args.start, 'to': args.end,
+                          'windows': [dict(summary, start=start) for start, summary in results]}, indent=2))
+        return
+
+    print(f"{Colors.BLUE}{args.metric} from {fmt_time(args.start)} to {fmt_time(args.end)} "
+          f"({resolution} resolution){Colors.NC}")
+    print(f"{'Window start':<20} {'Min':>9} {'Avg':>9} {'Max':>9} {'p99':>9} {'Samples':>8}")
+    for start, s in results:
+        print(f"{fmt_time(start):<20} {fmt_value(s['min']):>9} {fmt_value(s['avg']):>9} {fmt_value(s['max']):>9} "
+              f"{fmt_value(s['p99']):>9} {s['samples']:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Service Monitor Daemon
+Long-lived replacement for the monitor-services.sh cron job: probes every
+service every few seconds over keep-alive connections, tails the PM2 error
+logs with inotify for crash signatures, and restarts unhealthy services with
+the same cooldown and max-attempts rules
+"""
+
+import argparse
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from health_check import OK, HealthChecker, pm2_statuses
+from log_signatures import LABELS, classify, service_for_log
+from metric_store import MetricStore
+
+PROJECT_DIR = Path('/var/www/currentmesh')
+LOG_FILE = PROJECT_DIR / 'logs' / 'service-monitor.log'
+LOG_DIR = PROJECT_DIR / 'logs'
+# The daemon's own stderr (error_file of currentmesh-monitor in ecosystem.config.js)
+OWN_ERR_LOG = 'monitor-err.log'
+
+# Same services and health endpoints as monitor-services.sh
+SERVICES = [
+    ('currentmesh-server', 3000, '/'),
+    ('currentmesh-marketing', 3001, '/api/health'),
+    ('currentmesh-app', 5000, '/'),
+    ('currentmesh-client', 5001, '/'),
+    ('currentmesh-admin', 5002, '/'),
+]
+
+PROBE_INTERVAL = 2  # seconds
+PROBE_TIMEOUT = 5  # seconds
+FAILURE_THRESHOLD = 3  # consecutive failed probes before acting
+MAX_RESTART_ATTEMPTS = 3
+RESTART_COOLDOWN = 300  # 5 minutes between restart attempts
+STARTUP_GRACE = 10  # seconds to let a restarted service come up
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+EVENT_HEADER = struct.Struct('iIII')
+
+def log(message):
+    line = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}"
+    print(line, flush=True)
+    with open(LOG_FILE, 'a') as f:
+        f.write(line + '\n')
+
+class RestartPolicy:
+    """
+    Cooldown and max-attempts rules from monitor-services.sh
+    State lives in the same /tmp files, so the cron script and the daemon
+    agree on it. The attempt count resets once a service has stayed healthy
+    for a full cooldown after its last restart.
+    """
+
+    def __init__(self, cooldown=RESTART_COOLDOWN, max_attempts=MAX_RESTART_ATTEMPTS):
+        self.cooldown = cooldown
+        self.max_attempts = max_attempts
+
+    def _read(self, path, default=0):
+        try:
+            return int(Path(path).read_text().strip())
+        except (OSError, ValueError):
+            return default
+
+    def _files(self, name):
+        return f'/tmp/{name}_restart_count', f'/tmp/{name}_last_restart'
+
+    def check(self, name):
+        """Return (allowed, reason, seconds until it is worth asking again)"""
+        count_file, last_file = self._files(name)
+        since = int(time.time()) - self._read(last_file)
+        if since < self.cooldown:
+            return False, f"SKIP: Service {name} was restarted {since} seconds ago (cooldown active)", self.cooldown - since
+        count = self._read(count_file)
+        if count >= self.max_attempts:
+            return False, (f"ERROR: Service {name} has exceeded max restart attempts ({self.max_attempts}). "
+                           "Manual intervention required."), self.cooldown
+        return True, f"RESTART: Restarting service {name} (attempt {count + 1}/{self.max_attempts})", 0
+
+    def record(self, name):
+        count_file, last_file = self._files(name)
+        Path(count_file).write_text(str(self._read(count_file) + 1))
+        Path(last_file).write_text(str(int(time.time())))
+
+    def healthy(self, name):
+        """Forget past attempts once the service has been healthy for a cooldown"""
+        count_file, last_file = self._files(name)
+        if os.path.exists(count_file) and int(time.time()) - self._read(last_file) >= self.cooldown:
+            os.remove(count_file)
+
+class Inotify:
+    """Minimal ctypes binding for inotify; raises OSError where unavailable"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def watch(self, path, mask):
+        if self._add_watch(self.fd, os.fsencode(path), mask) < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {path}')
+
+    def read_names(self):
+        """Drain pending events; returns the file names they refer to"""
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                names.add(data[offset:offset + length].rstrip(b'\0').decode(errors='replace'))
+                offset += length
+
+class ErrorLogTailer:
+    """Follows the live PM2 error logs from their current end"""
+
+    def __init__(self, log_dir=LOG_DIR):
+        self.log_dir = Path(log_dir)
+        self.offsets = {}
+        for path in self.log_dir.glob('*-err.log'):
+            self.offsets[path.name] = path.stat().st_size
+
+    def read_new(self, name):
+        """Yield lines appended to one log since the last read"""
+        path = self.log_dir / name
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return
+        offset = self.offsets.get(name, 0)
+        if size < offset:
+            # Truncated by pm2 flush or rotation
+            offset = 0
+        if size == offset:
+            return
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        # Hold back a partial last line until it is complete
+        end = data.rfind(b'\n') + 1
+        self.offsets[name] = offset + end
+        for line in data[:end].decode(errors='replace').splitlines():
+            yield line
+
+class Monitor:
+    def __init__(self, services=SERVICES, interval=PROBE_INTERVAL, threshold=FAILURE_THRESHOLD,
+                 log_dir=LOG_DIR, dry_run=False, store=None):
+        # 2xx only, as monitor-services.sh required a 200
+        self.checker = HealthChecker(services, timeout=PROBE_TIMEOUT, ok_status=range(200, 300))
+        self.interval = interval
+        self.threshold = threshold
+        self.policy = RestartPolicy()
+        self.tailer = ErrorLogTailer(log_dir)
+        self.dry_run = dry_run
+        self.store = store
+        self.failures = {name: 0 for name, _, _ in services}
+        self.grace_until = {name: 0.0 for name, _, _ in services}
+        self.wake = asyncio.Event()
+
+    async def restart(self, name):
+        allowed, message, retry_in = self.policy.check(name)
+        log(message)
+        if not allowed or self.dry_run:
+            # Don't re-evaluate (and re-log) on every tick while blocked
+            self.grace_until[name] = time.monotonic() + (retry_in or RESTART_COOLDOWN)
+            return
+        try:
+            if await self.pm2('restart', name) != 0:
+                await self.pm2('start', str(PROJECT_DIR / 'ecosystem.config.js'), '--only', name)
+        except OSError as e:
+            log(f"ERROR: Could not run pm2 for {name}: {e}")
+            return
+        self.policy.record(name)
+        self.failures[name] = 0
+        self.grace_until[name] = time.monotonic() + STARTUP_GRACE
+
+    async def pm2(self, *args):
+        proc = await asyncio.create_subprocess_exec('pm2', *args,
+                                                    stdout=asyncio.subprocess.DEVNULL,
+                                                    stderr=asyncio.subprocess.DEVNULL)
+        return await proc.wait()
+
+    async def probe_loop(self):
+        while True:
+            results = await asyncio.to_thread(self.checker.sweep)
+            newly_failed = [r for r in results if r['status'] != OK and not self.failures[r['name']]]
+
+            # Only spawn pm2 when a service has just started failing
+            pm2 = await asyncio.to_thread(pm2_statuses) if newly_failed else None
+
+            for r in results:
+                name = r['name']
+                if self.store and r['latency_ms'] is not None:
+                    self.store.record(f'probe_ms.{name}', r['latency_ms'])
+                if r['status'] == OK:
+                    if self.failures[name]:
+                        log(f"OK: Service {name} recovered")
+                    self.failures[name] = 0
+                    self.policy.healthy(name)
+                    continue
+                if time.monotonic() < self.grace_until[name]:
+                    continue
+
+                self.failures[name] += 1
+                if self.failures[name] == 1:
+                    status = pm2.get(name, 'missing') if pm2 is not None else 'unknown'
+                    log(f"WARNING: Service {name} health check failed ({r['status']}, pm2 {status})")
+                if self.failures[name] >= self.threshold:
+                    await self.restart(name)
+
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+
+    def scan(self, names):
+        for name in names:
+            if not name.endswith('-err.log') or name == OWN_ERR_LOG:
+                continue
+            for line in self.tailer.read_new(name):
+                key = classify(line)
+                if key:
+                    log(f"CRASH: {service_for_log(name)} {LABELS[key]}: {line.strip()[:200]}")
+                    # Re-probe now instead of waiting for the next tick
+                    self.wake.set()
+
+    async def log_loop(self):
+        loop = asyncio.get_running_loop()
+        try:
+            inotify = Inotify()
+            inotify.watch(self.tailer.log_dir, IN_MODIFY | IN_CREATE | IN_MOVED_TO)
+        except OSError as e:
+            log(f"INFO: inotify unavailable ({e}), polling error logs every second")
+            while True:
+                self.scan([p.name for p in self.tailer.log_dir.glob('*-err.log')])
+                await asyncio.sleep(1)
+
+        ready = asyncio.Event()
+        loop.add_reader(inotify.fd, ready.set)
+        while True:
+            await ready.wait()
+            ready.clear()
+            self.scan(inotify.read_names())
+
+    async def run(self):
+        log(f"INFO: Monitor daemon started (probe every {self.interval}s, restart after {self.threshold} failures)")
+        await asyncio.gather(self.probe_loop(), self.log_loop())
+
+def main():
+    global LOG_FILE
+
+    parser = argparse.ArgumentParser(description='Event-driven CurrentMesh service monitor')
+    parser.add_argument('--interval', type=float, default=PROBE_INTERVAL, help='Seconds between probe sweeps')
+    parser.add_argument('--threshold', type=int, default=FAILURE_THRESHOLD,
+                        help='Consecutive failed probes before restarting')
+    parser.add_argument('--log-dir', default=str(LOG_DIR), help='Directory with the PM2 logs')
+    parser.add_argument('--log-file', default=str(LOG_FILE), help='Where to append monitor events')
+    parser.add_argument('--dry-run', action='store_true', help='Log restart decisions without restarting')
+    parser.add_argument('--no-store', action='store_true', help='Don\'t record probe latencies in the metrics store')
+    args = parser.parse_args()
+
+    LOG_FILE = Path(args.log_file)
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    store = None if args.no_store else MetricStore()
+    monitor = Monitor(interval=args.interval, threshold=args.threshold,
+                      log_dir=args.log_dir, dry_run=args.dry_run, store=store)
+    try:
+        asyncio.run(monitor.run())
+    except KeyboardInterrupt:
+        log("INFO: Monitor daemon stopped")
+    finally:
+        monitor.checker.close()
+        if store:
+            store.close()
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
@@ -24,13 +24,11 @@ check_disk_space() {
     local USAGE=$(df -h / | awk 'NR==2 {print $5}' | sed 's/%//')
     
     if [ "$USAGE" -ge "$DISK_CRITICAL" ]; then
-        log "🚨 CRITICAL: Disk usage at ${USAGE}% - Cleaning logs..."
-        # Clean old logs (keep last 7 days)
-        find "$PROJECT_ROOT/logs" -name "*.log" -mtime +7 -delete 2>/dev/null || true
-        find "$PROJECT_ROOT/logs" -name "*.log.*" -mtime +7 -delete 2>/dev/null || true
-        # Clean PM2 old logs
-        pm2 flush 2>/dev/null || true
-        log "✅ Log cleanup complete"
+        log "🚨 CRITICAL: Disk usage at ${USAGE}% - Compacting logs..."
+        # Compress finished logs and thin archives older than a day to their
+        # errors, rather than deleting history when it is needed most
+        python3 "$SCRIPT_DIR/log-compact.py" --log-dir "$PROJECT_ROOT/logs" --keep-full 1 >> "$LOG_FILE" 2>&1 || true
+        log "✅ Log compaction complete"
         return 2
     elif [ "$USAGE" -ge "$DISK_WARNING" ]; then
         log "⚠️  WARNING: Disk usage at ${USAGE}%"
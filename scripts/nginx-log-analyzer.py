@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Nginx Access Log Analyzer
+Streams nginx access logs (plain or rotated .gz) in one pass and ranks routes
+by the origin time they cost, so the routes worth making cacheable at the edge
+come first. Per-route latency percentiles come from fixed-size log-bucket
+sketches and the route table is capped, so memory stays bounded however large
+the logs are.
+
+Expects the currentmesh_timing log_format from nginx-setup.sh. Plain
+"combined" lines still count towards requests, just without timings.
+"""
+
+import argparse
+import gzip
+import json
+import math
+import re
+import sys
+import time
+from pathlib import Path
+
+from site_builds import SITES, strip_hash
+from term_colors import Colors
+
+DEFAULT_LOGS = ['/var/log/nginx/access.log']
+
+MAX_ROUTES = 2000  # routes tracked at once
+SKETCH_ACCURACY = 0.02  # relative error of the latency percentiles
+SKETCH_MIN = 0.001  # seconds; faster requests share the lowest bucket
+SKETCH_MAX_BUCKETS = 512
+
+# combined + $request_time $upstream_response_time "$sent_http_cache_control" "$host"
+LINE_RE = re.compile(
+    rb'^\S+ \S+ \S+ \[[^\]]+\] "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" (?P<status>\d{3}) \S+ "[^"]*" "[^"]*"'
+    rb'(?: (?P<request_time>[\d.]+) (?P<upstream_time>-|[\d.]+(?:[,:] [\d.]+)*)'
+    rb' "(?P<cache_control>[^"]*)" "(?P<host>[^"]*)")?')
+
+# Path segments that are really parameters
+UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I)
+HASH_RE = re.compile(r'^[0-9a-f]{16,}$', re.I)
+
+# Host -> site, for the bundler whose content hashes are folded (site_builds.strip_hash)
+SITE_BY_HOST = {site['host']: name for name, site in SITES.items()}
+
+# Responses that could be served from the edge at all
+CACHEABLE_METHODS = (b'GET', b'HEAD')
+CACHEABLE_STATUSES = (200, 203, 204, 206, 301, 404, 410)
+
+class QuantileSketch:
+    """
+    Log-bucketed histogram with bounded relative error (DDSketch-style)
+    Bucket i holds values in (gamma^(i-1), gamma^i]; when there are too many
+    buckets the lowest ones are merged, which only blurs the fastest requests
+    """
+
+    def __init__(self, accuracy=SKETCH_ACCURACY, max_buckets=SKETCH_MAX_BUCKETS):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets = {}
+        self.count = 0
+
+    def add(self, value):
+        index = math.ceil(math.log(max(value, SKETCH_MIN)) / self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        if len(self.buckets) > self.max_buckets:
+            lowest = sorted(self.buckets)[:2]
+            self.buckets[lowest[1]] += self.buckets.pop(lowest[0])
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Midpoint of the bucket, within the accuracy of the true value
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return None
+
+class RouteStats:
+    __slots__ = ('requests', 'origin', 'origin_seconds', 'uncached_seconds', 'cacheable', 'errors', 'sketch')
+
+    def __init__(self, requests=0):
+        self.requests = requests
+        self.origin = 0  # requests that were proxied to a service
+        self.origin_seconds = 0.0
+        # origin time on responses the edge could not cache, excluding no-store/private
+        self.uncached_seconds = 0.0
+        self.cacheable = 0
+        self.errors = 0
+        self.sketch = QuantileSketch()
+
+class RouteTable:
+    """
+    Per-route stats for the busiest routes only
+    Once the table doubles past its capacity it is pruned back to the busiest
+    routes (lossy counting); a route admitted after a prune starts from the
+    largest evicted count, so counts are upper bounds with a known error
+    """
+
+    def __init__(self, capacity=MAX_ROUTES):
+        self.capacity = capacity
+        self.routes = {}
+        self.floor = 0  # most requests any evicted route had
+        self.pruned = 0
+
+    def get(self, route):
+        stats = self.routes.get(route)
+        if stats is None:
+            if len(self.routes) >= 2 * self.capacity:
+                self._prune()
+            stats = self.routes[route] = RouteStats(self.floor)
+        return stats
+
+    def _prune(self):
+        ranked = sorted(self.routes.items(), key=lambda item: item[1].requests, reverse=True)
+        for _, stats in ranked[self.capacity:]:
+            self.floor = max(self.floor, stats.requests)
+        self.pruned += len(ranked) - self.capacity
+        self.routes = dict(ranked[:self.capacity])
+
+def normalize_path(path, host=None):
+    """'/api/users/42?x=1' -> '/api/users/:id'; bundler content hashes -> '.*'"""
+    path = path.split('?', 1)[0].split('#', 1)[0] or '/'
+    path = strip_hash(path, SITE_BY_HOST.get(host), '.*')
+    segments = []
+    for segment in path.split('/'):
+        if segment.isdigit():
+            segment = ':id'
+        elif UUID_RE.match(segment):
+            segment = ':uuid'
+        elif HASH_RE.match(segment):
+            segment = ':hash'
+        segments.append(segment)
+    return '/'.join(segments)
+
+def opted_out(cache_control):
+    """True if the origin deliberately keeps the response out of shared caches"""
+    value = cache_control.lower()
+    return 'no-store' in value or 'private' in value
+
+def edge_cacheable(cache_control):
+    """True if the origin's Cache-Control lets a shared cache store the response"""
+    value = cache_control.lower()
+    if not value or value == '-':
+        return False
+    if opted_out(value) or 'no-cache' in value:
+        return False
+    if 's-maxage' in value or 'public' in value:
+        return True
+    match = re.search(r'max-age=(\d+)', value)
+    return bool(match and int(match.group(1)) > 0)
+
+def upstream_seconds(value):
+    """Total of $upstream_response_time, which lists one time per upstream tried"""
+    if value == b'-':
+        return None
+    return sum(float(part) for part in re.split(rb'[,:] ', value) if part != b'-')
+
+def open_log(path):
+    return gzip.open(path, 'rb') if str(path).endswith('.gz') else open(path, 'rb')
+
+def analyze(paths, table, host=None):
+    """Stream every log into the route table; returns (lines, parsed, timed)"""
+    lines = parsed = timed = 0
+    for path in paths:
+        with open_log(path) as f:
+            for line in f:
+                lines += 1
+                match = LINE_RE.match(line)
+                if not match:
+                    continue
+                line_host = (match.group('host') or b'').decode(errors='replace')
+                if host and line_host and line_host != host:
+                    continue
+                parsed += 1
+
+                route = normalize_path(match.group('path').decode(errors='replace'), line_host or host)
+                stats = table.get(f'{line_host}{route}' if line_host and not host else route)
+                stats.requests += 1
+                status = int(match.group('status'))
+                if status >= 500:
+                    stats.errors += 1
+
+                if match.group('request_time') is None:
+                    continue
+                timed += 1
+                seconds = upstream_seconds(match.group('upstream_time'))
+                if seconds is None:
+                    continue  # served by nginx itself (static files, redirects)
+                stats.origin += 1
+                stats.origin_seconds += seconds
+                stats.sketch.add(seconds)
+                cache_control = match.group('cache_control').decode(errors='replace')
+                if edge_cacheable(cache_control):
+                    stats.cacheable += 1
+                elif (match.group('method') in CACHEABLE_METHODS and status in CACHEABLE_STATUSES
+                      and not opted_out(cache_control)):
+                    stats.uncached_seconds += seconds
+    return lines, parsed, timed
+
+def rank(table, top):
+    """Routes ordered by origin seconds the edge could have absorbed"""
+    rows = []
+    for route, stats in table.routes.items():
+        if not stats.uncached_seconds:
+            continue
+        rows.append({
+            'route': route,
+            'requests': stats.requests,
+            'origin_requests': stats.origin,
+            'cacheable_pct': round(100 * stats.cacheable / stats.origin, 1) if stats.origin else None,
+            'p50_ms': _ms(stats.sketch.quantile(0.50)),
+            'p95_ms': _ms(stats.sketch.quantile(0.95)),
+            'p99_ms': _ms(stats.sketch.quantile(0.99)),
+            'origin_seconds': round(stats.origin_seconds, 1),
+            'uncached_seconds': round(stats.uncached_seconds, 1),
+            'errors_5xx': stats.errors,
+        })
+    rows.sort(key=lambda row: row['uncached_seconds'], reverse=True)
+    return rows[:top]
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+def print_report(rows, lines, parsed, timed, table, elapsed):
+    print(f"{Colors.BLUE}Read {lines} lines ({parsed} requests, {timed} with timings) in {elapsed:.1f}s{Colors.NC}")
+    if table.pruned:
+        print(f"{Colors.YELLOW}⚠️  {table.pruned} rare routes dropped; counts may be high by up to {table.floor}{Colors.NC}")
+    if parsed and not timed:
+        print(f"{Colors.YELLOW}⚠️  No timing fields found; switch the access log to the currentmesh_timing "
+              f"format from nginx-setup.sh{Colors.NC}")
+    if not rows:
+        print(f"{Colors.GREEN}✅ No uncached origin traffic found{Colors.NC}")
+        return
+
+    print(f"\n{Colors.BLUE}Routes to make cacheable first (by uncached origin time):{Colors.NC}")
+    print(f"{'#':>3} {'Route':<48} {'Reqs':>8} {'Origin':>8} {'Cache%':>7} "
+          f"{'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'Uncached s':>11}")
+    for i, row in enumerate(rows, 1):
+        cacheable = '-' if row['cacheable_pct'] is None else f"{row['cacheable_pct']:.0f}"
+        print(f"{i:>3} {row['route'][:48]:<48} {row['requests']:>8} {row['origin_requests']:>8} {cacheable:>7} "
+              f"{row['p50_ms'] or '-':>8} {row['p95_ms'] or '-':>8} {row['p99_ms'] or '-':>8} "
+              f"{row['uncached_seconds']:>11}")
+    print(f"\n{Colors.BLUE}Cache% is the share of origin responses whose Cache-Control allows edge caching;{Colors.NC}")
+    print(f"{Colors.BLUE}routes near 0% need headers or a cache rule before the edge will absorb them.{Colors.NC}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Rank nginx routes by uncached origin time')
+    parser.add_argument('logs', nargs='*', default=DEFAULT_LOGS, help='Access logs (.gz allowed)')
+    parser.add_argument('--host', help='Only count requests for this Host')
+    parser.add_argument('--top', type=int, default=25, help='Routes to show')
+    parser.add_argument('--max-routes', type=int, default=MAX_ROUTES, help='Routes tracked at once')
+    parser.add_argument('--json', action='store_true', help='Print the ranking as JSON')
+    args = parser.parse_args()
+
+    missing = [path for path in args.logs if not Path(path).is_file()]
+    if missing:
+        print(f"{Colors.RED}Error: log file(s) not found: {', '.join(missing)}{Colors.NC}")
+        sys.exit(1)
+
+    table = RouteTable(args.max_routes)
+    started = time.monotonic()
+    lines, parsed, timed = analyze(args.logs, table, args.host)
+    rows = rank(table, args.top)
+
+    if args.json:
+        print(json.dumps({'lines': lines, 'requests': parsed, 'timed': timed, 'dropped_routes': table.pruned,
+                          'count_error': table.floor, 'routes': rows}, indent=2))
+    else:
+        print_report(rows, lines, parsed, timed, table, time.monotonic() - started)
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,25 @@ PROJECT_DIR="/var/www/currentmesh"
 
 echo -e "${BLUE}Creating Nginx configuration files...${NC}\n"
 
+# Access log format: "combined" plus timings, the origin's Cache-Control and
+# the Host, read by scripts/nginx-log-analyzer.py
+cat > "$NGINX_DIR/conf.d/currentmesh-log-format.conf" << 'EOF'
+log_format currentmesh_timing '$remote_addr - $remote_user [$time_local] "$request" '
+                              '$status $body_bytes_sent "$http_referer" "$http_user_agent" '
+                              '$request_time $upstream_response_time "$sent_http_cache_control" "$host"';
+EOF
+
+# Serve the .gz/.br siblings written by scripts/precompress-assets.py instead
+# of compressing static files per request (falls back to on-the-fly gzip)
+cat > "$NGINX_DIR/conf.d/currentmesh-precompressed.conf" << 'EOF'
+gzip_static on;
+EOF
+if ls "$NGINX_DIR"/modules-enabled/*brotli* &> /dev/null; then
+    echo "brotli_static on;" >> "$NGINX_DIR/conf.d/currentmesh-precompressed.conf"
+else
+    echo -e "${YELLOW}ngx_brotli not installed; only .gz siblings will be served (apt-get install libnginx-mod-http-brotli-static)${NC}"
+fi
+
 # Marketing Site Configuration (currentmesh.com)
 cat > "$SITES_AVAILABLE/currentmesh.com" << 'EOF'
 # Marketing Site - currentmesh.com
@@ -56,6 +75,8 @@ server {
     include /etc/letsencrypt/options-ssl-nginx.conf;
     ssl_dhparam /etc/letsencrypt/ssl-dhparams.pem;
 
+    access_log /var/log/nginx/access.log currentmesh_timing;
+
     # Root directory
     root /var/www/currentmesh/marketing/.next;
     index index.html;
@@ -116,6 +137,8 @@ server {
     include /etc/letsencrypt/options-ssl-nginx.conf;
     ssl_dhparam /etc/letsencrypt/ssl-dhparams.pem;
 
+    access_log /var/log/nginx/access.log currentmesh_timing;
+
     # Root directory (Vite build output)
     root /var/www/currentmesh/client/dist;
     index index.html;
@@ -180,6 +203,8 @@ server {
     include /etc/letsencrypt/options-ssl-nginx.conf;
     ssl_dhparam /etc/letsencrypt/ssl-dhparams.pem;
 
+    access_log /var/log/nginx/access.log currentmesh_timing;
+
     # Security headers
     add_header X-Frame-Options "DENY" always;
     add_header X-Content-Type-Options "nosniff" always;
@@ -190,6 +215,20 @@ server {
     add_header Access-Control-Allow-Methods "GET, POST, PUT, DELETE, OPTIONS" always;
     add_header Access-Control-Allow-Headers "Authorization, Content-Type" always;
 
+    # Sentry webhook relay (sentry-webhook-relay.py): coalesces delivery
+    # bursts before they reach /api/sentry/webhook
+    location = /sentry-relay/webhook {
+        proxy_pass http://127.0.0.1:3090/webhook;
+        proxy_http_version 1.1;
+        proxy_set_header Connection "";
+        proxy_set_header Host $host;
+        proxy_set_header X-Real-IP $remote_addr;
+        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto $scheme;
+        client_max_body_size 1m;
+        proxy_read_timeout 10s;
+    }
+
     # API proxy
     location / {
         proxy_pass http://localhost:3000;
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Static Pre-compression of Build Artifacts
+Writes .gz (and .br when the brotli module is installed) siblings next to
+every compressible build file at maximum compression, spread over all cores.
+Files whose content hash is unchanged since the last run are skipped, so a
+redeploy only compresses what actually changed. nginx serves the siblings
+with gzip_static/brotli_static (see nginx-setup.sh) instead of compressing
+each response on the fly.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from cache_purge import file_digest
+from site_builds import PROJECT_DIR, SITES, iter_site_files
+from term_colors import Colors
+
+MANIFEST_PATH = PROJECT_DIR / '.cache' / 'precompress-manifest.json'
+
+COMPRESSIBLE = {'.js', '.mjs', '.css', '.html', '.htm', '.svg', '.json', '.map', '.txt', '.xml',
+                '.webmanifest', '.ico', '.wasm', '.ttf', '.otf', '.eot'}
+MIN_SIZE = 1024  # bytes; matches gzip_min_length in nginx-setup.sh
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    tmp.replace(path)
+
+def sibling_paths(path):
+    paths = [Path(f'{path}.gz')]
+    if brotli is not None:
+        paths.append(Path(f'{path}.br'))
+    return paths
+
+def expected_siblings(path, omitted):
+    """Siblings that should exist; omitted ones were not smaller than the source"""
+    return [p for p in sibling_paths(path) if p.suffix not in omitted]
+
+def write_sibling(source, target, data):
+    """Atomically write a compressed sibling, or drop a stale one if it would not save bytes"""
+    stat = source.stat()
+    if len(data) >= stat.st_size:
+        target.unlink(missing_ok=True)
+        return 0
+    tmp = target.with_name(f'.{target.name}.tmp')
+    tmp.write_bytes(data)
+    # Same mtime as the source so Last-Modified and ETag match either way
+    os.utime(tmp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    tmp.replace(target)
+    return len(data)
+
+def compress_file(path, known_digest, known_omitted):
+    """
+    Worker: compress one file unless its content is unchanged
+    Returns (path, digest, omitted sibling suffixes, original size,
+    compressed bytes written or None if skipped)
+    """
+    path = Path(path)
+    digest = file_digest(path)
+    siblings = expected_siblings(path, known_omitted)
+    if digest == known_digest and all(p.exists() for p in siblings):
+        # Rebuilt with the same bytes: only carry the new mtime over
+        stat = path.stat()
+        for sibling in siblings:
+            os.utime(sibling, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        return str(path), digest, known_omitted, 0, None
+
+    data = path.read_bytes()
+    compressed = {'.gz': gzip.compress(data, GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        compressed['.br'] = brotli.compress(data, quality=BROTLI_QUALITY)
+    written = 0
+    omitted = []
+    for suffix, blob in compressed.items():
+        size = write_sibling(path, Path(f'{path}{suffix}'), blob)
+        if not size:
+            omitted.append(suffix)
+        written += size
+    return str(path), digest, omitted, len(data), written
+
+def collect(sites):
+    """Every compressible build file of the given sites, as absolute path strings"""
+    files = []
+    for name in sites:
+        for path, _ in iter_site_files(name):
+            if path.suffix.lower() in COMPRESSIBLE and path.stat().st_size >= MIN_SIZE:
+                files.append(str(path))
+    return files
+
+def precompress(files, manifest, workers=None):
+    """
+    Compress files over a process pool
+    Unchanged size+mtime skips even the hash; returns (new manifest, stats)
+    Entries are [size, mtime_ns, digest, omitted sibling suffixes]
+    """
+    stats = {'compressed': 0, 'unchanged': 0, 'bytes_in': 0, 'bytes_out': 0}
+    new_manifest = {}
+    pending = []
+    for path in files:
+        stat = os.stat(path)
+        entry = manifest.get(path)
+        omitted = entry[3] if entry and len(entry) > 3 else []
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns \
+                and all(p.exists() for p in expected_siblings(path, omitted)):
+            new_manifest[path] = entry
+            stats['unchanged'] += 1
+        else:
+            pending.append((path, entry[2] if entry else None, omitted))
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            chunksize = max(1, len(pending) // ((workers or os.cpu_count()) * 4))
+            results = pool.map(compress_file, *zip(*pending), chunksize=chunksize)
+            for path, digest, omitted, size, written in results:
+                stat = os.stat(path)
+                new_manifest[path] = [stat.st_size, stat.st_mtime_ns, digest, omitted]
+                if written is None:
+                    stats['unchanged'] += 1
+                else:
+                    stats['compressed'] += 1
+                    stats['bytes_in'] += size
+                    stats['bytes_out'] += written
+
+    # Sources that disappeared take their siblings with them
+    for path in set(manifest) - set(new_manifest):
+        for sibling in (Path(f'{path}.gz'), Path(f'{path}.br')):
+            sibling.unlink(missing_ok=True)
+    return new_manifest, stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Write .br/.gz siblings for build artifacts')
+    parser.add_argument('--site', action='append', choices=sorted(SITES), help='Only this site (repeatable)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--force', action='store_true', help='Recompress everything')
+    args = parser.parse_args()
+
+    print(f"{Colors.BLUE}=== Pre-compressing Build Artifacts ==={Colors.NC}\n")
+    if brotli is None:
+        print(f"{Colors.YELLOW}⚠️  brotli module not installed, writing .gz only (pip install brotli){Colors.NC}")
+
+    started = time.monotonic()
+    sites = args.site or list(SITES)
+    manifest = {} if args.force else load_manifest()
+    # Only this run's sites are rewritten; keep the others' entries
+    own = {path for path in manifest if any(path.startswith(str(PROJECT_DIR / rel) + '/')
+                                            for name in sites for rel, _ in SITES[name]['mounts'])}
+    files = collect(sites)
+    updated, stats = precompress(files, {path: manifest[path] for path in own}, args.workers)
+    manifest = {path: entry for path, entry in manifest.items() if path not in own}
+    manifest.update(updated)
+    save_manifest(manifest)
+
+    elapsed = time.monotonic() - started
+    print(f"{Colors.GREEN}✅ {stats['compressed']} file(s) compressed, {stats['unchanged']} unchanged "
+          f"in {elapsed:.1f}s{Colors.NC}")
+    if stats['bytes_in']:
+        print(f"{Colors.BLUE}Compressed {stats['bytes_in'] / 1024:.0f} KiB of source into "
+              f"{stats['bytes_out'] / 1024:.0f} KiB of siblings{Colors.NC}")
+    if not files:
+        print(f"{Colors.YELLOW}⚠️  No build output found; run the builds first{Colors.NC}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Resource Sampler
+Reads /proc directly once a second (no df/free/awk/pm2 forks) and keeps the
+RSS of every PM2 process in a fixed-size ring buffer. A least-squares trend
+over the last few minutes predicts when a process will cross its
+max_memory_restart limit from ecosystem.config.js, so a graceful reload can
+be scheduled before PM2 hard-restarts it under load. Samples are also kept
+in the metrics store for metrics-query.py.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from array import array
+from datetime import datetime
+from pathlib import Path
+
+from metric_store import METRICS_DIR, MetricStore
+from term_colors import Colors
+
+PROJECT_DIR = Path(__file__).parent.parent
+ECOSYSTEM_PATH = PROJECT_DIR / 'ecosystem.config.js'
+LOG_FILE = PROJECT_DIR / 'logs' / 'resource-monitor.log'
+PM2_HOME = Path(os.getenv('PM2_HOME') or Path.home() / '.pm2')
+
+SAMPLE_INTERVAL = 1  # seconds
+RING_SIZE = 3600  # samples kept per series (1 hour at 1s)
+PID_REFRESH = 15  # seconds between PM2 pid file rescans
+TREND_WINDOW = 600  # seconds of history the growth trend is fitted over
+MIN_TREND_SPAN = 120  # seconds of samples needed before predicting
+EVAL_INTERVAL = 5  # seconds between trend evaluations
+WARN_HORIZON = 1800  # warn when the limit is this many seconds away
+WARN_COOLDOWN = 600  # seconds between repeated warnings for one process
+RELOAD_COOLDOWN = 1800  # seconds between predictive reloads of one process
+
+# Same system thresholds as monitor-resources.sh
+MEM_WARNING = 85  # percent
+DISK_WARNING = 80  # percent
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+MB = 1024 * 1024
+UNITS = {'': 1, 'K': 1024, 'M': MB, 'G': 1024 * MB}
+
+def log(message):
+    line = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}"
+    print(line, flush=True)
+    with open(LOG_FILE, 'a') as f:
+        f.write(line + '\n')
+
+def memory_limits(path=ECOSYSTEM_PATH):
+    """{app name: max_memory_restart in bytes} from the PM2 ecosystem file"""
+    text = Path(path).read_text()
+    limits = {}
+    # Each app block starts at its name; the limit is the first one after it
+    names = list(re.finditer(r"\bname:\s*['\"]([^'\"]+)['\"]", text))
+    for i, match in enumerate(names):
+        end = names[i + 1].start() if i + 1 < len(names) else len(text)
+        limit = re.search(r"max_memory_restart:\s*['\"](\d+)\s*([KMG]?)B?['\"]", text[match.end():end], re.I)
+        if limit:
+            limits[match.group(1)] = int(limit.group(1)) * UNITS[limit.group(2).upper()]
+    return limits
+
+def pm2_pids():
+    """
+    {app name: pid} from PM2's pid files ($PM2_HOME/pids/<name>-<id>.pid)
+    Falls back to `pm2 jlist` when the pid directory is not readable
+    """
+    pid_dir = PM2_HOME / 'pids'
+    if os.access(pid_dir, os.R_OK | os.X_OK):
+        pids = {}
+        for path in pid_dir.glob('*.pid'):
+            name = path.stem.rsplit('-', 1)[0]
+            try:
+                pids[name] = int(path.read_text().strip())
+            except (OSError, ValueError):
+                pass
+        return pids
+    try:
+        output = subprocess.run(['pm2', 'jlist'], capture_output=True, text=True, timeout=10).stdout
+        return {proc['name']: proc['pid'] for proc in json.loads(output) if proc.get('pid')}
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return {}
+
+class Ring:
+    """Fixed-size circular buffer of (timestamp, value) doubles"""
+
+    def __init__(self, capacity=RING_SIZE):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.next = 0
+        self.count = 0
+
+    def append(self, t, value):
+        self.times[self.next] = t
+        self.values[self.next] = value
+        self.next = (self.next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def clear(self):
+        self.next = self.count = 0
+
+    def last(self):
+        if not self.count:
+            return None
+        i = (self.next - 1) % self.capacity
+        return self.times[i], self.values[i]
+
+    def since(self, t):
+        """Samples newer than t, oldest first"""
+        times, values = [], []
+        for k in range(self.count, 0, -1):
+            i = (self.next - k) % self.capacity
+            if self.times[i] > t:
+                times.append(self.times[i])
+                values.append(self.values[i])
+        return times, values
+
+def fit_trend(times, values):
+    """Least-squares line; returns (slope per second, fitted value at the last time)"""
+    n = len(times)
+    mean_t = sum(times) / n
+    mean_v = sum(values) / n
+    var = sum((t - mean_t) ** 2 for t in times)
+    if not var:
+        return 0.0, values[-1]
+    slope = sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values)) / var
+    return slope, mean_v + slope * (times[-1] - mean_t)
+
+class ProcessSeries:
+    """RSS history of one PM2 process; reset whenever its pid changes"""
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.pid = None
+        self.fd = None
+        self.ring = Ring()
+        self.warned_at = 0.0
+        self.reloaded_at = 0.0
+
+    def attach(self, pid):
+        if pid == self.pid:
+            return
+        self.detach()
+        try:
+            self.fd = os.open(f'/proc/{pid}/statm', os.O_RDONLY)
+        except OSError:
+            return
+        self.pid = pid
+        self.ring.clear()
+
+    def detach(self):
+        if self.fd is not None:
+            os.close(self.fd)
+        self.pid = self.fd = None
+
+    def sample(self, now):
+        """Append the current RSS; False if the process is gone"""
+        if self.fd is None:
+            return False
+        try:
+            statm = os.pread(self.fd, 128, 0)
+        except OSError:
+            self.detach()
+            return False
+        if not statm:
+            self.detach()
+            return False
+        self.ring.append(now, int(statm.split()[1]) * PAGE_SIZE)
+        return True
+
+    def prediction(self, now):
+        """(rss, growth in bytes/s, seconds until the limit or None); no rss once detached"""
+        times, values = self.ring.since(now - TREND_WINDOW)
+        # The ring still holds the exited process's samples until a new pid attaches
+        if self.pid is None or not values:
+            return None, 0.0, None
+        rss = values[-1]
+        if times[-1] - times[0] < MIN_TREND_SPAN:
+            return rss, 0.0, None
+        slope, fitted = fit_trend(times, values)
+        if slope <= 0 or not self.limit:
+            return rss, slope, None
+        return rss, slope, max(0.0, (self.limit - fitted) / slope)
+
+class MemInfo:
+    """System memory from /proc/meminfo through a held descriptor"""
+
+    def __init__(self):
+        self.fd = os.open('/proc/meminfo', os.O_RDONLY)
+
+    def used_percent(self):
+        fields = {}
+        for line in os.pread(self.fd, 4096, 0).split(b'\n'):
+            key, _, rest = line.partition(b':')
+            if key in (b'MemTotal', b'MemAvailable'):
+                fields[key] = int(rest.split()[0])
+        return 100 * (1 - fields[b'MemAvailable'] / fields[b'MemTotal'])
+
+def disk_used_percent(path='/'):
+    st = os.statvfs(path)
+    # Same as df: used / (used + available to unprivileged users)
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    return 100 * used / (used + st.f_bavail * st.f_frsize)
+
+def fmt_eta(seconds):
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+class Sampler:
+    def __init__(self, limits, interval=SAMPLE_INTERVAL, horizon=WARN_HORIZON, reload_within=None, store=None):
+        self.series = {name: ProcessSeries(name, limit) for name, limit in limits.items()}
+        self.interval = interval
+        self.horizon = horizon
+        self.reload_within = reload_within
+        self.meminfo = MemInfo()
+        self.system = {'memory': Ring(), 'disk': Ring()}
+        self.alerting = {'memory': False, 'disk': False}
+        self.store = store
+
+    def refresh_pids(self):
+        pids = pm2_pids()
+        for name, series in self.series.items():
+            if name in pids:
+                series.attach(pids[name])
+            else:
+                series.detach()
+
+    def sample(self, now):
+        for series in self.series.values():
+            if series.sample(now) and self.store:
+                self.store.record(f'rss_mb.{series.name}', series.ring.last()[1] / MB, now)
+        self.system['memory'].append(now, self.meminfo.used_percent())
+        self.system['disk'].append(now, disk_used_percent())
+        if self.store:
+            for key, ring in self.system.items():
+                self.store.record(f'system.{key}_pct', ring.last()[1], now)
+
+    def evaluate(self, now):
+        for series in self.series.values():
+            rss, slope, eta = series.prediction(now)
+            if eta is None or eta > self.horizon:
+                continue
+            if self.reload_within is not None and eta <= self.reload_within \
+                    and now - series.reloaded_at >= RELOAD_COOLDOWN:
+                self.reload(series, rss, slope, eta, now)
+            elif now - series.warned_at >= WARN_COOLDOWN:
+                series.warned_at = now
+                log(f"⚠️  PREDICT: {series.name} RSS {rss / MB:.0f}MB growing {slope * 60 / MB:.1f}MB/min, "
+                    f"reaches max_memory_restart {series.limit / MB:.0f}MB in ~{fmt_eta(eta)}")
+
+        for key, threshold in (('memory', MEM_WARNING), ('disk', DISK_WARNING)):
+            _, value = self.system[key].last()
+            # Log crossings only, not every sample above the line
+            if value >= threshold and not self.alerting[key]:
+                log(f"⚠️  WARNING: {key.capitalize()} usage at {value:.0f}%")
+            elif value < threshold and self.alerting[key]:
+                log(f"✅ {key.capitalize()} usage back to {value:.0f}%")
+            self.alerting[key] = value >= threshold
+
+    def reload(self, series, rss, slope, eta, now):
+        series.reloaded_at = series.warned_at = now
+        log(f"🔄 RELOAD: {series.name} RSS {rss / MB:.0f}MB growing {slope * 60 / MB:.1f}MB/min, "
+            f"max_memory_restart in ~{fmt_eta(eta)}; reloading gracefully")
+        try:
+            subprocess.run(['pm2', 'reload', series.name], stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, timeout=120)
+        except (OSError, subprocess.SubprocessError) as e:
+            log(f"❌ ERROR: pm2 reload {series.name} failed: {e}")
+
+    def run(self, duration=None):
+        started = time.monotonic()
+        next_sample = next_pids = next_eval = started
+        while duration is None or time.monotonic() - started < duration:
+            tick = time.monotonic()
+            if tick >= next_pids:
+                self.refresh_pids()
+                next_pids = tick + PID_REFRESH
+            now = time.time()
+            self.sample(now)
+            if tick >= next_eval:
+                self.evaluate(now)
+                next_eval = tick + EVAL_INTERVAL
+            # Fixed schedule, so slow reads don't drift the sample rate
+            next_sample += self.interval
+            time.sleep(max(0.0, next_sample - time.monotonic()))
+
+    def print_summary(self):
+        now = time.time()
+        print(f"\n{Colors.BLUE}{'Process':<24} {'PID':>7} {'RSS':>8} {'Limit':>8} {'Growth':>12} "
+              f"{'Limit in':>9}{Colors.NC}")
+        for series in self.series.values():
+            rss, slope, eta = series.prediction(now)
+            if rss is None:
+                print(f"{series.name:<24} {'-':>7} {Colors.YELLOW}not running{Colors.NC}")
+                continue
+            color = Colors.RED if eta is not None and eta <= self.horizon else Colors.NC
+            limit = f"{series.limit / MB:.0f}MB" if series.limit else '-'
+            print(f"{series.name:<24} {series.pid:>7} {rss / MB:>6.0f}MB {limit:>8} "
+                  f"{slope * 60 / MB:>+8.1f}MB/m {color}{fmt_eta(eta) if eta is not None else '-':>9}{Colors.NC}")
+        for key, ring in self.system.items():
+            last = ring.last()
+            if last:
+                print(f"{key.capitalize():<24} {last[1]:>16.0f}% used")
+
+def main():
+    global LOG_FILE
+
+    parser = argparse.ArgumentParser(description='Sample PM2 process memory from /proc and predict OOM restarts')
+    parser.add_argument('--interval', type=float, default=SAMPLE_INTERVAL, help='Seconds between samples')
+    parser.add_argument('--horizon', type=float, default=WARN_HORIZON,
+                        help='Warn when max_memory_restart is predicted within this many seconds')
+    parser.add_argument('--reload-within', type=float,
+                        help='Run `pm2 reload` when the limit is predicted within this many seconds')
+    parser.add_argument('--duration', type=float, help='Stop after this many seconds and print a summary')
+    parser.add_argument('--ecosystem', default=str(ECOSYSTEM_PATH), help='PM2 ecosystem file with the limits')
+    parser.add_argument('--log-file', default=str(LOG_FILE), help='Where to append warnings')
+    parser.add_argument('--metrics-dir', default=str(METRICS_DIR), help='Metrics store directory')
+    parser.add_argument('--no-store', action='store_true', help='Don\'t record samples in the metrics store')
+    args = parser.parse_args()
+
+    LOG_FILE = Path(args.log_file)
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        limits = memory_limits(args.ecosystem)
+    except OSError as e:
+        print(f"{Colors.RED}Error: cannot read {args.ecosystem}: {e}{Colors.NC}")
+        sys.exit(1)
+
+    store = None if args.no_store else MetricStore(args.metrics_dir)
+    sampler = Sampler(limits, interval=args.interval, horizon=args.horizon, reload_within=args.reload_within,
+                      store=store)
+    log(f"🔍 Resource sampler started ({len(limits)} PM2 apps, every {args.interval:g}s)")
+    try:
+        sampler.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if store:
+            store.close()
+    sampler.print_summary()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Sentry Errors Table Maintenance
+Moves sentry_errors to monthly range partitions on created_at (--partition,
+once), then on every run creates the coming months' partitions and enforces
+retention by detaching and dropping whole months instead of DELETEing rows,
+optionally streaming each month to a compressed CSV first (--export).
+Talks to Postgres through psycopg2 when installed, psql otherwise.
+"""
+
+import argparse
+import gzip
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+from log_archive import zstandard
+from term_colors import Colors
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+SERVER_ENV = Path(__file__).parent.parent / 'server' / '.env.local'
+
+TABLE = 'sentry_errors'
+KEYS_TABLE = 'sentry_error_keys'  # server migration 005
+STAGING_TABLE = 'sentry_errors_partitioned'  # built here, then swapped in
+OLD_TABLE = 'sentry_errors_unpartitioned'  # the original table after the swap
+
+AHEAD_MONTHS = 3  # future partitions kept ready
+KEEP_MONTHS = 6  # full months kept before the current one
+COPY_BATCH = 5000  # rows per statement while copying into partitions
+KEY_BATCH = 10000  # keys deleted per statement during retention
+LOCK_TIMEOUT = '10s'  # give up on the swap rather than queue webhooks behind it
+UPDATED_MARGIN = 60  # seconds; rows updated this close to the copy start are re-copied at the swap
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+COLUMNS = ('id, sentry_id, title, message, level, url, environment, tags, metadata, "timestamp", project, '
+           'raw_data, resolved_at, created_at, updated_at')
+
+# Same columns as migration 001; created_at becomes NOT NULL as the partition key
+STAGING_DDL = f"""
+CREATE TABLE {STAGING_TABLE} (
+  id INTEGER NOT NULL DEFAULT nextval('sentry_errors_id_seq'),
+  sentry_id VARCHAR(255) NOT NULL,
+  title TEXT NOT NULL,
+  message TEXT,
+  level VARCHAR(50) NOT NULL,
+  url TEXT,
+  environment VARCHAR(50),
+  tags JSONB,
+  metadata JSONB,
+  "timestamp" TIMESTAMP,
+  project VARCHAR(255),
+  raw_data JSONB,
+  resolved_at TIMESTAMP,
+  created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  updated_at TIMESTAMP DEFAULT NOW(),
+  CONSTRAINT sentry_errors_pkey_new PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at)
+"""
+
+# Final name, unique, definition. Unique indexes must include created_at on a
+# partitioned table; (sentry_id, created_at) is the webhook's ON CONFLICT target
+# and also serves sentry_id lookups, so the plain sentry_id index is not carried over
+INDEXES = [
+    ('idx_sentry_errors_sentry_id_created_at', True, '(sentry_id, created_at)'),
+    ('idx_sentry_errors_resolved_at', False, '(resolved_at)'),
+    ('idx_sentry_errors_created_at', False, '(created_at DESC)'),
+    ('idx_sentry_errors_level', False, '(level)'),
+    ('idx_sentry_errors_project', False, '(project)'),
+    ('idx_sentry_errors_tags_app', False, 'USING GIN (tags jsonb_path_ops)'),
+]
+SWAPPED_INDEXES = ['sentry_errors_pkey'] + [name for name, _, _ in INDEXES]
+
+BOUND_RE = re.compile(r"FROM \('(\d{4})-(\d{2})-01[^']*'\) TO \('(\d{4})-(\d{2})-01[^']*'\)")
+
+def database_url():
+    """DATABASE_URL from the environment or server/.env.local, like the API server"""
+    if os.getenv('DATABASE_URL'):
+        return os.getenv('DATABASE_URL')
+    try:
+        with open(SERVER_ENV, 'r') as f:
+            for line in f:
+                key, sep, value = line.strip().partition('=')
+                if sep and key == 'DATABASE_URL':
+                    return value.strip().strip('"\'')
+    except FileNotFoundError:
+        pass
+    return None
+
+class Database:
+    """
+    Minimal autocommit connection; psql is the fallback when psycopg2 is
+    missing, so every statement here is plain SQL without parameters and
+    multi-statement units carry their own BEGIN/COMMIT
+    """
+
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self.conn = None
+        if psycopg2 is not None:
+            try:
+                self.conn = psycopg2.connect(dsn)
+            except psycopg2.Error as e:
+                raise RuntimeError(str(e).strip())
+            self.conn.autocommit = True
+        elif not shutil.which('psql'):
+            raise RuntimeError('neither psycopg2 (pip install psycopg2-binary) nor psql is available')
+        self.version = int(self.value('SHOW server_version_num'))
+
+    def _psql(self, sql, **kwargs):
+        return subprocess.run(['psql', '-X', '-q', '-At', '-F', '\t', '-v', 'ON_ERROR_STOP=1', '-d', self.dsn,
+                               '-c', sql], **kwargs)
+
+    def rows(self, sql):
+        """Result rows as tuples; NULL is None with either backend"""
+        if self.conn is not None:
+            try:
+                with self.conn.cursor() as cur:
+                    cur.execute(sql)
+                    return cur.fetchall() if cur.description else []
+            except psycopg2.Error as e:
+                raise RuntimeError(str(e).strip())
+        proc = self._psql(sql, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if proc.returncode:
+            raise RuntimeError(proc.stderr.decode(errors='replace').strip())
+        return [tuple(field or None for field in line.split('\t'))
+                for line in proc.stdout.decode().splitlines() if line]
+
+    def value(self, sql):
+        rows = self.rows(sql)
+        return rows[0][0] if rows else None
+
+    def execute(self, sql):
+        self.rows(sql)
+
+    def copy_out(self, sql, f):
+        """Stream COPY ... TO STDOUT into a binary file object"""
+        if self.conn is not None:
+            try:
+                with self.conn.cursor() as cur:
+                    cur.copy_expert(sql, f)
+                return
+            except psycopg2.Error as e:
+                raise RuntimeError(str(e).strip())
+        proc = subprocess.Popen(['psql', '-X', '-q', '-v', 'ON_ERROR_STOP=1', '-d', self.dsn, '-c', sql],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        shutil.copyfileobj(proc.stdout, f, 1024 * 1024)
+        if proc.wait():
+            raise RuntimeError(proc.stderr.read().decode(errors='replace').strip())
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+def month_start(d):
+    return date(d.year, d.month, 1)
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month):
+    return f'{TABLE}_y{month.year}m{month.month:02d}'
+
+def layout(db):
+    """'partitioned', 'plain' or None (no table)"""
+    kind = db.value(f"SELECT relkind FROM pg_class WHERE oid = to_regclass('{TABLE}')")
+    return {'p': 'partitioned', 'r': 'plain'}.get(kind)
+
+def table_exists(db, name):
+    return db.value(f"SELECT to_regclass('{name}') IS NOT NULL") in (True, 't')
+
+def partitions(db, parent=TABLE):
+    """[(name, month, est. rows, bytes, detach pending)] oldest first"""
+    pending = 'i.inhdetachpending' if db.version >= 140000 else 'false'
+    result = []
+    for name, bound, rows, size, detaching in db.rows(f"""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint,
+                   pg_total_relation_size(c.oid), {pending}
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass('{parent}')"""):
+        match = BOUND_RE.search(bound or '')
+        if not match:
+            continue  # not one of ours (e.g. a DEFAULT partition)
+        result.append((name, date(int(match.group(1)), int(match.group(2)), 1), max(int(rows), 0), int(size),
+                       detaching in (True, 't')))
+    return sorted(result, key=lambda p: p[1])
+
+def create_partitions(db, parent, first, last, plan=False):
+    """Create the monthly partitions from first to last (inclusive) that don't exist yet"""
+    existing = {month for _, month, _, _, _ in partitions(db, parent)}
+    created = []
+    month = first
+    while month <= last:
+        if month not in existing:
+            if not plan:
+                db.execute(f"CREATE TABLE {partition_name(month)} PARTITION OF {parent} "
+                           f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')")
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+def convert(db, ahead, plan=False):
+    """
+    Copy the plain table into a partitioned one in batches while the API keeps
+    writing, then catch up and swap names in one short locked transaction
+    """
+    if not table_exists(db, KEYS_TABLE):
+        raise RuntimeError(f'{KEYS_TABLE} is missing; deploy the server (migration 005) before partitioning')
+    if table_exists(db, OLD_TABLE):
+        raise RuntimeError(f'{OLD_TABLE} already exists; drop it (--drop-unpartitioned) before converting again')
+
+    oldest, newest, max_id = db.rows(f"SELECT min(created_at)::date, max(created_at)::date, COALESCE(max(id), 0) "
+                                     f"FROM {TABLE}")[0]
+    today = month_start(date.today())
+    first = month_start(date.fromisoformat(str(oldest))) if oldest else today
+    last = add_months(max(month_start(date.fromisoformat(str(newest))) if newest else today, today), ahead)
+    max_id = int(max_id)
+    print(f"{Colors.BLUE}📋 {TABLE}: ids up to {max_id}, months {first:%Y-%m} to {last:%Y-%m}{Colors.NC}")
+    if plan:
+        return
+
+    db.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+    db.execute(STAGING_DDL)
+    create_partitions(db, STAGING_TABLE, first, last)
+    for name, unique, definition in INDEXES:
+        db.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name}_new ON {STAGING_TABLE} {definition}")
+    # Lets the swap find rows changed during the copy without a sequential scan under lock
+    db.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sentry_errors_updated_at_swap ON {TABLE}(updated_at)")
+
+    copy_started = db.value(f"SELECT (now() - interval '{UPDATED_MARGIN} seconds')::text")
+    started = time.monotonic()
+    for low in range(0, max_id, COPY_BATCH):
+        db.execute(f"INSERT INTO {STAGING_TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {TABLE} "
+                   f"WHERE id > {low} AND id <= {low + COPY_BATCH}")
+        if (low // COPY_BATCH) % 20 == 19:
+            print(f"   copied ids up to {low + COPY_BATCH} of {max_id} ({time.monotonic() - started:.0f}s)")
+
+    renames = [f"ALTER INDEX {name} RENAME TO {name}_unpartitioned;"
+               for (name,) in db.rows(f"SELECT indexname FROM pg_indexes WHERE tablename = '{TABLE}'")
+               if name in SWAPPED_INDEXES]
+    renames += [f"ALTER INDEX {name}_new RENAME TO {name};" for name in SWAPPED_INDEXES]
+    changed = f"id <= {max_id} AND updated_at >= '{copy_started}'"
+    db.execute(f"""
+        BEGIN;
+        SET LOCAL lock_timeout = '{LOCK_TIMEOUT}';
+        LOCK TABLE {TABLE} IN SHARE ROW EXCLUSIVE MODE;
+        INSERT INTO {STAGING_TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {TABLE} WHERE id > {max_id};
+        DELETE FROM {STAGING_TABLE} WHERE id IN (SELECT id FROM {TABLE} WHERE {changed});
+        INSERT INTO {STAGING_TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {TABLE} WHERE {changed};
+        ALTER TABLE {TABLE} RENAME TO {OLD_TABLE};
+        {' '.join(renames)}
+        ALTER TABLE {STAGING_TABLE} RENAME TO {TABLE};
+        ALTER SEQUENCE sentry_errors_id_seq OWNED BY {TABLE}.id;
+        COMMENT ON TABLE {TABLE} IS 'Stores errors received from Sentry webhooks for agent access (monthly partitions)';
+        COMMIT;
+    """)
+    db.execute(f"ANALYZE {TABLE}")
+    old_rows, new_rows = db.rows(f"SELECT (SELECT count(*) FROM {OLD_TABLE}), (SELECT count(*) FROM {TABLE})")[0]
+    print(f"{Colors.GREEN}✅ {TABLE} is now partitioned ({new_rows} rows; {OLD_TABLE} has {old_rows}){Colors.NC}")
+
+def open_export(path):
+    """(compressing writer, finish) for a new export file"""
+    raw = open(path, 'wb')
+    if zstandard is not None:
+        writer = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw)
+        finish = lambda: writer.flush(zstandard.FLUSH_FRAME)
+    else:
+        writer = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_LEVEL, mtime=0)
+        finish = writer.close
+
+    def close():
+        finish()
+        raw.flush()
+        os.fsync(raw.fileno())
+        raw.close()
+    return writer, close
+
+def export_partition(db, name, export_dir):
+    """Stream one partition to <export_dir>/<name>.csv.(zst|gz); returns the path"""
+    export_dir = Path(export_dir)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    path = export_dir / f"{name}.csv.{'zst' if zstandard is not None else 'gz'}"
+    tmp = path.with_name(f'.{path.name}.tmp')
+    writer, close = open_export(tmp)
+    try:
+        db.copy_out(f"COPY (SELECT {COLUMNS} FROM {name} ORDER BY id) TO STDOUT WITH (FORMAT csv, HEADER)", writer)
+        close()
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    tmp.replace(path)
+    return path
+
+def drop_partition(db, name, month, pending=False):
+    """Forget the month's keys, then detach and drop the partition"""
+    # Keys first: a delivery for one of these issues now starts a fresh row in
+    # the current month instead of failing on a detached partition
+    while int(db.value(f"""
+            WITH gone AS (
+              DELETE FROM {KEYS_TABLE} WHERE sentry_id IN (
+                SELECT sentry_id FROM {KEYS_TABLE}
+                WHERE created_at >= '{month}' AND created_at < '{add_months(month, 1)}' LIMIT {KEY_BATCH})
+              RETURNING 1)
+            SELECT count(*) FROM gone""")):
+        pass
+    if pending:
+        db.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name} FINALIZE")
+    else:
+        # CONCURRENTLY (PostgreSQL 14+) doesn't block webhook inserts while detaching
+        concurrently = ' CONCURRENTLY' if db.version >= 140000 else ''
+        db.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}{concurrently}")
+    db.execute(f"DROP TABLE {name}")
+
+def fmt_size(n):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(n) < 1024:
+            return f"{n:.0f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+def print_status(db, keep, ahead):
+    kind = layout(db)
+    if kind != 'partitioned':
+        rows = db.value(f"SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass('{TABLE}')")
+        print(f"{Colors.YELLOW}⚠️  {TABLE} is {'missing' if kind is None else 'not partitioned'}"
+              f"{f' (~{rows} rows)' if rows is not None else ''}; run with --partition{Colors.NC}")
+        return
+    today = month_start(date.today())
+    cutoff = add_months(today, -keep)
+    print(f"{Colors.BLUE}{'Partition':<28} {'~Rows':>10} {'Size':>8}{Colors.NC}")
+    for name, month, rows, size, pending in partitions(db):
+        note = ' (detach pending)' if pending else ' (past retention)' if month < cutoff else ''
+        print(f"{name:<28} {rows:>10} {fmt_size(size):>8}{note}")
+    months = {month for _, month, _, _, _ in partitions(db)}
+    missing = [f'{add_months(today, n):%Y-%m}' for n in range(ahead + 1) if add_months(today, n) not in months]
+    if missing:
+        print(f"{Colors.RED}❌ Missing partitions for {', '.join(missing)}: inserts for those months fail{Colors.NC}")
+    if table_exists(db, OLD_TABLE):
+        print(f"{Colors.YELLOW}⚠️  {OLD_TABLE} still exists (--drop-unpartitioned once verified){Colors.NC}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Partition, extend and expire the sentry_errors table')
+    parser.add_argument('--dsn', default=database_url(), help='Postgres URL (default: DATABASE_URL, server/.env.local)')
+    parser.add_argument('--partition', action='store_true', help='Convert the plain table to monthly partitions')
+    parser.add_argument('--ahead', type=int, default=AHEAD_MONTHS, help='Future months to keep partitions for')
+    parser.add_argument('--keep-months', type=int, default=KEEP_MONTHS,
+                        help='Full months kept before the current one (older months are dropped)')
+    parser.add_argument('--export', metavar='DIR', help='Export expiring months to compressed CSV here first')
+    parser.add_argument('--drop-unpartitioned', action='store_true', help=f'Drop {OLD_TABLE} left by --partition')
+    parser.add_argument('--status', action='store_true', help='Show partitions and exit')
+    parser.add_argument('--plan', action='store_true', help='Show what would be done without changing anything')
+    args = parser.parse_args()
+
+    if not args.dsn:
+        print(f"{Colors.RED}Error: no database URL (set DATABASE_URL or pass --dsn){Colors.NC}")
+        sys.exit(1)
+    try:
+        db = Database(args.dsn)
+    except RuntimeError as e:
+        print(f"{Colors.RED}Error: {e}{Colors.NC}")
+        sys.exit(1)
+
+    try:
+        if args.status:
+            print_status(db, args.keep_months, args.ahead)
+            return
+        if args.partition and layout(db) == 'plain':
+            convert(db, args.ahead, args.plan)
+            # The original table is still around; expiring months can wait for the next run
+            print(f"{Colors.BLUE}ℹ️  Retention (--keep-months {args.keep_months}) applies from the next run; "
+                  f"preview it with --plan{Colors.NC}")
+            return
+        if layout(db) != 'partitioned':
+            print(f"{Colors.YELLOW}⚠️  {TABLE} is not partitioned yet; run with --partition{Colors.NC}")
+            sys.exit(1)
+
+        if args.drop_unpartitioned and table_exists(db, OLD_TABLE):
+            if not args.plan:
+                db.execute(f"DROP TABLE {OLD_TABLE}")
+            print(f"{Colors.YELLOW}🧹 {'Would drop' if args.plan else 'Dropped'} {OLD_TABLE}{Colors.NC}")
+
+        today = month_start(date.today())
+        for name in create_partitions(db, TABLE, today, add_months(today, args.ahead), args.plan):
+            print(f"{Colors.GREEN}➕ {'Would create' if args.plan else 'Created'} {name}{Colors.NC}")
+
+        cutoff = add_months(today, -args.keep_months)
+        for name, month, rows, size, pending in partitions(db):
+            if month >= cutoff:
+                break
+            if args.plan:
+                print(f"{Colors.YELLOW}🧹 Would drop {name} (~{rows} rows, {fmt_size(size)})"
+                      f"{' after exporting' if args.export else ''}{Colors.NC}")
+                continue
+            if args.export:
+                path = export_partition(db, name, args.export)
+                print(f"{Colors.BLUE}📦 Exported {name} to {path} ({fmt_size(path.stat().st_size)}){Colors.NC}")
+            drop_partition(db, name, month, pending)
+            print(f"{Colors.YELLOW}🧹 Dropped {name} (~{rows} rows, {fmt_size(size)}){Colors.NC}")
+    except (RuntimeError, OSError) as e:
+        print(f"{Colors.RED}❌ {e}{Colors.NC}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    main()
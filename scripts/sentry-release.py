@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Sentry Release with Source Maps
+Creates the release for the frontend and backend projects, packs each app's
+.js/.map build output into artifact bundles and uploads them with Sentry's
+chunked upload: every bundle is checksummed, the server says which chunks it
+is missing, and only those are sent, in parallel. Bundles are byte-for-byte
+reproducible and group files by their hash-free name, so a deploy uploads
+roughly the bundles its changed files landed in, not every app's full build.
+Point SENTRY_API_BASE at sentry_mock.py to try it locally.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from cloudflare_client import Colors
+from sentry_client import BACKEND_PROJECT, FRONTEND_PROJECT, SentryClient, get_setting
+from site_builds import PROJECT_DIR, SITES, iter_site_files, strip_hash
+
+# app -> Sentry project; frontends take their build output from site_builds.SITES
+FRONTEND_APPS = ['marketing', 'app', 'client', 'admin']
+BACKEND_BUILD = ('server/dist', '~/var/www/currentmesh/server/dist/')  # tsc output (sourceMap: true)
+ARTIFACT_SUFFIXES = ('.js', '.mjs', '.cjs', '.map')
+
+BUNDLE_GROUPS = 8  # bundles per app; a changed file re-uploads only its group
+ZIP_LEVEL = 6
+ZIP_TIME = (1980, 1, 1, 0, 0, 0)  # fixed so unchanged groups produce identical bytes
+UPLOAD_CONCURRENCY = 8  # capped by the server's advertised concurrency
+ASSEMBLE_TIMEOUT = 120  # seconds to wait for the server to assemble bundles
+ASSEMBLE_POLL = 0.5  # seconds
+
+# Used when the server's chunk-upload options leave a field out
+DEFAULT_OPTIONS = {'chunkSize': 8 * 1024 * 1024, 'chunksPerRequest': 64, 'maxRequestSize': 32 * 1024 * 1024,
+                   'concurrency': 8, 'compression': []}
+
+def git_version():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or 'dev'
+    except (OSError, subprocess.SubprocessError):
+        return 'dev'
+
+def collect_artifacts(app, project_dir=PROJECT_DIR):
+    """[(path, '~/url path')] of an app's JS and source maps"""
+    if app == 'backend':
+        root = Path(project_dir) / BACKEND_BUILD[0]
+        if not root.is_dir():
+            return []
+        return sorted((path, BACKEND_BUILD[1] + path.relative_to(root).as_posix())
+                      for path in root.rglob('*') if path.is_file() and path.name.endswith(ARTIFACT_SUFFIXES))
+    # Only bundler output; public/ files aren't minified app code
+    prefixes = tuple(SITES[app].get('immutable', {}))
+    return sorted((path, '~' + url_path) for path, url_path in iter_site_files(app, project_dir)
+                  if url_path.startswith(prefixes) and path.name.endswith(ARTIFACT_SUFFIXES))
+
+def group_of(app, url):
+    """Stable group for a file: its URL with the bundler's content hash (and .map) removed"""
+    name = url[:-4] if url.endswith('.map') else url
+    if app != 'backend':
+        name = '~' + strip_hash(name[1:], app)
+    return zlib.crc32(name.encode()) % BUNDLE_GROUPS
+
+def sourcemap_reference(path):
+    """sourceMappingURL from the end of a minified file, if any"""
+    with open(path, 'rb') as f:
+        f.seek(max(0, path.stat().st_size - 512))
+        tail = f.read()
+    marker = tail.rfind(b'sourceMappingURL=')
+    ref = tail[marker + len(b'sourceMappingURL='):].split()[:1] if marker >= 0 else []
+    ref = ref[0].decode(errors='replace') if ref else None
+    return ref if ref and not ref.startswith('data:') else None
+
+class Bundle:
+    """One reproducible artifact bundle on disk plus its chunk checksums"""
+
+    def __init__(self, app, group, project, artifacts):
+        self.app = app
+        self.group = group
+        self.project = project
+        self.artifacts = artifacts
+        self.path = None
+        self.size = 0
+        self.checksum = None
+        self.chunks = []  # (sha1, offset, length)
+        self.state = None
+
+    def build(self, chunk_size, tmp_dir):
+        urls = {url for _, url in self.artifacts}
+        files = {}
+        fd, name = tempfile.mkstemp(prefix=f'{self.app}-{self.group}-', suffix='.zip', dir=tmp_dir)
+        os.close(fd)
+        self.path = Path(name)
+        with zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_LEVEL) as bundle:
+            for path, url in self.artifacts:
+                entry = 'files/_/_/' + url.lstrip('~/')
+                info = zipfile.ZipInfo(entry, ZIP_TIME)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                with open(path, 'rb') as src, bundle.open(info, 'w') as dst:
+                    while True:
+                        data = src.read(1024 * 1024)
+                        if not data:
+                            break
+                        dst.write(data)
+                meta = {'url': url, 'type': 'source_map' if url.endswith('.map') else 'minified_source'}
+                if not url.endswith('.map'):
+                    ref = sourcemap_reference(path)
+                    if not ref and f'{url}.map' in urls:
+                        ref = url.rsplit('/', 1)[-1] + '.map'
+                    if ref:
+                        meta['headers'] = {'Sourcemap': ref}
+                files[entry] = meta
+            # No release in the manifest: it goes with the assemble call, so an
+            # unchanged group is the same bundle in every release
+            info = zipfile.ZipInfo('manifest.json', ZIP_TIME)
+            info.external_attr = 0o644 << 16
+            bundle.writestr(info, json.dumps({'files': files}, sort_keys=True, separators=(',', ':')),
+                            zipfile.ZIP_DEFLATED, ZIP_LEVEL)
+
+        whole = hashlib.sha1()
+        offset = 0
+        with open(self.path, 'rb') as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                whole.update(data)
+                self.chunks.append((hashlib.sha1(data).hexdigest(), offset, len(data)))
+                offset += len(data)
+        self.size = offset
+        self.checksum = whole.hexdigest()
+
+    def read_chunk(self, offset, length):
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+class Uploader:
+    """Chunked artifact bundle upload for one release"""
+
+    def __init__(self, client, version, dist=None, concurrency=UPLOAD_CONCURRENCY):
+        self.client = client
+        self.version = version
+        self.dist = dist
+        response = client.org_request('GET', 'chunk-upload/')
+        if response.status_code != 200:
+            raise RuntimeError(f'chunk-upload options: HTTP {response.status_code} {response.text[:200]}')
+        self.options = dict(DEFAULT_OPTIONS, **response.json())
+        if 'artifact_bundles' not in self.options.get('accept', ['artifact_bundles']):
+            raise RuntimeError('this Sentry server does not accept artifact bundles')
+        self.workers = max(1, min(concurrency, int(self.options['concurrency'])))
+        self.gzip = 'gzip' in self.options['compression']
+        self.uploaded_bytes = 0
+        self.uploaded_chunks = 0
+
+    @property
+    def chunk_size(self):
+        return int(self.options['chunkSize'])
+
+    def assemble(self, bundle):
+        """Ask the server to assemble a bundle; returns (state, missing chunk sha1s)"""
+        body = {'checksum': bundle.checksum, 'chunks': [sha for sha, _, _ in bundle.chunks],
+                'projects': [bundle.project], 'version': self.version}
+        if self.dist:
+            body['dist'] = self.dist
+        # Assembling the same checksum twice is harmless, so retries are safe
+        response = self.client.org_request('POST', 'artifactbundle/assemble/', json=body, retry=True)
+        if response.status_code != 200:
+            raise RuntimeError(f'assemble {bundle.app}#{bundle.group}: HTTP {response.status_code} '
+                               f'{response.text[:200]}')
+        result = response.json()
+        if result.get('state') == 'error':
+            raise RuntimeError(f"assemble {bundle.app}#{bundle.group}: {result.get('detail')}")
+        bundle.state = result.get('state')
+        return bundle.state, result.get('missingChunks') or []
+
+    def upload_batch(self, batch):
+        files = []
+        size = 0
+        for sha, bundle, offset, length in batch:
+            data = bundle.read_chunk(offset, length)
+            if self.gzip:
+                data = gzip.compress(data, 6, mtime=0)
+            files.append(('file_gzip' if self.gzip else 'file', (sha, data, 'application/octet-stream')))
+            size += length
+        # Chunks are content-addressed, so a replayed upload is idempotent
+        response = self.client.request('POST', self.options.get('url') or self.client.org_path('chunk-upload/'),
+                                       files=files, retry=True)
+        if response.status_code != 200:
+            raise RuntimeError(f'chunk upload: HTTP {response.status_code} {response.text[:200]}')
+        return len(batch), size
+
+    def batches(self, missing):
+        """Group (sha, bundle, offset, length) chunks into requests within the server's limits"""
+        # Spread small uploads over the workers rather than one full request
+        per_request = min(int(self.options['chunksPerRequest']), max(1, -(-len(missing) // self.workers)))
+        batch, size = [], 0
+        for chunk in missing:
+            if batch and (len(batch) >= per_request
+                          or size + chunk[3] > int(self.options['maxRequestSize'])):
+                yield batch
+                batch, size = [], 0
+            batch.append(chunk)
+            size += chunk[3]
+        if batch:
+            yield batch
+
+    def upload(self, bundles):
+        """Assemble every bundle, sending only the chunks the server lacks"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(self.assemble, bundles))
+            chunk_index = {sha: (bundle, offset, length) for bundle in bundles for sha, offset, length in bundle.chunks}
+            # Identical chunks across bundles are sent once
+            missing = sorted({sha for _, shas in results for sha in shas})
+            unknown = [sha for sha in missing if sha not in chunk_index]
+            if unknown:
+                raise RuntimeError(f'server asked for chunks that are not ours: {unknown[:3]}')
+            chunks = [(sha, *chunk_index[sha]) for sha in missing]
+            for count, size in pool.map(self.upload_batch, self.batches(chunks)):
+                self.uploaded_chunks += count
+                self.uploaded_bytes += size
+
+            pending = [bundle for bundle, (state, shas) in zip(bundles, results) if shas or state != 'ok']
+            deadline = time.monotonic() + ASSEMBLE_TIMEOUT
+            while pending:
+                results = list(pool.map(self.assemble, pending))
+                for bundle, (_, shas) in zip(pending, results):
+                    if shas:
+                        raise RuntimeError(f'{bundle.app}#{bundle.group}: server still missing {len(shas)} chunks')
+                pending = [bundle for bundle in pending if bundle.state != 'ok']
+                if pending and time.monotonic() > deadline:
+                    raise RuntimeError(f'{len(pending)} bundles not assembled after {ASSEMBLE_TIMEOUT}s')
+                if pending:
+                    time.sleep(ASSEMBLE_POLL)
+
+def fmt_size(n):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(n) < 1024:
+            return f"{n:.0f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+def build_bundles(apps, chunk_size, tmp_dir, project_dir=PROJECT_DIR):
+    bundles = []
+    for app in apps:
+        artifacts = collect_artifacts(app, project_dir)
+        if not artifacts:
+            print(f"{Colors.YELLOW}⚠️  {app}: no .js/.map build output, skipped{Colors.NC}")
+            continue
+        project = BACKEND_PROJECT if app == 'backend' else FRONTEND_PROJECT
+        groups = {}
+        for path, url in artifacts:
+            groups.setdefault(group_of(app, url), []).append((path, url))
+        app_bundles = [Bundle(app, group, project, groups[group]) for group in sorted(groups)]
+        for bundle in app_bundles:
+            bundle.build(chunk_size, tmp_dir)
+        bundles += app_bundles
+        maps = sum(1 for _, url in artifacts if url.endswith('.map'))
+        print(f"📦 {app}: {len(artifacts)} files ({maps} source maps) in {len(app_bundles)} bundles, "
+              f"{fmt_size(sum(b.size for b in app_bundles))}")
+    return bundles
+
+def main():
+    parser = argparse.ArgumentParser(description='Create a Sentry release and upload source maps')
+    parser.add_argument('version', nargs='?', help='Release version (default: short git commit)')
+    parser.add_argument('--apps', default=','.join(FRONTEND_APPS + ['backend']),
+                        help='Comma-separated apps to upload artifacts for')
+    parser.add_argument('--dist', help='Distribution identifier')
+    parser.add_argument('--no-artifacts', action='store_true', help='Only create and finalize the release')
+    parser.add_argument('--no-finalize', action='store_true', help='Leave the release unreleased')
+    parser.add_argument('--environment', help='Also record a deploy to this environment')
+    parser.add_argument('--concurrency', type=int, default=UPLOAD_CONCURRENCY, help='Parallel upload requests')
+    parser.add_argument('--project-dir', default=str(PROJECT_DIR), help='Checkout containing the builds')
+    parser.add_argument('--plan', action='store_true', help='Build bundles and show sizes without contacting Sentry')
+    args = parser.parse_args()
+
+    version = args.version or git_version()
+    apps = [app.strip() for app in args.apps.split(',') if app.strip()]
+    unknown = [app for app in apps if app not in FRONTEND_APPS + ['backend']]
+    if unknown:
+        print(f"{Colors.RED}Error: unknown app(s) {', '.join(unknown)}{Colors.NC}")
+        sys.exit(2)
+    if not args.plan and not get_setting('SENTRY_AUTH_TOKEN'):
+        print(f"{Colors.YELLOW}Warning: SENTRY_AUTH_TOKEN not set. Skipping release creation.{Colors.NC}")
+        return
+
+    started = time.monotonic()
+    with tempfile.TemporaryDirectory(prefix='sentry-release-') as tmp_dir:
+        if args.plan:
+            bundles = build_bundles(apps, DEFAULT_OPTIONS['chunkSize'], tmp_dir, args.project_dir)
+            print(f"{Colors.BLUE}📋 {version}: {len(bundles)} bundles, {fmt_size(sum(b.size for b in bundles))} "
+                  f"(only chunks Sentry lacks would be uploaded){Colors.NC}")
+            return
+
+        client = SentryClient(pool_size=max(args.concurrency, 4))
+        print(f"{Colors.BLUE}Creating Sentry release: {version}{Colors.NC}")
+        try:
+            # Re-creating an existing version is answered with 208 and changes nothing
+            response = client.org_request('POST', 'releases/', retry=True,
+                                          json={'version': version, 'projects': [FRONTEND_PROJECT, BACKEND_PROJECT]})
+            if response.status_code not in (200, 201, 208):
+                raise RuntimeError(f'create release: HTTP {response.status_code} {response.text[:200]}')
+
+            if not args.no_artifacts:
+                uploader = Uploader(client, version, args.dist, args.concurrency)
+                bundles = build_bundles(apps, uploader.chunk_size, tmp_dir, args.project_dir)
+                if bundles:
+                    uploader.upload(bundles)
+                    total = sum(b.size for b in bundles)
+                    print(f"{Colors.GREEN}✅ Artifacts: {fmt_size(total)} in {len(bundles)} bundles, uploaded "
+                          f"{fmt_size(uploader.uploaded_bytes)} ({uploader.uploaded_chunks} new chunks){Colors.NC}")
+
+            if not args.no_finalize:
+                response = client.org_request('PUT', f'releases/{version}/',
+                                              json={'dateReleased': datetime.now(timezone.utc).isoformat()})
+                if response.status_code != 200:
+                    raise RuntimeError(f'finalize release: HTTP {response.status_code} {response.text[:200]}')
+            if args.environment:
+                response = client.org_request('POST', f'releases/{version}/deploys/',
+                                              json={'environment': args.environment})
+                if response.status_code not in (200, 201):
+                    raise RuntimeError(f'record deploy: HTTP {response.status_code} {response.text[:200]}')
+        except (RuntimeError, OSError) as e:
+            print(f"{Colors.RED}❌ {e}{Colors.NC}")
+            sys.exit(1)
+
+    print(f"{Colors.GREEN}✅ Sentry release created: {version} ({time.monotonic() - started:.1f}s){Colors.NC}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Sentry Webhook Relay
+Sits between Sentry and /api/sentry/webhook. Deliveries are acknowledged
+immediately, coalesced per issue over a short window (only the latest payload
+of a burst is forwarded) and passed to the API with bounded concurrency.
+While the API is slow, queued issues keep absorbing duplicates; once the
+queue is full, new issues are refused with 503 instead of piling onto the
+API process that is already failing.
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import api_trace
+
+LOG_FILE = Path(__file__).parent.parent / 'logs' / 'sentry-relay.log'
+SERVER_ENV = Path(__file__).parent.parent / 'server' / '.env.local'
+
+RELAY_HOST = '127.0.0.1'
+RELAY_PORT = 3090
+UPSTREAM_URL = 'http://127.0.0.1:3000/api/sentry/webhook'
+
+COALESCE_WINDOW = 2.0  # seconds a new issue waits for duplicates before forwarding
+FORWARD_CONCURRENCY = 4  # deliveries in flight to the API at once
+MAX_PENDING = 5000  # queued issues before new ones are refused
+MAX_BODY = 1024 * 1024  # bytes
+FORWARD_TIMEOUT = 10  # seconds
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 2.0  # seconds, doubled per attempt
+DRAIN_TIMEOUT = 15  # seconds to flush the queue on shutdown
+STATS_INTERVAL = 60  # seconds between stats lines while busy
+
+# Passed through unchanged so the API's secret check (and any signature) still holds
+FORWARDED_HEADERS = ('Content-Type', 'Sentry-Hook-Resource', 'Sentry-Hook-Timestamp', 'Sentry-Hook-Signature',
+                     'Sentry-Hook-Secret', 'Request-ID')
+
+def log(message):
+    line = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}"
+    print(line, flush=True)
+    with open(LOG_FILE, 'a') as f:
+        f.write(line + '\n')
+
+def webhook_secret():
+    """SENTRY_WEBHOOK_SECRET from the environment or server/.env.local, like the API server"""
+    if os.getenv('SENTRY_WEBHOOK_SECRET'):
+        return os.getenv('SENTRY_WEBHOOK_SECRET')
+    try:
+        with open(SERVER_ENV, 'r') as f:
+            for line in f:
+                key, sep, value = line.strip().partition('=')
+                if sep and key == 'SENTRY_WEBHOOK_SECRET':
+                    return value.strip().strip('"\'') or None
+    except FileNotFoundError:
+        pass
+    return None
+
+def _dig(payload, *path):
+    for key in path:
+        if not isinstance(payload, dict):
+            return None
+        payload = payload.get(key)
+    return payload
+
+def coalesce_key(payload):
+    """
+    (kind, issue id) for deliveries that can be merged, None otherwise
+    Issue and event payloads are kept apart because the API stores them differently
+    """
+    issue_id = _dig(payload, 'data', 'issue', 'id') or _dig(payload, 'issue', 'id')
+    if issue_id:
+        return 'issue', str(issue_id)
+    for path in (('data', 'event', 'issue_id'), ('data', 'error', 'issue_id'), ('event', 'issue_id'),
+                 ('event', 'groupID'), ('data', 'event', 'groupID')):
+        issue_id = _dig(payload, *path)
+        if issue_id:
+            return 'event', str(issue_id)
+    return None
+
+class Delivery:
+    def __init__(self, key, body, headers, due):
+        self.key = key
+        self.body = body
+        self.headers = headers
+        self.due = due
+        self.merged = 1
+        self.attempts = 0
+
+class Relay:
+    def __init__(self, upstream=UPSTREAM_URL, window=COALESCE_WINDOW, concurrency=FORWARD_CONCURRENCY,
+                 max_pending=MAX_PENDING):
+        self.upstream = upstream
+        self.window = window
+        self.max_pending = max_pending
+        self.pending = {}
+        self.schedule = []  # (due, seq, key) heap; stale entries are skipped
+        self.seq = itertools.count()
+        self.lock = threading.Condition()
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.in_flight = 0
+        self.stopping = False
+        self.stats = {'received': 0, 'coalesced': 0, 'refused': 0, 'forwarded': 0, 'rejected': 0,
+                      'retried': 0, 'failed': 0}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def submit(self, payload, body, headers):
+        """Queue a delivery; returns 'queued', 'coalesced' or 'full'"""
+        key = coalesce_key(payload)
+        with self.lock:
+            self.stats['received'] += 1
+            if key is not None and key in self.pending:
+                delivery = self.pending[key]
+                delivery.body, delivery.headers = body, headers
+                delivery.merged += 1
+                self.stats['coalesced'] += 1
+                return 'coalesced'
+            if len(self.pending) >= self.max_pending:
+                self.stats['refused'] += 1
+                return 'full'
+            # Deliveries without an issue id still go through the limiter, just unmerged
+            key = key or ('raw', str(next(self.seq)))
+            self._enqueue(Delivery(key, body, headers, time.monotonic() + self.window))
+            return 'queued'
+
+    def _enqueue(self, delivery):
+        self.pending[delivery.key] = delivery
+        heapq.heappush(self.schedule, (delivery.due, next(self.seq), delivery.key))
+        self.lock.notify()
+
+    def _next_due(self):
+        """Block until a delivery is due; None once stopped and drained"""
+        with self.lock:
+            while True:
+                now = time.monotonic()
+                while self.schedule:
+                    due, _, key = self.schedule[0]
+                    delivery = self.pending.get(key)
+                    if delivery is None or delivery.due != due:
+                        heapq.heappop(self.schedule)
+                        continue
+                    if due <= now or self.stopping:
+                        heapq.heappop(self.schedule)
+                        # From here on a new delivery for this issue starts a new window
+                        del self.pending[key]
+                        self.in_flight += 1
+                        return delivery
+                    break
+                if self.stopping and not self.schedule:
+                    return None
+                self.lock.wait(self.schedule[0][0] - now if self.schedule else None)
+
+    def dispatch_loop(self):
+        while True:
+            # Holding a slot before dequeuing is the backpressure: while the API
+            # is slow, due deliveries stay in pending and keep coalescing
+            self.slots.acquire()
+            delivery = self._next_due()
+            if delivery is None:
+                self.slots.release()
+                return
+            threading.Thread(target=self._forward, args=(delivery,), daemon=True).start()
+
+    def _forward(self, delivery):
+        delivery.attempts += 1
+        headers = dict(delivery.headers, **{'X-Relay-Coalesced': str(delivery.merged)})
+        started = time.monotonic()
+        status = error = None
+        try:
+            response = self.session.post(self.upstream, data=delivery.body, headers=headers, timeout=FORWARD_TIMEOUT)
+            status = response.status_code
+        except requests.RequestException as e:
+            error = type(e).__name__
+        api_trace.record('sentry-relay', 'POST', 'api/sentry/webhook', status, time.monotonic() - started,
+                         delivery.attempts - 1, error=error)
+        try:
+            with self.lock:
+                if status is not None and status < 500 and status != 429:
+                    self.stats['forwarded' if status < 400 else 'rejected'] += 1
+                    if status >= 400:
+                        log(f"WARNING: API rejected {delivery.key[0]} {delivery.key[1]} with {status}")
+                elif delivery.attempts < MAX_ATTEMPTS and not self.stopping and delivery.key not in self.pending:
+                    # Retry unless a newer delivery for the issue already supersedes this one
+                    self.stats['retried'] += 1
+                    delivery.due = time.monotonic() + RETRY_BACKOFF * 2 ** (delivery.attempts - 1)
+                    self._enqueue(delivery)
+                elif delivery.key not in self.pending:
+                    self.stats['failed'] += 1
+                    log(f"ERROR: Dropped {delivery.key[0]} {delivery.key[1]} after {delivery.attempts} attempts "
+                        f"({error or status})")
+                self.in_flight -= 1
+                self.lock.notify_all()
+        finally:
+            self.slots.release()
+
+    def drain(self, timeout=DRAIN_TIMEOUT):
+        """Forward everything queued now and wait for in-flight deliveries"""
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            self.stopping = True
+            self.lock.notify_all()
+            while (self.pending or self.in_flight) and time.monotonic() < deadline:
+                self.lock.wait(0.1)
+            return len(self.pending) + self.in_flight
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats, pending=len(self.pending), in_flight=self.in_flight)
+
+class RelayServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Sentry opens a connection per delivery during bursts
+
+def make_handler(relay, secret):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; with Nagle on, the body
+        # waits for the client's delayed ACK (~40ms) on every reply
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip('/') in ('', '/health'):
+                self._send(200, relay.snapshot())
+            else:
+                self._send(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_BODY:
+                self.close_connection = True
+                self._send(413, {'error': 'Payload too large'})
+                return
+            body = self.rfile.read(length)
+            # Same check as the API route, so junk never reaches the queue
+            if self.headers.get('Sentry-Hook-Secret') != secret:
+                self._send(401, {'error': 'Unauthorized'})
+                return
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self._send(400, {'error': 'Invalid JSON'})
+                return
+            headers = {key: self.headers[key] for key in FORWARDED_HEADERS if self.headers.get(key)}
+            outcome = relay.submit(payload, body, headers)
+            if outcome == 'full':
+                self._send(503, {'error': 'Relay queue full'}, {'Retry-After': str(int(relay.window) + 1)})
+            else:
+                self._send(202, {'success': True, outcome: True})
+
+    return Handler
+
+def main():
+    global LOG_FILE
+
+    parser = argparse.ArgumentParser(description='Coalescing relay in front of the Sentry webhook route')
+    parser.add_argument('--host', default=RELAY_HOST, help='Address to listen on')
+    parser.add_argument('--port', type=int, default=RELAY_PORT, help='Port to listen on')
+    parser.add_argument('--upstream', default=UPSTREAM_URL, help='API webhook URL to forward to')
+    parser.add_argument('--window', type=float, default=COALESCE_WINDOW, help='Coalescing window in seconds')
+    parser.add_argument('--concurrency', type=int, default=FORWARD_CONCURRENCY, help='Deliveries in flight at once')
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING, help='Queued issues before refusing')
+    parser.add_argument('--log-file', default=str(LOG_FILE), help='Where to append relay events')
+    args = parser.parse_args()
+
+    LOG_FILE = Path(args.log_file)
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    # The relay is public behind nginx; without the secret anyone could fill its queue
+    secret = webhook_secret()
+    if not secret:
+        log(f"ERROR: SENTRY_WEBHOOK_SECRET is not set in the environment or {SERVER_ENV}; refusing to start")
+        sys.exit(1)
+    relay = Relay(args.upstream, args.window, args.concurrency, args.max_pending)
+    server = RelayServer((args.host, args.port), make_handler(relay, secret))
+    threading.Thread(target=relay.dispatch_loop, daemon=True).start()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    log(f"INFO: Sentry relay listening on {args.host}:{args.port} -> {args.upstream} "
+        f"(window {args.window:g}s, concurrency {args.concurrency})")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    last = relay.snapshot()
+    try:
+        while not stop.wait(STATS_INTERVAL):
+            stats = relay.snapshot()
+            if stats['received'] != last['received'] or stats['pending']:
+                log("INFO: " + ' '.join(f"{key}={value}" for key, value in stats.items()))
+            last = stats
+    except KeyboardInterrupt:
+        pass
+
+    server.shutdown()
+    left = relay.drain()
+    log(f"INFO: Sentry relay stopped ({left} deliveries not forwarded)" if left else "INFO: Sentry relay stopped")
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
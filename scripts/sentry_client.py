@@ -0,0 +1,146 @@
+"""
+Shared Sentry API client
+Loads .env-config/.env once and reuses a single keep-alive session for every
+call, with the same retry rules as cloudflare_client. Small facts worth
+keeping between runs (e.g. the registered event hook) live in .sentry/state.json
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import api_trace
+from cloudflare_client import Colors, backoff_delay, retry_after
+
+# Can be pointed elsewhere, e.g. at sentry_mock.py
+API_BASE = os.getenv('SENTRY_API_BASE', 'https://sentry.io/api/0')
+ENV_PATH = Path(os.getenv('SENTRY_ENV_FILE') or Path(__file__).parent.parent / '.env-config' / '.env')
+STATE_DIR = Path(os.getenv('SENTRY_STATE_DIR') or Path(__file__).parent.parent / '.sentry')
+STATE_PATH = STATE_DIR / 'state.json'
+
+DEFAULT_ORG = '4510628533370880'
+FRONTEND_PROJECT = '4510628587634688'  # marketing, app, client, admin
+BACKEND_PROJECT = '4510628617191424'  # server
+
+POOL_SIZE = 16
+REQUEST_TIMEOUT = 30  # seconds
+MAX_RETRIES = 4
+RETRY_STATUS = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+_env_cache = None
+
+def load_env():
+    """Variables from .env-config/.env (parsed once per process; empty if the file is missing)"""
+    global _env_cache
+    if _env_cache is not None:
+        return _env_cache
+    env_vars = {}
+    try:
+        with open(ENV_PATH, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    env_vars[key.strip()] = value.strip().strip('"\'')
+    except FileNotFoundError:
+        pass
+    _env_cache = env_vars
+    return _env_cache
+
+def get_setting(key, default=None):
+    """The process environment wins over .env-config/.env"""
+    return os.getenv(key) or load_env().get(key) or default
+
+def load_state():
+    try:
+        with open(STATE_PATH, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_state(state):
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    tmp.replace(STATE_PATH)
+
+class SentryClient:
+    """Keep-alive Sentry web API client for one organization"""
+
+    def __init__(self, token=None, org=None, pool_size=POOL_SIZE):
+        self.token = token or get_setting('SENTRY_AUTH_TOKEN')
+        if not self.token:
+            print(f"{Colors.RED}Error: SENTRY_AUTH_TOKEN not found{Colors.NC}")
+            sys.exit(1)
+        self.org = org or get_setting('SENTRY_ORG') or DEFAULT_ORG
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Authorization': f'Bearer {self.token}'})
+
+    def url(self, path):
+        return path if '://' in path else f'{API_BASE}/{path.lstrip("/")}'
+
+    def org_path(self, endpoint):
+        return f'organizations/{self.org}/{endpoint.lstrip("/")}'
+
+    def request(self, method, path, json=None, retry=None, **kwargs):
+        """
+        Send a request and return the raw response
+        429s are always retried (Retry-After first), 5xx, connection errors and
+        timeouts only for idempotent methods unless retry=True says the call is
+        safe to replay. The call is traced once, with its total time and retry count.
+        """
+        url = self.url(path)
+        method = method.upper()
+        retry = method in IDEMPOTENT_METHODS if retry is None else retry
+        kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+        attempt = 0
+        started = time.monotonic()
+        while True:
+            try:
+                response = self.session.request(method, url, json=json, **kwargs)
+            except requests.RequestException as e:
+                transient = isinstance(e, (requests.ConnectionError, requests.Timeout))
+                if not transient or not retry or attempt >= MAX_RETRIES:
+                    api_trace.record('sentry', method, url, None, time.monotonic() - started, attempt,
+                                     error=type(e).__name__)
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            retryable = response.status_code == 429 or (response.status_code in RETRY_STATUS and retry)
+            if not retryable or attempt >= MAX_RETRIES:
+                api_trace.record('sentry', method, url, response.status_code, time.monotonic() - started, attempt)
+                return response
+            delay = retry_after(response.headers)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            print(f"{Colors.YELLOW}⚠️  {method} {path}: HTTP {response.status_code}, retrying in {delay:.1f}s{Colors.NC}")
+            time.sleep(delay)
+            attempt += 1
+
+    def org_request(self, method, endpoint, json=None, **kwargs):
+        return self.request(method, self.org_path(endpoint), json=json, **kwargs)
+
+    def paginate(self, path, params=None, **kwargs):
+        """Yield every item of a list endpoint, following Link: rel="next" cursors"""
+        url = self.url(path)
+        while url:
+            response = self.request('GET', url, params=params, **kwargs)
+            if response.status_code != 200:
+                raise RuntimeError(f'GET {path}: HTTP {response.status_code} {response.text[:200]}')
+            yield from response.json()
+            # Sentry always sends a next link; results="false" marks the last page
+            link = response.links.get('next')
+            url = link['url'] if link and link.get('results') == 'true' else None
+            params = None  # carried by the cursor URL
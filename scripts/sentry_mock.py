@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Local Sentry API stand-in
+In-memory implementation of the organization endpoints the Sentry tooling
+uses (releases, deploys, chunk upload, artifact bundle assembly, event
+hooks, with cursor pagination) with
+configurable latency and error rates, and counters for requests, bytes and
+uploaded chunks. Point a script at it with
+SENTRY_API_BASE=http://127.0.0.1:<port>/api/0 and any SENTRY_AUTH_TOKEN.
+"""
+
+import argparse
+import copy
+import email.parser
+import gzip
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+API_PREFIX = '/api/0'
+MOCK_ORG = '4510628533370880'
+CHUNK_SIZE = 8 * 1024 * 1024
+CHUNKS_PER_REQUEST = 64
+MAX_REQUEST_SIZE = 32 * 1024 * 1024
+PAGE_SIZE = 100  # Sentry's default per_page
+
+# (method, route name, path pattern under /api/0)
+ROUTES = [
+    ('POST', 'releases', r'/organizations/(?P<org>[^/]+)/releases/'),
+    ('PUT', 'release', r'/organizations/(?P<org>[^/]+)/releases/(?P<version>[^/]+)/'),
+    ('POST', 'deploys', r'/organizations/(?P<org>[^/]+)/releases/(?P<version>[^/]+)/deploys/'),
+    ('GET', 'chunk_options', r'/organizations/(?P<org>[^/]+)/chunk-upload/'),
+    ('POST', 'chunk_upload', r'/organizations/(?P<org>[^/]+)/chunk-upload/'),
+    ('POST', 'assemble', r'/organizations/(?P<org>[^/]+)/artifactbundle/assemble/'),
+    ('GET', 'hooks', r'/organizations/(?P<org>[^/]+)/hooks/'),
+    ('POST', 'hooks', r'/organizations/(?P<org>[^/]+)/hooks/'),
+    ('GET', 'hook', r'/organizations/(?P<org>[^/]+)/hooks/(?P<hook_id>[^/]+)/'),
+    ('PUT', 'hook', r'/organizations/(?P<org>[^/]+)/hooks/(?P<hook_id>[^/]+)/'),
+    ('DELETE', 'hook', r'/organizations/(?P<org>[^/]+)/hooks/(?P<hook_id>[^/]+)/'),
+]
+ROUTES = [(method, name, re.compile(pattern + '$')) for method, name, pattern in ROUTES]
+
+class MockError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+
+class MockSentry:
+    """
+    Threaded mock server; start() returns the API base URL
+    Faults are injected on a fixed stride (a 0.1 rate fails every 10th
+    request), so runs with the same config see the same number of faults
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, **config):
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.server.request_queue_size = 64
+        self.thread = None
+        self.reset(**config)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}{API_PREFIX}'
+
+    def reset(self, latency=0.0, error_rate=0.0, chunk_size=CHUNK_SIZE, assemble_polls=0, keep_chunks=False,
+              hooks=0):
+        """
+        Fresh releases, bundles, hooks and counters; keep_chunks=True keeps the
+        chunk store (a server that has seen earlier deploys). assemble_polls
+        makes each new bundle report 'assembling' that many times before 'ok';
+        hooks pre-registers that many unrelated event hooks
+        """
+        with self.lock:
+            self.latency = latency
+            self.error_every = round(1 / error_rate) if error_rate else 0
+            self.chunk_size = chunk_size
+            self.assemble_polls = assemble_polls
+            if not keep_chunks or not hasattr(self, 'chunks'):
+                self.chunks = {}
+            self.releases = {}
+            self.bundles = {}
+            self.assembling = {}
+            self.hooks = {}
+            for n in range(hooks):
+                self._add_hook(f'https://hooks.example.com/{n}', ['issue.created'])
+            self.clear_stats()
+
+    def clear_stats(self):
+        self.counts = {'requests': 0, 'bytes_in': 0, 'bytes_out': 0, 'errors': 0, 'chunks_uploaded': 0,
+                       'chunk_bytes': 0, 'routes': {}}
+
+    def stats(self):
+        with self.lock:
+            return copy.deepcopy(self.counts)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                data = json.dumps(body).encode() if status != 204 else b''
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return len(data)
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                url = urlsplit(self.path)
+
+                if url.path == '/__stats':
+                    self._send(200, mock.stats())
+                    return
+                if url.path == '/__reset':
+                    mock.reset(**(json.loads(raw) if raw else {}))
+                    self._send(200, {'ok': True})
+                    return
+
+                if not self.headers.get('Authorization', '').startswith('Bearer '):
+                    self._send(401, {'detail': 'Authentication credentials were not provided.'})
+                    return
+                status, body, headers = mock.dispatch(self.command, url.path, url.query, raw,
+                                                      self.headers.get('Content-Type', ''))
+                sent = self._send(status, body, headers)
+                with mock.lock:
+                    mock.counts['bytes_out'] += sent
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+        return Handler
+
+    def dispatch(self, method, path, query, raw, content_type):
+        """Route one API call; returns (status, body, headers)"""
+        with self.lock:
+            self.counts['requests'] += 1
+            self.counts['bytes_in'] += len(raw)
+            n = self.counts['requests']
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_every and n % self.error_every == 0:
+            with self.lock:
+                self.counts['errors'] += 1
+            return 503, {'detail': 'Service unavailable'}, {}
+
+        path = path[len(API_PREFIX):] if path.startswith(API_PREFIX) else path
+        for route_method, name, pattern in ROUTES:
+            match = pattern.match(path)
+            if match and route_method == method:
+                break
+        else:
+            return 404, {'detail': f'No route for {method} {path}'}, {}
+
+        params = match.groupdict()
+        if params.pop('org') != MOCK_ORG:
+            return 404, {'detail': 'The requested resource does not exist'}, {}
+        with self.lock:
+            key = f'{method} {name}'
+            self.counts['routes'][key] = self.counts['routes'].get(key, 0) + 1
+        try:
+            if name == 'chunk_upload':
+                result = self._chunk_upload(raw, content_type)
+            else:
+                # GET handlers take their arguments from the query string
+                data = dict(parse_qsl(query)) if method == 'GET' else json.loads(raw) if raw else {}
+                with self.lock:
+                    result = getattr(self, f'_{name}')(method, data, **params)
+        except MockError as e:
+            return e.status, {'detail': str(e)}, {}
+        except ValueError:
+            return 400, {'detail': 'Malformed request'}, {}
+        return result if len(result) == 3 else (*result, {})
+
+    def _releases(self, method, data):
+        version = data.get('version')
+        if not version:
+            raise MockError(400, 'version is required')
+        if version in self.releases:
+            return 208, self.releases[version]
+        self.releases[version] = {'version': version, 'projects': data.get('projects', []), 'dateReleased': None,
+                                  'bundles': [], 'deploys': []}
+        return 201, self.releases[version]
+
+    def _release(self, method, data, version):
+        if version not in self.releases:
+            raise MockError(404, 'Release not found')
+        self.releases[version].update({k: v for k, v in data.items() if k in ('dateReleased', 'ref', 'url')})
+        return 200, self.releases[version]
+
+    def _deploys(self, method, data, version):
+        if version not in self.releases:
+            raise MockError(404, 'Release not found')
+        deploy = {'id': str(len(self.releases[version]['deploys']) + 1), 'environment': data.get('environment')}
+        self.releases[version]['deploys'].append(deploy)
+        return 201, deploy
+
+    def _chunk_options(self, method, data):
+        host, port = self.server.server_address[:2]
+        return 200, {
+            'url': f'http://{host}:{port}{API_PREFIX}/organizations/{MOCK_ORG}/chunk-upload/',
+            'chunkSize': self.chunk_size,
+            'chunksPerRequest': CHUNKS_PER_REQUEST,
+            'maxFileSize': 2 * 1024 ** 3,
+            'maxRequestSize': MAX_REQUEST_SIZE,
+            'concurrency': 8,
+            'hashAlgorithm': 'sha1',
+            'compression': ['gzip'],
+            'accept': ['release_files', 'artifact_bundles', 'sources'],
+        }
+
+    def _chunk_upload(self, raw, content_type):
+        message = email.parser.BytesParser().parsebytes(
+            b'Content-Type: ' + content_type.encode() + b'\r\nMIME-Version: 1.0\r\n\r\n' + raw)
+        if not message.is_multipart():
+            raise MockError(400, 'Expected multipart/form-data')
+        parts = message.get_payload()
+        if len(parts) > CHUNKS_PER_REQUEST:
+            raise MockError(400, f'At most {CHUNKS_PER_REQUEST} chunks per request')
+        stored = []
+        for part in parts:
+            field = part.get_param('name', header='content-disposition')
+            data = part.get_payload(decode=True) or b''
+            if field == 'file_gzip':
+                data = gzip.decompress(data)
+            elif field != 'file':
+                continue
+            checksum = hashlib.sha1(data).hexdigest()
+            if checksum != part.get_filename():
+                raise MockError(400, f'Checksum mismatch for chunk {part.get_filename()}')
+            stored.append((checksum, data))
+        with self.lock:
+            for checksum, data in stored:
+                self.chunks[checksum] = data
+                self.counts['chunks_uploaded'] += 1
+                self.counts['chunk_bytes'] += len(data)
+        return 200, {}
+
+    def _assemble(self, method, data):
+        checksum, chunks = data.get('checksum'), data.get('chunks') or []
+        version = data.get('version')
+        if not checksum or not data.get('projects'):
+            raise MockError(400, 'checksum and projects are required')
+        missing = [sha for sha in chunks if sha not in self.chunks]
+        if missing:
+            return 200, {'state': 'not_found', 'missingChunks': missing, 'detail': None}
+
+        if checksum not in self.bundles:
+            blob = b''.join(self.chunks[sha] for sha in chunks)
+            if hashlib.sha1(blob).hexdigest() != checksum:
+                return 200, {'state': 'error', 'missingChunks': [], 'detail': 'Checksum mismatch'}
+            try:
+                with zipfile.ZipFile(io.BytesIO(blob)) as bundle:
+                    manifest = json.loads(bundle.read('manifest.json'))
+            except (zipfile.BadZipFile, KeyError, ValueError):
+                return 200, {'state': 'error', 'missingChunks': [], 'detail': 'Invalid artifact bundle'}
+            self.bundles[checksum] = {'files': len(manifest.get('files', {})), 'size': len(blob)}
+            self.assembling[checksum] = self.assemble_polls
+        if self.assembling.get(checksum):
+            self.assembling[checksum] -= 1
+            return 200, {'state': 'assembling', 'missingChunks': [], 'detail': None}
+        if version in self.releases and checksum not in self.releases[version]['bundles']:
+            self.releases[version]['bundles'].append(checksum)
+        return 200, {'state': 'ok', 'missingChunks': [], 'detail': None}
+
+    def _add_hook(self, url, events):
+        hook_id = str(len(self.hooks) + 1)
+        self.hooks[hook_id] = {'id': hook_id, 'url': url, 'events': sorted(events), 'status': 'active',
+                               'dateCreated': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}
+        return self.hooks[hook_id]
+
+    def _hooks(self, method, data):
+        if method == 'POST':
+            if not data.get('url') or not isinstance(data.get('events'), list):
+                raise MockError(400, 'url and events are required')
+            # Like Sentry, nothing stops the same URL being registered twice
+            return 201, self._add_hook(data['url'], data['events'])
+
+        per_page = min(int(data.get('per_page', PAGE_SIZE)), PAGE_SIZE)
+        offset = int(data.get('cursor', '0:0:0').split(':')[1])
+        hooks = list(self.hooks.values())
+        page = hooks[offset:offset + per_page]
+        host, port = self.server.server_address[:2]
+        base = f'http://{host}:{port}{API_PREFIX}/organizations/{MOCK_ORG}/hooks/?per_page={per_page}&cursor='
+        prev_cursor, next_cursor = f'0:{max(0, offset - per_page)}:1', f'0:{offset + per_page}:0'
+        link = (f'<{base}{prev_cursor}>; rel="previous"; results="{str(offset > 0).lower()}"; '
+                f'cursor="{prev_cursor}", '
+                f'<{base}{next_cursor}>; rel="next"; results="{str(offset + per_page < len(hooks)).lower()}"; '
+                f'cursor="{next_cursor}"')
+        return 200, page, {'Link': link}
+
+    def _hook(self, method, data, hook_id):
+        if hook_id not in self.hooks:
+            raise MockError(404, 'The requested resource does not exist')
+        if method == 'DELETE':
+            del self.hooks[hook_id]
+            return 204, {}
+        if method == 'PUT':
+            if 'url' in data:
+                self.hooks[hook_id]['url'] = data['url']
+            if 'events' in data:
+                self.hooks[hook_id]['events'] = sorted(data['events'])
+        return 200, self.hooks[hook_id]
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local stand-in for the Sentry web API')
+    parser.add_argument('--port', type=int, default=8788)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every API call')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls answered with 503')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Advertised chunk size in bytes')
+    parser.add_argument('--assemble-polls', type=int, default=0, help="'assembling' answers before 'ok'")
+    parser.add_argument('--hooks', type=int, default=0, help='Unrelated event hooks to pre-register')
+    args = parser.parse_args()
+
+    mock = MockSentry(port=args.port, latency=args.latency, error_rate=args.error_rate,
+                      chunk_size=args.chunk_size, assemble_polls=args.assemble_polls, hooks=args.hooks)
+    print(f"Mock Sentry API on {mock.base_url}")
+    print(f"  export SENTRY_API_BASE={mock.base_url} SENTRY_AUTH_TOKEN=mock-token SENTRY_ORG={MOCK_ORG}")
+    print(f"  stats: GET http://127.0.0.1:{args.port}/__stats, reset: POST /__reset")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
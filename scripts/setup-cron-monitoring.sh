@@ -6,25 +6,36 @@ set -e
 PROJECT_ROOT="/var/www/currentmesh"
 SCRIPT_DIR="$PROJECT_ROOT/scripts"
 
+# Only this script's own lines are replaced; other currentmesh jobs (e.g. the
+# log-compact.py entry from setup-log-rotation.sh) are kept. monitor-services.sh
+# stays in the list so an old 5-minute entry is removed: the currentmesh-monitor
+# PM2 app (monitor-daemon.py) replaces it and shares its /tmp restart state
+OWN_LINES='monitor-services\.sh|auto-recovery\.sh|api-metrics-exporter\.py|sentry-errors-maintenance\.py'
+OWN_LINES="$OWN_LINES|^# CurrentMesh Automated Monitoring|^# Health check every|^# Full recovery check every"
+OWN_LINES="$OWN_LINES|^# API latency metrics for|^# sentry_errors partitions ahead"
+
 # Create cron jobs
-(crontab -l 2>/dev/null | grep -v "currentmesh" || true; cat << EOF
+(crontab -l 2>/dev/null | grep -Ev "$OWN_LINES" || true; cat << EOF
 # CurrentMesh Automated Monitoring
-# Health check every 5 minutes
-*/5 * * * * $SCRIPT_DIR/monitor-services.sh >> $PROJECT_ROOT/logs/monitor-cron.log 2>&1
-
 # Full recovery check every 15 minutes
 */15 * * * * $SCRIPT_DIR/auto-recovery.sh >> $PROJECT_ROOT/logs/recovery-cron.log 2>&1
+# API latency metrics for node_exporter every minute
+* * * * * cd $SCRIPT_DIR && python3 api-metrics-exporter.py > /dev/null 2>> $PROJECT_ROOT/logs/api-metrics-cron.log
+# sentry_errors partitions ahead and monthly retention, daily
+40 3 * * * cd $SCRIPT_DIR && python3 sentry-errors-maintenance.py >> $PROJECT_ROOT/logs/sentry-errors-maintenance.log 2>&1
 EOF
 ) | crontab -
 
 echo "✅ Cron jobs configured for automated monitoring"
 echo ""
 echo "Monitoring schedule:"
-echo "  - Health check: Every 5 minutes"
+echo "  - Health check: continuous, by the currentmesh-monitor PM2 app (ecosystem.config.js)"
 echo "  - Recovery check: Every 15 minutes"
+echo "  - API metrics export: Every minute"
+echo "  - sentry_errors partitions/retention: Daily at 03:40"
 echo ""
 echo "Logs:"
-echo "  - Monitor: $PROJECT_ROOT/logs/monitor-cron.log"
+echo "  - Monitor: $PROJECT_ROOT/logs/service-monitor.log"
 echo "  - Recovery: $PROJECT_ROOT/logs/recovery-cron.log"
 
 
@@ -1,16 +1,22 @@
 #!/bin/bash
 # Setup log rotation for PM2 and application logs
+# Project logs are rotated and compacted by log-compact.py (hourly cron,
+# budgeted and searchable archive); logrotate keeps handling /var/log/pm2 and
+# a size-only safety net for the project logs in case the compactor stops
 
 set -e
 
 PROJECT_ROOT="/var/www/currentmesh"
 LOG_DIR="$PROJECT_ROOT/logs"
+SCRIPT_DIR="$PROJECT_ROOT/scripts"
 
 # Create logrotate configuration
+# The $LOG_DIR rule only fires far above log-compact.py's 20MB rotation size;
+# the compactor archives its .1/.2.gz files like its own rotations
 cat > /etc/logrotate.d/currentmesh << EOF
 $LOG_DIR/*.log {
-    daily
-    rotate 14
+    size 200M
+    rotate 2
     compress
     delaycompress
     missingok
@@ -37,7 +43,12 @@ $LOG_DIR/*.log {
 }
 EOF
 
+# Hourly compaction of the project logs (size, daily and stale rotation)
+(crontab -l 2>/dev/null | grep -v "log-compact.py" || true
+ echo "17 * * * * cd $SCRIPT_DIR && python3 log-compact.py >> $LOG_DIR/log-compact.log 2>&1") | crontab -
+
 echo "✅ Log rotation configured"
-echo "Logs will be rotated daily, kept for 14 days, and compressed"
+echo "Project logs are rotated hourly when due and archived under $LOG_DIR/archive (2G budget)"
+echo "Search them with: python3 $SCRIPT_DIR/log-search.py <pattern> --since 7d"
 
 
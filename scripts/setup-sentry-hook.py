@@ -1,107 +1,114 @@
 #!/usr/bin/env python3
 """
 Setup Sentry Event Hook via API
+Registers the coalescing relay (sentry-webhook-relay.py) by default;
+--direct registers the API route itself. Re-runs update the existing hook
+instead of adding another, and the working endpoint and hook ID are kept in
+.sentry/state.json so a repeat run with the same URL needs no API calls.
 """
-import os
-import json
-import urllib.request
-import urllib.error
+import argparse
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def get_env_var(key, default=None):
-    """Get environment variable from .env-config/.env"""
-    env_path = '.env-config/.env'
-    if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    k, v = line.split('=', 1)
-                    if k == key:
-                        return v
-    return default or os.getenv(key)
+import requests
+
+from sentry_client import SentryClient, get_setting, load_state, save_state
+
+RELAY_WEBHOOK_URL = "https://api.currentmesh.com/sentry-relay/webhook"
+DIRECT_WEBHOOK_URL = "https://api.currentmesh.com/api/sentry/webhook"
+HOOK_EVENTS = ["event.created", "event.updated", "issue.created", "issue.updated", "issue.resolved"]
+
+# Organization endpoints that may hold event hooks, in order of preference
+CANDIDATE_ENDPOINTS = ['hooks/', 'webhooks/', 'integrations/']
+PROBE_TIMEOUT = 5  # seconds
+CACHE_TTL = 24 * 3600  # seconds a cached registration is trusted without asking Sentry
+
+def probe(client, endpoint):
+    """True if the endpoint answers with a list of hooks"""
+    try:
+        response = client.org_request('GET', endpoint, params={'per_page': 1}, timeout=PROBE_TIMEOUT, retry=False)
+        items = response.json() if response.status_code == 200 else None
+    except (requests.RequestException, ValueError):
+        return False
+    return isinstance(items, list) and all(isinstance(item, dict) and 'url' in item for item in items)
+
+def find_endpoint(client, cached=None):
+    """The cached endpoint if it still works, else the first candidate that does (probed concurrently)"""
+    if cached and probe(client, cached):
+        return cached
+    with ThreadPoolExecutor(max_workers=len(CANDIDATE_ENDPOINTS)) as pool:
+        working = list(pool.map(lambda endpoint: probe(client, endpoint), CANDIDATE_ENDPOINTS))
+    return next((endpoint for endpoint, ok in zip(CANDIDATE_ENDPOINTS, working) if ok), None)
+
+def register(client, endpoint, webhook_url):
+    """Create the hook, or bring an existing one up to date; returns (hook, action)"""
+    hooks = list(client.paginate(client.org_path(endpoint)))
+    # A hook on this URL, else ours on the other one (switching relay <-> direct)
+    hook = next((hook for url in (webhook_url, RELAY_WEBHOOK_URL, DIRECT_WEBHOOK_URL)
+                 for hook in hooks if hook.get('url') == url), None)
+
+    if hook is None:
+        # Not retried: a replayed POST could register the hook twice
+        response = client.org_request('POST', endpoint, json={'url': webhook_url, 'events': HOOK_EVENTS})
+        if response.status_code not in (200, 201):
+            raise RuntimeError(f'HTTP {response.status_code} - {response.text[:200]}')
+        return response.json(), 'created'
+
+    if hook['url'] == webhook_url and sorted(hook.get('events') or []) == sorted(HOOK_EVENTS):
+        return hook, 'unchanged'
+    response = client.org_request('PUT', f"{endpoint}{hook['id']}/", json={'url': webhook_url, 'events': HOOK_EVENTS})
+    if response.status_code != 200:
+        raise RuntimeError(f'HTTP {response.status_code} - {response.text[:200]}')
+    return response.json(), 'updated'
 
 def main():
-    auth_token = get_env_var('SENTRY_AUTH_TOKEN', 'your_sentry_auth_token_here')
-    org_slug = get_env_var('SENTRY_ORG', '')
-    webhook_url = "https://api.currentmesh.com/api/sentry/webhook"
-    
-    if not auth_token:
-        print("❌ Error: SENTRY_AUTH_TOKEN not found")
-        sys.exit(1)
-    
-    # Get organization if not set
-    if not org_slug:
-        print("🔍 Getting organization from API...")
-        try:
-            req = urllib.request.Request('https://sentry.io/api/0/organizations/')
-            req.add_header('Authorization', f'Bearer {auth_token}')
-            
-            with urllib.request.urlopen(req) as response:
-                orgs = json.loads(response.read().decode())
-                if orgs:
-                    org_slug = orgs[0]['slug']
-                    print(f"✅ Found organization: {org_slug}")
-                else:
-                    print("❌ No organizations found")
-                    sys.exit(1)
-        except Exception as e:
-            print(f"❌ Error getting organization: {e}")
-            sys.exit(1)
-    
-    print(f"\n📋 Setting up Event Hook...")
-    print(f"   Organization: {org_slug}")
+    parser = argparse.ArgumentParser(description='Register the Sentry event hook')
+    parser.add_argument('--direct', action='store_true',
+                        help='Point the hook at /api/sentry/webhook instead of the relay')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Check the hook against Sentry even if a recent registration is cached')
+    args = parser.parse_args()
+
+    webhook_url = get_setting('SENTRY_WEBHOOK_URL') or (DIRECT_WEBHOOK_URL if args.direct else RELAY_WEBHOOK_URL)
+    client = SentryClient(pool_size=len(CANDIDATE_ENDPOINTS))
+    state = load_state()
+    cached = state.get('event_hooks', {}).get(client.org) or {}
+
+    if (not args.refresh and cached.get('url') == webhook_url
+            and time.time() - cached.get('checked', 0) < CACHE_TTL):
+        print(f"✅ Event Hook already registered (checked {(time.time() - cached['checked']) / 60:.0f} min ago)")
+        print(f"   Hook ID: {cached['id']}")
+        print(f"   Webhook URL: {webhook_url}")
+        return
+
+    print(f"📋 Setting up Event Hook...")
+    print(f"   Organization: {client.org}")
     print(f"   Webhook URL: {webhook_url}")
-    
-    # Try different API endpoints
-    endpoints = [
-        f'https://sentry.io/api/0/organizations/{org_slug}/hooks/',
-        f'https://sentry.io/api/0/organizations/{org_slug}/webhooks/',
-        f'https://sentry.io/api/0/organizations/{org_slug}/integrations/',
-    ]
-    
-    data = {
-        "url": webhook_url,
-        "events": ["event.created", "event.updated", "issue.created", "issue.updated", "issue.resolved"]
-    }
-    
-    for endpoint in endpoints:
+
+    endpoint = find_endpoint(client, cached.get('endpoint'))
+    if endpoint:
         try:
-            print(f"\n🔗 Trying: {endpoint}")
-            req = urllib.request.Request(endpoint)
-            req.add_header('Authorization', f'Bearer {auth_token}')
-            req.add_header('Content-Type', 'application/json')
-            req.data = json.dumps(data).encode()
-            req.method = 'POST'
-            
-            with urllib.request.urlopen(req) as response:
-                result = json.loads(response.read().decode())
-                print(f"✅ Event Hook created successfully!")
-                print(f"   Hook ID: {result.get('id', 'N/A')}")
-                print(f"   Webhook URL: {webhook_url}")
-                return
-        except urllib.error.HTTPError as e:
-            error_body = e.read().decode()
-            if e.code == 404:
-                print(f"   ❌ 404 - Endpoint not found")
-                continue
-            elif e.code == 400:
-                print(f"   ❌ 400 - Bad request: {error_body}")
-                # Maybe this endpoint exists but needs different data
-                continue
-            else:
-                print(f"   ❌ {e.code} - {error_body}")
-                continue
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
-            continue
-    
+            hook, action = register(client, endpoint, webhook_url)
+        except (RuntimeError, requests.RequestException) as e:
+            print(f"   ❌ {client.org_path(endpoint)}: {e}")
+        else:
+            state.setdefault('event_hooks', {})[client.org] = {
+                'endpoint': endpoint, 'id': hook.get('id'), 'url': webhook_url, 'checked': int(time.time())}
+            save_state(state)
+            print(f"✅ Event Hook {action}")
+            print(f"   Hook ID: {hook.get('id', 'N/A')}")
+            print(f"   Endpoint: {client.org_path(endpoint)}")
+            return
+    else:
+        print(f"   ❌ None of {', '.join(CANDIDATE_ENDPOINTS)} lists hooks for this organization")
+
     print("\n❌ Could not create event hook via API")
     print("\n💡 Alternative: Set up manually in Sentry Dashboard")
     print("   1. Go to Settings → Integrations → Event Hooks")
     print(f"   2. Add webhook URL: {webhook_url}")
     print("   3. Select events: issue.created, issue.updated, issue.resolved")
+    sys.exit(1)
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,93 @@
+"""
+CurrentMesh site build outputs
+Where each frontend's build artifacts live on disk and which URL prefix they
+are served under, shared by the cache, pre-warm and compression tooling
+"""
+
+import os
+import re
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).parent.parent
+
+# name -> hostname, (build directory, URL prefix) mounts and the URL prefixes
+# whose files are content-addressed by the bundler (never change in place),
+# with the bundler that writes them
+SITES = {
+    'marketing': {
+        'host': 'currentmesh.com',
+        'mounts': [('marketing/.next/static', '/_next/static/'), ('marketing/public', '/')],
+        'immutable': {'/_next/static/': 'next'},
+    },
+    'app': {
+        'host': 'app.currentmesh.com',
+        'mounts': [('app/.next/static', '/_next/static/'), ('app/public', '/')],
+        'immutable': {'/_next/static/': 'next'},
+    },
+    'client': {
+        'host': 'client.currentmesh.com',
+        'mounts': [('client/dist', '/')],
+        'immutable': {'/assets/': 'vite'},
+    },
+    'admin': {
+        'host': 'admin.currentmesh.com',
+        'mounts': [('admin/dist', '/')],
+        'immutable': {'/assets/': 'vite'},
+    },
+    'www': {
+        'host': 'www.currentmesh.com',
+        'mounts': [('www/public', '/')],
+    },
+}
+
+# Content hash each bundler puts in the file names under its output prefix.
+# Next.js: hex, e.g. chunks/framework-a1b2c3d4e5f6a7b8.js,
+# media/inter.a1b2c3d4.woff2, css/0c1d2e3f4a5b6c7d.css.
+# Vite/Rollup: 8 base64url characters, not always with a digit, e.g.
+# index-3f2a9c1b.js, index-BcDeFgHi.js, index-B3x_9-aZ.js
+BUNDLER_HASH_RES = {
+    'next': re.compile(r'(?:[.-][0-9a-f]{8,}|^[0-9a-f]{16,})(?=\.[a-z0-9]+$)'),
+    'vite': re.compile(r'-[A-Za-z0-9_-]{8}(?=\.[a-z0-9]+$)'),
+}
+
+def bundler_for(url_path, name=None):
+    """
+    Bundler whose output a URL path is served from, or None
+    Without a site name, any site's declared bundler prefix counts
+    """
+    names = [name] if name else list(SITES)
+    for site in names:
+        for prefix, bundler in SITES[site].get('immutable', {}).items():
+            if url_path.startswith(prefix):
+                return bundler
+    return None
+
+def strip_hash(url_path, name=None, replacement=''):
+    """URL path with the bundler's content hash in the file name replaced"""
+    bundler = bundler_for(url_path, name)
+    if bundler is None:
+        return url_path
+    directory, slash, filename = url_path.rpartition('/')
+    return directory + slash + BUNDLER_HASH_RES[bundler].sub(replacement, filename, count=1)
+
+def site_roots(name, project_dir=PROJECT_DIR):
+    """Return the (absolute build directory, URL prefix) mounts that exist for a site"""
+    return [(Path(project_dir) / rel, prefix) for rel, prefix in SITES[name]['mounts']
+            if (Path(project_dir) / rel).is_dir()]
+
+def iter_site_files(name, project_dir=PROJECT_DIR, skip_suffixes=('.br', '.gz')):
+    """
+    Yield (path, url path) for every file a site serves
+    Precompressed siblings are skipped; they share their source file's URL
+    """
+    for root, prefix in site_roots(name, project_dir):
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(skip_suffixes):
+                    continue
+                path = Path(dirpath) / filename
+                yield path, prefix + path.relative_to(root).as_posix()
+
+def site_url(name, url_path, scheme='https'):
+    """Absolute URL for a path on a site"""
+    return f"{scheme}://{SITES[name]['host']}{url_path}"
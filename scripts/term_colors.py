@@ -0,0 +1,12 @@
+"""
+Terminal colors
+ANSI codes for the scripts' status output; no dependencies, so any tool can
+import it without pulling in an API client
+"""
+
+class Colors:
+    GREEN = '\033[0;32m'
+    BLUE = '\033[0;34m'
+    RED = '\033[0;31m'
+    YELLOW = '\033[1;33m'
+    NC = '\033[0m'
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Sentry Webhook Load Test
+Drives synthetic issue.created / issue.updated / event.created deliveries at
+/api/sentry/webhook (or the relay) at fixed open-loop rates: requests are
+sent on schedule whether or not earlier ones have finished, and latency is
+measured from the scheduled send time, so a saturated server shows up as
+growing latency instead of a politely slowed-down client. Reports latency
+percentiles, error rate and achieved throughput per rate step.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import ssl
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+from health_check import percentile
+from term_colors import Colors
+
+DEFAULT_URL = 'http://127.0.0.1:3000/api/sentry/webhook'
+DEFAULT_RATES = '25,50,100,200'  # deliveries per second, one step each
+STEP_DURATION = 20  # seconds per rate step
+MAX_CONNECTIONS = 256  # concurrent connections to the target
+REQUEST_TIMEOUT = 10  # seconds, from the scheduled send time
+DRAIN_TIMEOUT = 30  # seconds to wait for stragglers after a step
+ISSUE_POOL = 500  # distinct issues, so updates hit existing rows
+DEFAULT_MIX = 'issue.created=0.2,issue.updated=0.5,event.created=0.3'
+SLO_P99 = 0.5  # seconds; a step passes when p99 stays under this...
+SLO_ERRORS = 0.01  # ...and errors stay under this fraction
+
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '::1')
+SENTRY_ID_PREFIX = 'loadtest-'  # synthetic issue ids start with this
+
+# Same split as the real projects (SENTRY-PROJECTS-SUMMARY.md, SENTRY-TAGS-CONFIGURED.md)
+PROJECTS = [
+    ({'id': '4510628587634688', 'name': 'Frontend', 'slug': 'frontend', 'platform': 'javascript-nextjs'},
+     [('marketing', 'currentmesh.com'), ('admin', 'app.currentmesh.com')]),
+    ({'id': '4510628617191424', 'name': 'Backend', 'slug': 'backend', 'platform': 'node-express'},
+     [('backend', 'api.currentmesh.com')]),
+]
+ERRORS = [
+    ('TypeError', "Cannot read properties of undefined (reading 'map')", 'components/Dashboard.tsx', 'error'),
+    ('Error', 'connect ECONNREFUSED 127.0.0.1:5432', 'config/database.ts', 'fatal'),
+    ('ChunkLoadError', 'Loading chunk 742 failed.', 'webpack/runtime/jsonp chunk loading', 'error'),
+    ('Error', 'Request failed with status code 502', 'lib/api-client.ts', 'error'),
+    ('QueryFailedError', 'duplicate key value violates unique constraint "users_email_key"',
+     'routes/auth.ts', 'warning'),
+    ('RangeError', 'Maximum call stack size exceeded', 'utils/serialize.ts', 'error'),
+]
+
+def parse_mix(value):
+    """'issue.created=0.2,issue.updated=0.5,...' -> [(kind, weight)]"""
+    mix = []
+    for part in value.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in ('issue.created', 'issue.updated', 'event.created'):
+            raise argparse.ArgumentTypeError(f"unknown delivery type '{kind}'")
+        try:
+            mix.append((kind, float(weight or 1)))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid weight in '{part}'")
+    return mix
+
+def parse_rates(value):
+    try:
+        rates = [float(rate) for rate in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid rates '{value}' (use e.g. 50,100,200)")
+    if any(rate <= 0 for rate in rates):
+        raise argparse.ArgumentTypeError('rates must be positive')
+    return rates
+
+def _iso(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+class PayloadFactory:
+    """Sentry integration-platform payloads over a fixed pool of issues"""
+
+    def __init__(self, issues=ISSUE_POOL, seed=None, frames=12):
+        self.rng = random.Random(seed)
+        self.run = uuid.uuid4().hex[:8]
+        self.frames = frames
+        self.issues = [self._issue(n) for n in range(issues)]
+        self.installation = str(uuid.uuid4())
+
+    def _issue(self, n):
+        project, apps = self.rng.choice(PROJECTS)
+        app, site = self.rng.choice(apps)
+        error_type, value, filename, level = self.rng.choice(ERRORS)
+        first_seen = datetime.now(timezone.utc) - timedelta(minutes=self.rng.randint(0, 600))
+        issue_id = f'{SENTRY_ID_PREFIX}{self.run}-{n}'
+        return {
+            'id': issue_id,
+            'shortId': f"{project['slug'].upper()}-{n + 1:X}",
+            'title': f'{error_type}: {value}',
+            'culprit': f'{filename} in handler',
+            'level': level,
+            'status': 'unresolved',
+            'permalink': f"https://sentry.io/organizations/currentmesh/issues/{issue_id}/",
+            'project': project,
+            'platform': project['platform'],
+            'metadata': {'type': error_type, 'value': value, 'filename': filename},
+            'tags': {'app': app, 'site': site, 'environment': 'production', 'release': self.run},
+            'firstSeen': _iso(first_seen),
+            'lastSeen': _iso(first_seen),
+            'count': '1',
+            'userCount': 1,
+        }
+
+    def _stacktrace(self, issue):
+        filename = issue['metadata']['filename']
+        return {'frames': [{
+            'filename': filename if i == self.frames - 1 else f'node_modules/.pnpm/lib{i}/index.js',
+            'function': f'fn{i}',
+            'lineno': self.rng.randint(1, 900),
+            'colno': self.rng.randint(1, 120),
+            'in_app': i >= self.frames - 3,
+            'context_line': '      const rows = data.items.map((item) => normalize(item, options));',
+        } for i in range(self.frames)]}
+
+    def make(self, kind):
+        """(resource header, JSON body) for one delivery of the given kind"""
+        issue = self.rng.choice(self.issues)
+        now = datetime.now(timezone.utc)
+        issue['lastSeen'] = _iso(now)
+        issue['count'] = str(int(issue['count']) + 1)
+        if kind == 'event.created':
+            event = {
+                'event_id': uuid.uuid4().hex,
+                'issue_id': issue['id'],
+                'project': int(issue['project']['id']),
+                'title': issue['title'],
+                'level': issue['level'],
+                'culprit': issue['culprit'],
+                'platform': issue['platform'],
+                'datetime': _iso(now),
+                'tags': [[key, value] for key, value in issue['tags'].items()],
+                'exception': {'values': [{'type': issue['metadata']['type'], 'value': issue['metadata']['value'],
+                                          'stacktrace': self._stacktrace(issue)}]},
+                'url': f"https://sentry.io/api/0/projects/currentmesh/{issue['project']['slug']}/events/",
+                'web_url': issue['permalink'],
+            }
+            payload = {'action': 'created', 'data': {'event': event}}
+            resource = 'event_alert'
+        else:
+            action = kind.split('.')[1]
+            payload = {'action': action, 'data': {'issue': dict(issue, status='unresolved')}}
+            resource = 'issue'
+        payload['installation'] = {'uuid': self.installation}
+        payload['actor'] = {'type': 'application', 'id': 'sentry', 'name': 'Sentry'}
+        return resource, json.dumps(payload, separators=(',', ':')).encode()
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection over asyncio streams"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, target):
+        reader, writer = await asyncio.open_connection(target['host'], target['port'], ssl=target['ssl'])
+        return cls(reader, writer)
+
+    async def post(self, target, body, headers):
+        """(status, reusable) for one POST"""
+        head = [f"POST {target['path']} HTTP/1.1", f"Host: {target['host_header']}",
+                'Content-Type: application/json', f'Content-Length: {len(body)}']
+        head += [f'{key}: {value}' for key, value in headers.items()]
+        self.writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+        await self.writer.drain()
+
+        status_line, *lines = (await self.reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+        status = int(status_line.split(' ', 2)[1])
+        response = {}
+        for line in lines:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                response[key.strip().lower()] = value.strip().lower()
+        if response.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+        else:
+            await self.reader.readexactly(int(response.get('content-length', 0)))
+        return status, response.get('connection') != 'close'
+
+    def close(self):
+        self.writer.close()
+
+class Pool:
+    """Bounded set of keep-alive connections; new ones are opened on demand"""
+
+    def __init__(self, target, size):
+        self.target = target
+        self.slots = asyncio.Semaphore(size)
+        self.idle = []
+
+    async def post(self, body, headers):
+        async with self.slots:
+            conn = self.idle.pop() if self.idle else None
+            try:
+                conn = conn or await Connection.open(self.target)
+                status, reusable = await conn.post(self.target, body, headers)
+            except BaseException:
+                if conn:
+                    conn.close()
+                raise
+            if reusable:
+                self.idle.append(conn)
+            else:
+                conn.close()
+            return status
+
+    def close(self):
+        for conn in self.idle:
+            conn.close()
+        self.idle.clear()
+
+class Step:
+    """Results of one rate step"""
+
+    def __init__(self, rate, duration):
+        self.rate = rate
+        self.duration = duration
+        self.latencies = []
+        self.outcomes = {}
+        self.lag = 0.0  # worst scheduler delay; high values mean the client itself can't keep up
+        self.finished = None
+
+    def record(self, outcome, latency=None):
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if latency is not None:
+            self.latencies.append(latency)
+
+    def summary(self):
+        sent = sum(self.outcomes.values())
+        ok = sum(n for outcome, n in self.outcomes.items() if str(outcome).startswith('2'))
+        values = sorted(self.latencies)
+        elapsed = max(self.finished or self.duration, self.duration)
+        return {
+            'rate': self.rate,
+            'sent': sent,
+            'ok': ok,
+            'error_rate': (sent - ok) / sent if sent else 0.0,
+            'throughput': ok / elapsed,
+            'outcomes': {str(key): value for key, value in sorted(self.outcomes.items(), key=str)},
+            'p50_ms': _ms(percentile(values, 50)),
+            'p90_ms': _ms(percentile(values, 90)),
+            'p99_ms': _ms(percentile(values, 99)),
+            'p999_ms': _ms(percentile(values, 99.9)),
+            'max_ms': _ms(values[-1] if values else None),
+            'scheduler_lag_ms': _ms(self.lag),
+        }
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+async def deliver(pool, factory, kind, secret, scheduled, timeout, step):
+    resource, body = factory.make(kind)
+    headers = {'Sentry-Hook-Resource': resource, 'Sentry-Hook-Timestamp': str(int(time.time())),
+               'Request-ID': str(uuid.uuid4())}
+    if secret:
+        headers['Sentry-Hook-Secret'] = secret
+    loop = asyncio.get_running_loop()
+    try:
+        # The timeout also covers time spent waiting for a free connection
+        status = await asyncio.wait_for(pool.post(body, headers), max(timeout - (loop.time() - scheduled), 0.001))
+    except asyncio.TimeoutError:
+        step.record('timeout')
+        return
+    except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, IndexError) as e:
+        step.record('refused' if isinstance(e, ConnectionRefusedError) else 'conn_error')
+        return
+    step.record(status, loop.time() - scheduled)
+
+async def run_step(pool, factory, mix, rate, duration, args):
+    """Send rate*duration deliveries on a Poisson (or fixed) schedule and wait for them"""
+    step = Step(rate, duration)
+    loop = asyncio.get_running_loop()
+    kinds, weights = zip(*mix)
+    rng = factory.rng
+    tasks = set()
+    started = loop.time()
+    scheduled = started
+    while True:
+        scheduled += rng.expovariate(rate) if args.arrivals == 'poisson' else 1 / rate
+        if scheduled - started >= duration:
+            break
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            step.lag = max(step.lag, -delay)
+        kind = rng.choices(kinds, weights)[0]
+        task = asyncio.ensure_future(deliver(pool, factory, kind, args.secret, scheduled, args.timeout, step))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(tasks, timeout=DRAIN_TIMEOUT)
+    step.finished = loop.time() - started
+    for task in tasks:
+        task.cancel()
+        step.record('unfinished')
+    return step
+
+async def run(args):
+    url = urlsplit(args.url)
+    target = {
+        'host': url.hostname,
+        'port': url.port or (443 if url.scheme == 'https' else 80),
+        'ssl': ssl.create_default_context() if url.scheme == 'https' else None,
+        'path': (url.path or '/') + (f'?{url.query}' if url.query else ''),
+        'host_header': url.netloc,
+    }
+    factory = PayloadFactory(args.issues, args.seed)
+    pool = Pool(target, args.connections)
+    steps = []
+    try:
+        for rate in args.rates:
+            print(f"{Colors.BLUE}▶️  {rate:g}/s for {args.duration:g}s...{Colors.NC}", file=sys.stderr)
+            step = await run_step(pool, factory, args.mix, rate, args.duration, args)
+            steps.append(step.summary())
+            if args.stop_on_failure and not passes(steps[-1], args):
+                print(f"{Colors.YELLOW}⚠️  SLO missed at {rate:g}/s, skipping higher rates{Colors.NC}", file=sys.stderr)
+                break
+    finally:
+        pool.close()
+    return factory, steps
+
+def passes(summary, args):
+    return (summary['sent'] and summary['error_rate'] <= args.slo_errors
+            and summary['p99_ms'] is not None and summary['p99_ms'] <= args.slo_p99 * 1000)
+
+def print_report(steps, args):
+    print(f"{Colors.BLUE}Sentry webhook load test: {args.url}{Colors.NC}")
+    print(f"{'Rate/s':>8} {'Sent':>7} {'OK/s':>8} {'Errors':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'p99.9 ms':>9} {'Max ms':>8}")
+    for s in steps:
+        color = Colors.GREEN if passes(s, args) else Colors.RED
+        cells = [f"{s[key]:>{width}}" if s[key] is not None else f"{'-':>{width}}"
+                 for key, width in (('p50_ms', 8), ('p90_ms', 8), ('p99_ms', 8), ('p999_ms', 9), ('max_ms', 8))]
+        print(f"{color}{s['rate']:>8g} {s['sent']:>7} {s['throughput']:>8.1f} {s['error_rate']:>6.1%} "
+              f"{' '.join(cells)}{Colors.NC}")
+        failures = {key: value for key, value in s['outcomes'].items() if not key.startswith('2')}
+        if failures:
+            print(f"{'':>8} failures: " + ', '.join(f'{key}={value}' for key, value in failures.items()))
+        if s['scheduler_lag_ms'] and s['scheduler_lag_ms'] > 50:
+            print(f"{Colors.YELLOW}{'':>8} ⚠️  client fell {s['scheduler_lag_ms']:.0f}ms behind schedule; "
+                  f"this rate measures the load generator too{Colors.NC}")
+
+    passing = [s['rate'] for s in steps if passes(s, args)]
+    print()
+    if passing:
+        print(f"{Colors.GREEN}✅ Highest rate within SLO (p99 <= {args.slo_p99 * 1000:.0f}ms, errors <= "
+              f"{args.slo_errors:.0%}): {max(passing):g}/s{Colors.NC}")
+    else:
+        print(f"{Colors.RED}❌ No rate stayed within SLO (p99 <= {args.slo_p99 * 1000:.0f}ms, errors <= "
+              f"{args.slo_errors:.0%}){Colors.NC}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Open-loop load test for the Sentry webhook ingest path')
+    parser.add_argument('--url', default=DEFAULT_URL, help=f'Webhook URL (default {DEFAULT_URL})')
+    parser.add_argument('--rates', type=parse_rates, default=parse_rates(DEFAULT_RATES),
+                        help=f'Deliveries per second, one step each (default {DEFAULT_RATES})')
+    parser.add_argument('--duration', type=float, default=STEP_DURATION, help='Seconds per rate step')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f'Delivery mix ({DEFAULT_MIX})')
+    parser.add_argument('--issues', type=int, default=ISSUE_POOL, help='Distinct issues the deliveries refer to')
+    parser.add_argument('--arrivals', choices=['poisson', 'fixed'], default='poisson', help='Inter-arrival times')
+    parser.add_argument('--connections', type=int, default=MAX_CONNECTIONS, help='Max concurrent connections')
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT, help='Per-delivery timeout in seconds')
+    parser.add_argument('--secret', default=os.getenv('SENTRY_WEBHOOK_SECRET'),
+                        help='sentry-hook-secret header (default: $SENTRY_WEBHOOK_SECRET)')
+    parser.add_argument('--slo-p99', type=float, default=SLO_P99, help='p99 latency target in seconds')
+    parser.add_argument('--slo-errors', type=float, default=SLO_ERRORS, help='Error rate target (fraction)')
+    parser.add_argument('--stop-on-failure', action='store_true', help='Skip higher rates once the SLO is missed')
+    parser.add_argument('--seed', type=int, help='Random seed for repeatable payloads and arrivals')
+    parser.add_argument('--allow-remote', action='store_true', help='Allow a non-local target (writes real rows)')
+    parser.add_argument('--sample', choices=['issue.created', 'issue.updated', 'event.created'],
+                        help='Print one synthetic payload and exit')
+    parser.add_argument('--json', action='store_true', help='Print JSON')
+    args = parser.parse_args()
+
+    if args.sample:
+        _, body = PayloadFactory(1, args.seed).make(args.sample)
+        print(json.dumps(json.loads(body), indent=2))
+        return
+    if urlsplit(args.url).scheme not in ('http', 'https') or not urlsplit(args.url).hostname:
+        print(f"{Colors.RED}Error: invalid URL {args.url}{Colors.NC}")
+        sys.exit(2)
+    if urlsplit(args.url).hostname not in LOCAL_HOSTS and not args.allow_remote:
+        print(f"{Colors.RED}Error: {args.url} is not local; every delivery becomes a sentry_errors row. "
+              f"Pass --allow-remote to load a shared environment anyway{Colors.NC}")
+        sys.exit(2)
+
+    try:
+        factory, steps = asyncio.run(run(args))
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+    if args.json:
+        print(json.dumps({'url': args.url, 'run': factory.run, 'steps': steps}, indent=2))
+    else:
+        print_report(steps, args)
+        # event.created rows get a generated sentry_id from the route, so match on the payload instead;
+        # each row's sentry_error_keys entry (migration 005) goes with it
+        print(f"\nRemove this run's rows with: WITH gone AS (DELETE FROM sentry_errors "
+              f"WHERE raw_data->'installation'->>'uuid' = '{factory.installation}' RETURNING sentry_id) "
+              f"DELETE FROM sentry_error_keys k USING gone WHERE k.sentry_id = gone.sentry_id;")
+    if not steps or not passes(steps[0], args):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
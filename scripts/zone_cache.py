@@ -0,0 +1,105 @@
+"""
+On-disk snapshot cache of Cloudflare zone state
+Zone settings and DNS records are kept in one compact JSON file under
+.cloudflare/, keyed by zone and resource with a fetch time. Read-only paths
+(plan, status) answer from a fresh snapshot without touching the API; our own
+writes update or drop only the resource they changed, so a later read never
+sees state older than what this tooling last wrote.
+"""
+
+import fcntl
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from cloudflare_client import STATE_DIR
+
+CACHE_PATH = STATE_DIR / 'zone-cache.json'
+LOCK_PATH = STATE_DIR / '.zone-cache.lock'
+
+# Seconds a snapshot is trusted by read-only commands
+TTLS = {
+    'settings': 600,
+    'dns_records': 300,
+}
+
+# Only what the scripts read back; keeps the file small
+SETTING_FIELDS = ('id', 'value', 'editable')
+RECORD_FIELDS = ('id', 'type', 'name', 'content', 'proxied', 'ttl')
+
+_lock = threading.Lock()
+
+@contextmanager
+def _locked():
+    """Serialize read-modify-write across threads and concurrent scripts"""
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    with _lock, open(LOCK_PATH, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+def _load():
+    try:
+        with open(CACHE_PATH, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _save(snapshot):
+    tmp = CACHE_PATH.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(snapshot, f, separators=(',', ':'))
+    tmp.replace(CACHE_PATH)
+
+def _compact(resource, data):
+    fields = SETTING_FIELDS if resource == 'settings' else RECORD_FIELDS
+    return [{key: item[key] for key in fields if key in item} for item in data]
+
+def get(zone_id, resource, max_age=None):
+    """
+    Cached data for a zone resource, or None if missing or older than max_age
+    (defaults to the resource's TTL)
+    """
+    max_age = TTLS[resource] if max_age is None else max_age
+    entry = _load().get(zone_id, {}).get(resource)
+    if not entry or time.time() - entry['fetched'] > max_age:
+        return None
+    return entry['data']
+
+def age(zone_id, resource):
+    """Seconds since the resource was fetched, or None"""
+    entry = _load().get(zone_id, {}).get(resource)
+    return None if not entry else time.time() - entry['fetched']
+
+def put(zone_id, resource, data):
+    """Store a freshly fetched resource"""
+    with _locked():
+        snapshot = _load()
+        snapshot.setdefault(zone_id, {})[resource] = {'fetched': time.time(), 'data': _compact(resource, data)}
+        _save(snapshot)
+
+def update(zone_id, resource, items):
+    """
+    Write-through after our own successful write: merge items into a cached
+    resource by id, keeping its fetch time. No-op if nothing is cached.
+    """
+    with _locked():
+        snapshot = _load()
+        entry = snapshot.get(zone_id, {}).get(resource)
+        if not entry:
+            return
+        by_id = {item['id']: item for item in entry['data']}
+        for item in _compact(resource, items):
+            by_id.setdefault(item['id'], {}).update(item)
+        entry['data'] = list(by_id.values())
+        _save(snapshot)
+
+def invalidate(zone_id, resource=None):
+    """Drop one resource (or the whole zone) so the next read refetches it"""
+    with _locked():
+        snapshot = _load()
+        if resource is None:
+            snapshot.pop(zone_id, None)
+        else:
+            snapshot.get(zone_id, {}).pop(resource, None)
+        _save(snapshot)
@@ -0,0 +1,21 @@
+-- One row per Sentry issue: which created_at its sentry_errors row lives under.
+-- sentry_errors can't keep UNIQUE (sentry_id) once it is range-partitioned on
+-- created_at (scripts/sentry-errors-maintenance.py), so the webhook upsert
+-- claims the issue here first and then upserts on (sentry_id, created_at).
+CREATE TABLE IF NOT EXISTS sentry_error_keys (
+  sentry_id VARCHAR(255) PRIMARY KEY,
+  created_at TIMESTAMP NOT NULL
+);
+
+-- Retention drops keys by month before dropping the matching partition
+CREATE INDEX IF NOT EXISTS idx_sentry_error_keys_created_at ON sentry_error_keys(created_at);
+
+UPDATE sentry_errors SET created_at = COALESCE(updated_at, NOW()) WHERE created_at IS NULL;
+
+INSERT INTO sentry_error_keys (sentry_id, created_at)
+SELECT sentry_id, created_at FROM sentry_errors
+ON CONFLICT (sentry_id) DO NOTHING;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sentry_errors_sentry_id_created_at ON sentry_errors(sentry_id, created_at);
+
+COMMENT ON TABLE sentry_error_keys IS 'Maps each Sentry issue to the created_at of its sentry_errors row';
@@ -108,13 +108,20 @@ router.post('/sentry/webhook', async (req: Request, res: Response) => {
     };
 
     // Store in database
+    // sentry_error_keys holds the created_at (partition) of each issue's row, so
+    // repeat deliveries update that row even though sentry_errors is partitioned
     const pool = getPool();
     await pool.query(
-      `INSERT INTO sentry_errors (
-        sentry_id, title, message, level, url, environment, 
+      `WITH issue_key AS (
+        INSERT INTO sentry_error_keys (sentry_id, created_at) VALUES ($1, NOW())
+        ON CONFLICT (sentry_id) DO UPDATE SET sentry_id = EXCLUDED.sentry_id
+        RETURNING created_at
+      )
+      INSERT INTO sentry_errors (
+        sentry_id, title, message, level, url, environment,
         tags, metadata, timestamp, project, raw_data, created_at
-      ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, NOW())
-      ON CONFLICT (sentry_id) DO UPDATE SET
+      ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, (SELECT created_at FROM issue_key))
+      ON CONFLICT (sentry_id, created_at) DO UPDATE SET
         title = EXCLUDED.title,
         message = EXCLUDED.message,
         level = EXCLUDED.level,